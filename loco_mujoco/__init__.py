@@ -2,7 +2,7 @@ __version__ = '0.4.1'
 
 try:
 
-    from .environments import LocoEnv
+    from .environments import LocoEnv, LocoVecEnv, LocoSubprocVecEnv, LocoThreadVecEnv
 
     def get_all_task_names():
         return LocoEnv.get_all_task_names()
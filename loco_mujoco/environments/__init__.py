@@ -1,3 +1,6 @@
 from .base import LocoEnv, ValidTaskConf
 from .humanoids import *
 from .quadrupeds import *
+from .vec_env import LocoVecEnv
+from .subproc_vec_env import LocoSubprocVecEnv
+from .thread_vec_env import LocoThreadVecEnv
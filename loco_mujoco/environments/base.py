@@ -5,6 +5,7 @@ from pathlib import Path
 from copy import deepcopy
 from tempfile import mkdtemp
 from itertools import product
+from concurrent.futures import ThreadPoolExecutor
 
 import mujoco
 from dm_control import mjcf
@@ -17,9 +18,10 @@ from mushroom_rl.utils.mujoco import *
 from mushroom_rl.utils.record import VideoRecorder
 
 import loco_mujoco
-from loco_mujoco.utils import Trajectory
+from loco_mujoco.utils import Trajectory, ObservationCompiler, ObservationHistory, ResetStateBank, StateLayout,\
+    ContactForceAggregator
 from loco_mujoco.utils import NoReward, CustomReward,\
-    TargetVelocityReward, PosReward, DomainRandomizationHandler
+    TargetVelocityReward, PosReward, ReferenceTrackingReward, DomainRandomizationHandler
 
 
 class LocoEnv(MultiMuJoCo):
@@ -30,9 +32,11 @@ class LocoEnv(MultiMuJoCo):
 
     def __init__(self, xml_handles, action_spec, observation_spec, collision_groups=None, gamma=0.99, horizon=1000,
                  n_substeps=10,  reward_type=None, reward_params=None, traj_params=None, random_start=True,
-                 init_step_no=None, timestep=0.001, use_foot_forces=False, default_camera_mode="follow",
-                 use_absorbing_states=True, domain_randomization_config=None, parallel_dom_rand=True,
-                 N_worker_per_xml_dom_rand=4, **viewer_params):
+                 init_step_no=None, timestep=0.001, use_foot_forces=False, average_foot_forces=True,
+                 default_camera_mode="follow", use_absorbing_states=True, domain_randomization_config=None, parallel_dom_rand=True,
+                 N_worker_per_xml_dom_rand=4, direct_dom_rand=False, domain_randomization_bank=None,
+                 domain_randomization_seed=None, async_reset=False, compact_info=False, obs_history_length=1,
+                 obs_history_view=False, **viewer_params):
         """
         Constructor.
 
@@ -72,15 +76,44 @@ class LocoEnv(MultiMuJoCo):
                 default timestep specified in the XML will be used;
             use_foot_forces (bool): If True, foot forces are computed and added to
                 the observation space;
+            average_foot_forces (bool): If True, the foot forces are averaged over all substeps. This requires
+                running the substeps one by one. If False, all substeps are done in a single call to the simulator
+                and only the foot forces of the last substep are used, which is considerably faster;
             default_camera_mode (str): String defining the default camera mode. Available modes are "static",
                 "follow", and "top_static".
             use_absorbing_states (bool): If True, absorbing states are defined for each environment. This means
                 that episodes can terminate earlier.
             domain_randomization_config (str): Path to the domain/dynamics randomization config file.
             parallel_dom_rand (bool): If True and a domain_randomization_config file is passed, the domain
-                randomization will run in parallel to speed up simulation run-time.
-            N_worker_per_xml_dom_rand (int): Number of workers used per xml-file for parallel domain randomization.
-                If parallel is set to True, this number has to be greater 1.
+                randomization will run in parallel to speed up simulation run-time. The compile workers are
+                started as new processes (see get_compile_context), hence the entry point of the script has to be
+                protected with if __name__ == "__main__".
+            N_worker_per_xml_dom_rand (int): Number of models compiled ahead of time per xml-file for parallel domain
+                randomization. The models are compiled by a pool of workers shared by all environments of the
+                process (see get_compile_service). If parallel is set to True, this number has to be greater 1.
+            direct_dom_rand (bool): If True, all parameters that do not require a recompilation of the model (e.g.,
+                the joint damping, the geom friction or the body masses) are randomized directly in the model, which
+                is reused across episodes together with its data. The model is only recompiled if other parameters
+                are randomized as well.
+            domain_randomization_bank (str): Path to a bank of randomized models created with
+                save_domain_randomization_bank. If provided, the randomized models are loaded from the bank
+                instead of being compiled.
+            domain_randomization_seed (int): Seed of the generator used for domain randomization. If None, the
+                seed is drawn from np.random.
+            async_reset (bool): If True, the model of the next episode is prepared on a background thread while
+                the current episode is running, such that reset does not wait for the randomized model, the
+                allocation of its data structure or the compilation of its observation. The index of the next model
+                is chosen at the end of the previous reset. Without domain randomization requiring a recompilation,
+                only the index of the next model is prepared. The background thread is stopped with close.
+            compact_info (bool): If True, the info dictionary returned by the step function contains preallocated
+                arrays with the positions and velocities of the root joints instead of dictionaries. Note that
+                these arrays are overwritten at every step, so copy them if they need to be stored.
+            obs_history_length (int): Number of most recent observations returned by step and reset. If greater
+                than 1, the observations are stacked from the oldest to the newest one. On reset, the history is
+                filled with the initial observation.
+            obs_history_view (bool): If True, the stacked observation is returned as a view of a preallocated
+                ring buffer instead of a new array. The view is overwritten at every step, so copy it if it
+                needs to be stored (e.g., in a dataset).
 
         """
 
@@ -88,10 +121,14 @@ class LocoEnv(MultiMuJoCo):
             xml_handles = [xml_handles]
         self._xml_handles = xml_handles
 
+        # caches of the resolved observation indices and the compiled termination bounds per model
+        self._obs_idx_cache = dict()
+        self._fallen_bounds_cache = dict()
+
         if collision_groups is None:
             collision_groups = list()
 
-        if use_foot_forces:
+        if use_foot_forces and average_foot_forces:
             n_intermediate_steps = n_substeps
             n_substeps = 1
         else:
@@ -102,10 +139,19 @@ class LocoEnv(MultiMuJoCo):
 
         if domain_randomization_config is not None:
             self._domain_rand = DomainRandomizationHandler(xml_handles, domain_randomization_config, parallel_dom_rand,
-                                                           N_worker_per_xml_dom_rand)
+                                                           N_worker_per_xml_dom_rand, direct_dom_rand,
+                                                           domain_randomization_bank, domain_randomization_seed)
         else:
             self._domain_rand = None
 
+        # values of the randomized parameters of each model, recorded when a model is randomized
+        self._domain_rand_parameters = [dict() for i in range(len(xml_handles))]
+
+        # the preparation of the next episode running in the background, see _prepare_reset
+        self._reset_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="LocoEnvReset") \
+            if async_reset else None
+        self._prepared_reset = None
+
         super().__init__(xml_handles, action_spec, observation_spec, gamma=gamma, horizon=horizon,
                          n_substeps=n_substeps, n_intermediate_steps=n_intermediate_steps, timestep=timestep,
                          collision_groups=collision_groups, default_camera_mode=default_camera_mode, **viewer_params)
@@ -113,10 +159,24 @@ class LocoEnv(MultiMuJoCo):
         # specify reward function
         self._reward_function = self._get_reward_function(reward_type, reward_params)
 
+        # cursor of the reference sample of the current episode, see ReferenceTrackingReward.get_reference_cursor
+        self._reference_cursor = np.zeros(2, dtype=int) \
+            if isinstance(self._reward_function, ReferenceTrackingReward) else None
+
         # optionally use foot forces in the observation space
         self._use_foot_forces = use_foot_forces
-
-        self.info.observation_space = spaces.Box(*self._get_observation_space())
+        self._grf_aggregator = None
+
+        # the observation space of a single observation, the one of the environment covers the whole history
+        self._single_observation_space = spaces.Box(*self._get_observation_space())
+        if obs_history_length > 1:
+            self.info.observation_space = spaces.Box(np.tile(self._single_observation_space.low, obs_history_length),
+                                                     np.tile(self._single_observation_space.high, obs_history_length))
+            self._obs_history = ObservationHistory(obs_history_length, self._single_observation_space.shape[0],
+                                                   copy=not obs_history_view)
+        else:
+            self.info.observation_space = self._single_observation_space
+            self._obs_history = None
 
         # the action space is supposed to be between -1 and 1, so we normalize it
         low, high = self.info.action_space.low.copy(), self.info.action_space.high.copy()
@@ -131,6 +191,12 @@ class LocoEnv(MultiMuJoCo):
         # dataset dummy
         self._dataset = None
 
+        # banks of the simulation states of all trajectory samples per model, computed on the first reset
+        self._reset_state_banks = dict()
+
+        # layout of the flat environment state, computed on the first call to get_state or set_state
+        self._state_layout = None
+
         if traj_params:
             self.trajectories = None
             self.load_trajectory(traj_params)
@@ -142,26 +208,67 @@ class LocoEnv(MultiMuJoCo):
 
         self._use_absorbing_states = use_absorbing_states
 
+        # precompute the addresses of the root joints reported in the info dictionary
+        self._compact_info = compact_info
+        self._info_joint_tables = [self._build_info_joint_table(m) for m in self._models]
+        n_info_joints = len(self._info_joint_tables[self._current_model_idx][0])
+        self._info_qpos = np.zeros(n_info_joints)
+        self._info_qvel = np.zeros(n_info_joints)
+
+        # compile the observation of each model into a flat gather plan
+        self._obs_compilers = [self._compile_observation(obs_helper, model)
+                               for obs_helper, model in zip(self.obs_helpers, self._models)]
+        self._obs_buffer = np.zeros(self._obs_compilers[self._current_model_idx].size)
+
     def step(self, action):
 
-        obs, reward, absorbing, info = super().step(action)
+        cur_obs = self._obs.copy()
 
-        model = self._model
-        data = self._data
+        action = self._preprocess_action(action)
 
-        qpos_dict = {}
-        qvel_dict = {}
+        self._step_init(cur_obs, action)
 
-        for joint_name in ["pelvis_tx", "pelvis_tz", "pelvis_ty", "pelvis_tilt", "pelvis_list", "pelvis_rotation"]:
-            joint_id = mujoco.mj_name2id(model, mujoco.mjtObj.mjOBJ_JOINT, joint_name)
-            joint_qposadr = model.jnt_qposadr[joint_id]
-            joint_qveladr = model.jnt_dofadr[joint_id]
+        ctrl_action = None
+
+        for i in range(self._n_intermediate_steps):
+
+            if self._recompute_action_per_step or ctrl_action is None:
+                ctrl_action = self._compute_action(cur_obs, action)
+                self._data.ctrl[self._action_indices] = ctrl_action
+
+            self._simulation_pre_step()
+
+            mujoco.mj_step(self._model, self._data, self._n_substeps)
+
+            self._simulation_post_step()
+
+            if self._recompute_action_per_step:
+                cur_obs = self._build_observation()
+
+        if not self._recompute_action_per_step:
+            cur_obs = self._build_observation()
+
+        self._step_finalize()
 
-            qpos_dict[joint_name] = data.qpos[joint_qposadr]
-            qvel_dict[joint_name] = data.qvel[joint_qveladr]
+        absorbing = self.is_absorbing(cur_obs)
+        reward = self.reward(self._obs, action, cur_obs, absorbing)
+        info = self._create_info_dictionary(cur_obs)
 
-            info['qpos'] = qpos_dict
-            info['qvel'] = qvel_dict
+        self._obs = cur_obs
+        obs = self._modify_observation(cur_obs)
+        if self._obs_history is not None:
+            obs = self._obs_history.append(obs)
+
+        joint_names, qpos_adr, qvel_adr = self._info_joint_tables[self._current_model_idx]
+
+        if self._compact_info:
+            np.take(self._data.qpos, qpos_adr, out=self._info_qpos)
+            np.take(self._data.qvel, qvel_adr, out=self._info_qvel)
+            info["qpos"] = self._info_qpos
+            info["qvel"] = self._info_qvel
+        else:
+            info["qpos"] = dict(zip(joint_names, self._data.qpos[qpos_adr]))
+            info["qvel"] = dict(zip(joint_names, self._data.qvel[qvel_adr]))
 
         return obs, reward, absorbing, info
 
@@ -180,8 +287,8 @@ class LocoEnv(MultiMuJoCo):
             warnings.warn("New trajectories loaded, which overrides the old ones.", RuntimeWarning)
 
         self.trajectories = Trajectory(keys=self.get_all_observation_keys(),
-                                       low=self.info.observation_space.low,
-                                       high=self.info.observation_space.high,
+                                       low=self._single_observation_space.low,
+                                       high=self._single_observation_space.high,
                                        joint_pos_idx=self.obs_helper.joint_pos_idx,
                                        interpolate_map=self._interpolate_map,
                                        interpolate_remap=self._interpolate_remap,
@@ -190,28 +297,59 @@ class LocoEnv(MultiMuJoCo):
                                        warn=warn,
                                        **traj_params)
 
+        self._reset_state_banks = dict()
+        self._state_layout = None
+
+        if isinstance(self._reward_function, ReferenceTrackingReward):
+            self._reward_function.set_trajectory(self.trajectories)
+
     def reward(self, state, action, next_state, absorbing):
         """
         Calls the reward function of the environment.
 
         """
 
+        if self._reference_cursor is not None:
+            reference_idx = np.array([ReferenceTrackingReward.advance_cursor(self._reference_cursor)])
+            return self.reward_batch(None, None, next_state[None], None, reference_idx)[0]
+
         return self._reward_function(state, action, next_state, absorbing)
 
+    def reward_batch(self, states, actions, next_states, absorbing, reference_idx=None):
+        """
+        Calls the reward function of the environment on a batch of transitions.
+
+        Args:
+            states (np.array): Batch of last states with shape (N, dim_state).
+            actions (np.array): Batch of applied actions with shape (N, dim_action).
+            next_states (np.array): Batch of current states with shape (N, dim_state).
+            absorbing (np.array): Batch of absorbing flags with shape (N,).
+            reference_idx (np.array): Indices of the reference samples of the transitions with shape (N,), which
+                are required by the reference tracking reward if the transitions belong to different episodes.
+
+        Returns:
+            np.array of rewards with shape (N,).
+
+        """
+
+        if reference_idx is not None:
+            return self._reward_function.call_batch(states, actions, next_states, absorbing,
+                                                    reference_idx=reference_idx)
+
+        return self._reward_function.call_batch(states, actions, next_states, absorbing)
+
     def reset(self, obs=None):
 
         mujoco.mj_resetData(self._model, self._data)
         self.mean_grf.reset()
 
-        if self._domain_rand is not None:
-            self._models[self._current_model_idx] = self._domain_rand.get_randomized_model(self._current_model_idx)
-            self._datas[self._current_model_idx] = mujoco.MjData(self._models[self._current_model_idx])
-
-        if self._random_env_reset:
-            self._current_model_idx = np.random.randint(0, len(self._models))
+        if self._prepared_reset is not None:
+            # the next model was prepared in the background during the last episode
+            self._swap_prepared_reset(self._prepared_reset.result())
+            self._prepared_reset = None
         else:
-            self._current_model_idx = self._current_model_idx + 1 \
-                if self._current_model_idx < len(self._models) - 1 else 0
+            self._randomize_model(self._current_model_idx)
+            self._current_model_idx = self._sample_next_model_idx()
 
         self._model = self._models[self._current_model_idx]
         self._data = self._datas[self._current_model_idx]
@@ -219,11 +357,23 @@ class LocoEnv(MultiMuJoCo):
 
         self.setup(obs)
 
+        if self._reference_cursor is not None and self.trajectories is not None:
+            self._reference_cursor = self._reward_function.get_reference_cursor()
+
         if self._viewer is not None and self.more_than_one_env:
             self._viewer.load_new_model(self._model)
 
-        self._obs = self._create_observation(self.obs_helper._build_obs(self._data))
-        return self._modify_observation(self._obs)
+        self._set_observation_constants(self._obs_buffer, self._obs_compilers[self._current_model_idx])
+        self._obs = self._build_observation()
+        obs = self._modify_observation(self._obs)
+        if self._obs_history is not None:
+            self._obs_history.reset(obs)
+            obs = self._obs_history.get()
+
+        if self._reset_executor is not None:
+            self._prepared_reset = self._reset_executor.submit(self._prepare_reset, self._sample_next_model_idx())
+
+        return obs
 
     def setup(self, obs):
         """
@@ -249,19 +399,49 @@ class LocoEnv(MultiMuJoCo):
 
             if self.trajectories is not None:
                 if self._random_start:
-                    sample = self.trajectories.reset_trajectory()
+                    self._reset_from_trajectory()
                 elif self._init_step_no is not None:
                     traj_len = self.trajectories.trajectory_length
                     n_traj = self.trajectories.number_of_trajectories
                     assert self._init_step_no <= traj_len * n_traj
                     substep_no = int(self._init_step_no % traj_len)
                     traj_no = int(self._init_step_no / traj_len)
-                    sample = self.trajectories.reset_trajectory(substep_no, traj_no)
+                    self._reset_from_trajectory(substep_no, traj_no)
                 else:
                     # sample random trajectory and use the first sample
-                    sample = self.trajectories.reset_trajectory(substep_no=0)
+                    self._reset_from_trajectory(substep_no=0)
 
-                self.set_sim_state(sample)
+    def stop(self):
+        """
+        Stops the viewer and waits for the preparation of the next episode, such that no work is running in the
+        background. The environment can still be reset afterwards.
+
+        """
+
+        super().stop()
+
+        if self._prepared_reset is not None and not self._prepared_reset.cancelled():
+            self._prepared_reset.exception()
+
+    def close(self):
+        """
+        Releases all resources of the environment, i.e., the viewer, the background thread preparing the next
+        episode and the randomized models prefetched by the compile service. The environment can not be used
+        afterwards.
+
+        """
+
+        if self._prepared_reset is not None:
+            self._prepared_reset.cancel()
+        self.stop()
+        self._prepared_reset = None
+
+        if self._reset_executor is not None:
+            self._reset_executor.shutdown(wait=True)
+            self._reset_executor = None
+
+        if self._domain_rand is not None:
+            self._domain_rand.close()
 
     def is_absorbing(self, obs):
         """
@@ -277,6 +457,23 @@ class LocoEnv(MultiMuJoCo):
 
         return self._has_fallen(obs) if self._use_absorbing_states else False
 
+    def is_absorbing_batch(self, obs):
+        """
+        Checks which observations in a batch are absorbing states.
+
+        Args:
+            obs (np.array): Batch of observations with shape (N, dim_obs).
+
+        Returns:
+            np.array of booleans with shape (N,). True means that the respective observation is an absorbing state.
+
+        """
+
+        if self._use_absorbing_states:
+            return self._has_fallen_batch(obs)
+        else:
+            return np.zeros(len(obs), dtype=bool)
+
     def get_kinematic_obs_mask(self):
         """
         Returns a mask (np.array) for the observation specified in observation_spec (or part of it).
@@ -316,13 +513,14 @@ class LocoEnv(MultiMuJoCo):
             if self.trajectories is not None:
                 dataset = self.trajectories.create_dataset(ignore_keys=ignore_keys)
                 # check that all state in the dataset satisfy the has fallen method.
-                for state in dataset["states"]:
-                    has_fallen, msg = self._has_fallen(state, return_err_msg=True)
-                    if has_fallen:
-                        err_msg = "Some of the states in the created dataset are terminal states. " \
-                                  "This should not happen.\n\nViolations:\n"
-                        err_msg += msg
-                        raise ValueError(err_msg)
+                has_fallen, violations = self._has_fallen_batch(dataset["states"], return_violations=True)
+                if np.any(has_fallen):
+                    err_msg = "%d of the states in the created dataset are terminal states. " \
+                              "This should not happen.\n\nViolations:\n" % np.sum(has_fallen)
+                    for name, n_violations in violations.items():
+                        if n_violations > 0:
+                            err_msg += "%s violated in %d states.\n" % (name, n_violations)
+                    raise ValueError(err_msg)
 
             else:
                 raise ValueError("No trajectory was passed to the environment. "
@@ -390,7 +588,9 @@ class LocoEnv(MultiMuJoCo):
                     self.reset()
                     sample = self.trajectories.get_current_sample()
 
-                obs = self._create_observation(np.concatenate(sample))
+                # the flat sample is used for the observation and to set the simulation state in the next step
+                sample = self.trajectories.flatten_sample(sample)
+                obs = self._create_observation(sample)
                 if self._has_fallen(obs):
                     print("Has fallen!")
 
@@ -500,24 +700,155 @@ class LocoEnv(MultiMuJoCo):
 
     def set_sim_state(self, sample):
         """
-        Sets the state of the simulation according to an observation.
+        Sets the state of the simulation according to an observation. The sample is written to the
+        simulation with the precomputed scatter plan of the current model.
 
         Args:
-            sample (list or np.array): Sample used to set the state of the simulation.
+            sample (list or np.array): Sample used to set the state of the simulation. Either a list containing
+                one entry per observation in the observation specification, or a flat array of shape (dim_sample,)
+                containing the concatenation of all entries.
 
         """
 
-        obs_spec = self.obs_helper.observation_spec
-        assert len(sample) == len(obs_spec)
+        compiler = self._obs_compilers[self._current_model_idx]
+
+        if isinstance(sample, np.ndarray) and sample.ndim == 1:
+            assert len(sample) == compiler.sample_size
+        else:
+            assert len(sample) == len(self.obs_helper.observation_spec)
+            if self.trajectories is not None:
+                sample = self.trajectories.flatten_sample(sample)
+            else:
+                sample = np.concatenate([np.ravel(value) for value in sample])
+
+        compiler.scatter(self._data, sample)
+
+    def get_domain_randomization_parameters(self):
+        """
+        Returns the values of the randomized parameters of the current model, e.g., for logging.
+
+        Returns:
+            Dictionary mapping the names of the randomized parameters to their values.
+
+        """
+
+        assert self._domain_rand is not None, "No domain_randomization_config is used."
+        return dict(self._domain_rand_parameters[self._current_model_idx])
+
+    def save_domain_randomization_bank(self, bank_path, n_models, n_workers=1, seed=None):
+        """
+        Generates a bank of randomized models from the domain randomization config of the environment. The bank
+        can be passed to the environment with domain_randomization_bank to avoid compiling models during training.
+
+        Args:
+            bank_path (str): Path to the directory of the bank.
+            n_models (int): Number of randomized models per model of the environment.
+            n_workers (int): Number of processes used for compilation.
+            seed (int): Seed used to randomize the models.
+
+        """
+
+        assert self._domain_rand is not None, "A domain_randomization_config is required to generate a bank."
+        self._domain_rand.save_bank(bank_path, n_models, n_workers, seed)
+
+    def get_state(self, out=None):
+        """
+        Captures the full state of the environment in a flat array. The state contains the index of the current
+        model, the physics state (qpos, qvel, act, ctrl, time and the warm-start accelerations), the current
+        observation, the position in the trajectories and all Python-side state of the current episode (see
+        _get_episode_state_attributes). The environment has to be reset before calling this function.
+
+        Args:
+            out (np.array): Array of shape (dim_state,) the state is written to. If None, a new array is allocated.
+
+        Returns:
+            The state as np.array of shape (dim_state,).
 
-        for key_name_ot, value in zip(obs_spec, sample):
-            key, name, ot = key_name_ot
-            if ot == ObservationType.JOINT_POS:
-                self._data.joint(name).qpos = value
-            elif ot == ObservationType.JOINT_VEL:
-                self._data.joint(name).qvel = value
-            elif ot == ObservationType.SITE_ROT:
-                self._data.site(name).xmat = value
+        """
+
+        return self._get_state_layout().get(self, out)
+
+    def set_state(self, state):
+        """
+        Restores a state captured with get_state. The environment continues exactly from the captured state.
+
+        Args:
+            state (np.array): State of shape (dim_state,).
+
+        """
+
+        layout = self._get_state_layout()
+
+        # the model has to be switched before its data structure is written
+        self._current_model_idx = int(state[0])
+        self._model = self._models[self._current_model_idx]
+        self._data = self._datas[self._current_model_idx]
+        self.obs_helper = self.obs_helpers[self._current_model_idx]
+
+        # the last observation might have been returned by step, so it is not overwritten in place
+        self._obs = np.empty_like(self._obs)
+
+        layout.set(self, state)
+
+    def _get_state_layout(self):
+        """
+        Returns the layout of the flat environment state. The layout is computed on the first call.
+
+        """
+
+        if self._state_layout is None:
+            assert self._obs is not None, "Please reset the environment before capturing its state."
+
+            paths = [("_current_model_idx",)]
+            paths += [("_data", attr) for attr in ["qpos", "qvel", "act", "ctrl", "time", "qacc_warmstart"]]
+            if self.trajectories is not None:
+                paths += [("trajectories", "traj_no"), ("trajectories", "subtraj_step_no")]
+                if self.trajectories.packed:
+                    paths += [("trajectories", "_xy_offset")]
+            paths += [(attr,) for attr in self._get_episode_state_attributes()]
+
+            self._state_layout = StateLayout(self, paths)
+
+        return self._state_layout
+
+    def _reset_from_trajectory(self, substep_no=None, traj_no=None):
+        """
+        Resets the trajectory and sets the state of the simulation to the chosen sample. If the trajectories
+        are packed, the state is copied from the reset state bank of the current model.
+
+        Args:
+            substep_no (int, None): Starting point of the trajectory.
+                If None, the trajectory starts from a random point.
+            traj_no (int, None): Number of the trajectory to start from.
+                If None, it starts from a random trajectory
+
+        """
+
+        bank = self._get_reset_state_bank()
+
+        if bank is None:
+            sample = self.trajectories.reset_trajectory(substep_no, traj_no)
+            self.set_sim_state(sample)
+        else:
+            self.trajectories.reset_cursor(substep_no, traj_no)
+            bank.set_state(self._data, self.trajectories.traj_no, self.trajectories.subtraj_step_no)
+
+    def _get_reset_state_bank(self):
+        """
+        Returns the reset state bank of the current model. The bank is computed on the first call for each
+        model. Returns None, if the trajectories are not packed.
+
+        """
+
+        if not self.trajectories.packed:
+            return None
+
+        if self._current_model_idx not in self._reset_state_banks.keys():
+            keys = [obs_spec[0] for obs_spec in self.obs_helper.observation_spec]
+            self._reset_state_banks[self._current_model_idx] = \
+                ResetStateBank(self.trajectories, self._obs_compilers[self._current_model_idx], self._model, keys)
+
+        return self._reset_state_banks[self._current_model_idx]
 
     def load_dataset_and_get_traj_files(self, dataset_path, freq=None):
         """
@@ -626,6 +957,69 @@ class LocoEnv(MultiMuJoCo):
 
         return obs
 
+    def _compile_observation(self, obs_helper, model):
+        """
+        Compiles the observation of a model into a flat gather plan. Environments extending the observation
+        in _create_observation have to reserve the respective entries as tails of the compiler.
+
+        Args:
+            obs_helper (ObservationHelper): Observation helper of the model.
+            model (MjModel): Mujoco model.
+
+        Returns:
+            An ObservationCompiler.
+
+        """
+
+        compiler = ObservationCompiler(obs_helper, model)
+        if self._use_foot_forces:
+            compiler.add_tail("foot_forces", self._get_grf_size())
+
+        return compiler
+
+    def _build_observation(self):
+        """
+        Builds the observation of the current simulation state with the compiled gather plan. This is
+        equivalent to calling _create_observation on the output of the observation helper, but the
+        observation is written to a preallocated buffer.
+
+        Returns:
+            New observation vector (np.array).
+
+        """
+
+        compiler = self._obs_compilers[self._current_model_idx]
+        compiler.build(self._data, self._obs_buffer)
+        self._update_observation(self._obs_buffer, compiler)
+
+        return self._obs_buffer.copy()
+
+    def _update_observation(self, obs, compiler):
+        """
+        Writes all entries of the observation that are not part of the simulation state, but change at every step.
+
+        Args:
+            obs (np.array): Observation buffer to be modified.
+            compiler (ObservationCompiler): Compiler of the current model.
+
+        """
+
+        if self._use_foot_forces:
+            obs[compiler.get_tail("foot_forces")] = self.mean_grf.mean / 1000.
+
+    def _set_observation_constants(self, obs, compiler):
+        """
+        Writes all entries of the observation that are constant during an episode. This function is called
+        once at the beginning of each episode.
+
+        Args:
+            obs (np.array): Observation buffer to be modified.
+            compiler (ObservationCompiler): Compiler of the current model.
+
+        """
+
+        pass
+
     def _preprocess_action(self, action):
         """
         This function preprocesses all actions. All actions in this environment expected to be between -1 and 1.
@@ -689,17 +1083,25 @@ class LocoEnv(MultiMuJoCo):
 
     def _get_ground_forces(self):
         """
-        Returns the ground forces (np.array). By default, 4 ground force sensors are used.
-        Environments that use more or less have to override this function.
+        Returns the ground forces (np.array). The linear forces between the floor and each collision group returned
+        by :code:`_get_ground_force_groups` are computed with a single pass over all contacts.
+
+        """
+
+        if self._grf_aggregator is None:
+            pairs = [("floor", group) for group in self._get_ground_force_groups()]
+            self._grf_aggregator = ContactForceAggregator(self._model, self.collision_groups, pairs)
+
+        return self._grf_aggregator(self._model, self._data)[:, :3].ravel()
 
+    def _get_ground_force_groups(self):
         """
+        Returns the names of the collision groups for which the ground forces are computed. By default, 4 ground
+        force sensors are used. Environments that use more or less have to override this function.
 
-        grf = np.concatenate([self._get_collision_force("floor", "foot_r")[:3],
-                              self._get_collision_force("floor", "front_foot_r")[:3],
-                              self._get_collision_force("floor", "foot_l")[:3],
-                              self._get_collision_force("floor", "front_foot_l")[:3]])
+        """
 
-        return grf
+        return ["foot_r", "front_foot_r", "foot_l", "front_foot_l"]
 
     def _get_reward_function(self, reward_type, reward_params):
         """
@@ -726,6 +1128,19 @@ class LocoEnv(MultiMuJoCo):
             assert len(x_idx) == 1
             x_idx = x_idx[0]
             reward_func = PosReward(pos_idx=x_idx)
+        elif reward_type == "reference_tracking":
+            # the reference trajectory is set once the trajectories are loaded
+            pos_keys, vel_keys = [], []
+            for key, name, obs_type in self.obs_helper.observation_spec[2:]:
+                if obs_type == ObservationType.JOINT_POS:
+                    pos_keys.append(key)
+                elif obs_type == ObservationType.JOINT_VEL:
+                    vel_keys.append(key)
+            pos_idx = [i for key in pos_keys for i in self.get_obs_idx(key)]
+            vel_idx = [i for key in vel_keys for i in self.get_obs_idx(key)]
+            reward_params = dict() if reward_params is None else reward_params
+            reward_func = ReferenceTrackingReward(pos_keys=pos_keys, pos_idx=pos_idx, vel_keys=vel_keys,
+                                                  vel_idx=vel_idx, **reward_params)
         elif reward_type is None:
             reward_func = NoReward()
         else:
@@ -751,7 +1166,8 @@ class LocoEnv(MultiMuJoCo):
 
     def _get_from_obs(self, obs, keys):
         """
-        Returns a part of the observation based on the specified keys.
+        Returns a part of the observation based on the specified keys. Works on a single observation
+        as well as on a batch of observations.
 
         Args:
             obs (np.array): Observation array.
@@ -764,38 +1180,46 @@ class LocoEnv(MultiMuJoCo):
 
         """
 
-        # obs has removed x and y positions, add dummy entries
-        obs = np.concatenate([[0.0, 0.0], obs])
-        if type(keys) != list:
-            assert type(keys) == str
-            keys = list(keys)
+        idx = self._get_idx(keys)
 
-        entries = []
-        for key in keys:
-            entries.append(self.obs_helper.get_from_obs(obs, key))
+        if idx.size > 0 and idx.min() < 0:
+            # obs has removed x and y positions, add dummy entries
+            obs = np.concatenate([np.zeros(obs.shape[:-1] + (2,)), obs], axis=-1)
+            idx = idx + 2
 
-        return np.concatenate(entries)
+        return obs[..., idx]
 
     def _get_idx(self, keys):
         """
-        Returns the indices of the specified keys.
+        Returns the indices of the specified keys. The indices are resolved once per model and key tuple
+        and cached afterwards.
+
         Args:
             keys (list or str): List of keys or just one key which are
                 used to get the indices from the observation space.
 
         Returns:
-             np.array including the indices of the specified keys.
+             Read-only np.array including the indices of the specified keys.
 
         """
+
         if type(keys) != list:
             assert type(keys) == str
             keys = [keys]
 
-        entries = []
-        for key in keys:
-            entries.append(self.obs_helper.obs_idx_map[key])
+        cache_key = (self._current_model_idx, tuple(keys))
+        idx = self._obs_idx_cache.get(cache_key)
+
+        if idx is None:
+            entries = []
+            for key in keys:
+                entries.append(self.obs_helper.obs_idx_map[key])
 
-        return np.concatenate(entries) - 2
+            idx = np.concatenate(entries).astype(int) - 2
+            idx.flags.writeable = False
+            self._obs_idx_cache[cache_key] = idx
+
+        return idx
 
     def _len_qpos_qvel(self):
         """
@@ -811,19 +1235,278 @@ class LocoEnv(MultiMuJoCo):
 
     def _has_fallen(self, obs, return_err_msg=False):
         """
-        Checks if a model has fallen. This has to be implemented for each environment.
-        
+        Checks if a model has fallen. By default, the observation is compared to the bounds returned by
+        _get_fallen_bounds in a single vectorized comparison.
+
         Args:
             obs (np.array): Current observation.
             return_err_msg (bool): If True, an error message with violations is returned.
 
         Returns:
             True, if the model has fallen for the current observation, False otherwise.
+            Optionally an error message is returned.
 
         """
-        
+
+        names, idx, low, high = self._get_compiled_fallen_bounds()
+
+        values = obs[idx]
+        violations = (values < low) | (values > high)
+        has_fallen = violations.any()
+
+        if return_err_msg:
+            error_msg = ""
+            for i in np.flatnonzero(violations):
+                error_msg += "%s violated.\n" % names[i]
+
+            return has_fallen, error_msg
+        else:
+            return has_fallen
+
+    def _has_fallen_batch(self, obs, return_violations=False):
+        """
+        Checks for a batch of observations if the model has fallen. The check is vectorized if the environment
+        implements _get_fallen_bounds or _get_fallen_conditions. Otherwise, _has_fallen is called on each
+        observation.
+
+        Args:
+            obs (np.array): Batch of observations with shape (N, dim_obs).
+            return_violations (bool): If True, a dictionary mapping the name of each condition to the
+                number of observations violating it is returned as well.
+
+        Returns:
+            np.array of booleans with shape (N,). True means that the model has fallen for the respective observation.
+            Optionally the dictionary of violation counts is returned.
+
+        """
+
+        obs = np.atleast_2d(obs)
+
+        if type(self)._get_fallen_bounds is LocoEnv._get_fallen_bounds and \
+                type(self)._get_fallen_conditions is LocoEnv._get_fallen_conditions:
+            results = [self._has_fallen(o, return_err_msg=True) for o in obs]
+            has_fallen = np.array([r[0] for r in results], dtype=bool)
+            violations = dict()
+            for _, msg in results:
+                for line in msg.splitlines():
+                    name = line.replace(" violated.", "")
+                    violations[name] = violations.get(name, 0) + 1
+        else:
+            conditions = self._get_fallen_conditions(obs)
+            has_fallen = np.zeros(len(obs), dtype=bool)
+            for condition in conditions.values():
+                has_fallen |= condition
+            violations = {name: int(np.sum(condition)) for name, condition in conditions.items()}
+
+        if return_violations:
+            return has_fallen, violations
+        else:
+            return has_fallen
+
+    def _get_fallen_conditions(self, obs):
+        """
+        Returns all conditions that define if a model has fallen, evaluated on a batch of observations.
+        By default, the conditions are computed from the bounds returned by _get_fallen_bounds.
+
+        Args:
+            obs (np.array): Batch of observations with shape (N, dim_obs).
+
+        Returns:
+            Dictionary mapping the name of each condition to a np.array of booleans with shape (N,).
+            True means that the respective observation violates the condition.
+
+        """
+
+        names, idx, low, high = self._get_compiled_fallen_bounds()
+
+        values = obs[:, idx]
+        violations = (values < low) | (values > high)
+
+        return {name: violations[:, i] for i, name in enumerate(names)}
+
+    def _get_fallen_bounds(self):
+        """
+        Returns the table of bounds defining if the model has fallen. Each row consists of the name of the
+        condition, the key of the observation and its lower and upper bound. A condition is violated if the
+        observation is outside of its bounds. This has to be implemented for each environment.
+
+        Returns:
+            List of tuples (condition name, key, low, high).
+
+        """
+
         raise NotImplementedError
 
+    def _get_compiled_fallen_bounds(self):
+        """
+        Compiles the table of bounds returned by _get_fallen_bounds for the current model. The result is cached.
+
+        Returns:
+            Tuple of the condition names (list) and the indices, lower and upper bounds (np.arrays) of the
+            observations.
+
+        """
+
+        compiled = self._fallen_bounds_cache.get(self._current_model_idx)
+
+        if compiled is None:
+            bounds = self._get_fallen_bounds()
+            names = [name for name, _, _, _ in bounds]
+            idx = np.array([self._get_idx(key)[0] for _, key, _, _ in bounds], dtype=int)
+            low = np.array([low for _, _, low, _ in bounds], dtype=float)
+            high = np.array([high for _, _, _, high in bounds], dtype=float)
+            compiled = (names, idx, low, high)
+            self._fallen_bounds_cache[self._current_model_idx] = compiled
+
+        return compiled
+
+    def _randomize_model(self, model_idx):
+        """
+        Randomizes a model, either in place or by replacing it with a newly compiled one together with its
+        data structure, info joint table and observation compiler.
+
+        Args:
+            model_idx (int): Index of the model.
+
+        """
+
+        if self._domain_rand is None:
+            return
+
+        if not self._domain_rand.needs_recompilation:
+            self._domain_rand.randomize_model(model_idx, self._models[model_idx], self._datas[model_idx])
+        else:
+            self._install_model(model_idx, *self._build_randomized_model(model_idx))
+
+        self._domain_rand_parameters[model_idx] = self._domain_rand.get_sampled_parameters(model_idx)
+
+    def _build_randomized_model(self, model_idx):
+        """
+        Builds a randomized model together with all structures depending on it.
+
+        Args:
+            model_idx (int): Index of the model.
+
+        Returns:
+            Tuple of the model, its data structure, its info joint table and its observation compiler.
+
+        """
+
+        model = self._domain_rand.get_randomized_model(model_idx)
+
+        return model, mujoco.MjData(model), self._build_info_joint_table(model), \
+            self._compile_observation(self.obs_helpers[model_idx], model)
+
+    def _install_model(self, model_idx, model, data, info_joint_table, obs_compiler):
+        """
+        Replaces a model together with all structures depending on it.
+
+        """
+
+        self._models[model_idx] = model
+        self._datas[model_idx] = data
+        self._info_joint_tables[model_idx] = info_joint_table
+        self._obs_compilers[model_idx] = obs_compiler
+
+    def _sample_next_model_idx(self):
+        """
+        Returns the index of the model used in the next episode.
+
+        """
+
+        if self._random_env_reset:
+            return np.random.randint(0, len(self._models))
+        else:
+            return self._current_model_idx + 1 if self._current_model_idx < len(self._models) - 1 else 0
+
+    def _prepare_reset(self, model_idx):
+        """
+        Prepares the model of the next episode. This function runs on a background thread while the current
+        episode is running, hence it must not modify the state of the environment.
+
+        Args:
+            model_idx (int): Index of the model used in the next episode.
+
+        Returns:
+            Dictionary containing the index of the model and, if the model is recompiled, the randomized model,
+            its dependent structures and the sampled parameters.
+
+        """
+
+        prepared = dict(model_idx=model_idx)
+        if self._domain_rand is not None and self._domain_rand.needs_recompilation:
+            prepared["model"] = self._build_randomized_model(model_idx)
+            prepared["parameters"] = self._domain_rand.get_sampled_parameters(model_idx)
+
+        return prepared
+
+    def _swap_prepared_reset(self, prepared):
+        """
+        Switches to the model prepared by _prepare_reset. Models randomized in place are randomized here, as
+        they are in use during the preparation.
+
+        """
+
+        model_idx = prepared["model_idx"]
+        if "model" in prepared:
+            self._install_model(model_idx, *prepared["model"])
+            self._domain_rand_parameters[model_idx] = prepared["parameters"]
+        else:
+            self._randomize_model(model_idx)
+
+        self._current_model_idx = model_idx
+
+    def _modifies_models_at_reset(self):
+        """
+        Returns True if the models are modified in place at reset (e.g., by domain randomization). In this case,
+        the models can not be shared between several simulations of the environment.
+
+        """
+
+        return self._domain_rand is not None
+
+    def _get_episode_state_attributes(self):
+        """
+        Returns the names of all attributes holding Python-side state of the current episode, which is not
+        contained in the Mujoco data structure. Environments that keep additional state (e.g., a goal) have
+        to extend this list.
+
+        """
+
+        attributes = ["mean_grf", "_obs_buffer", "_obs"]
+        if self._obs_history is not None:
+            attributes.append("_obs_history")
+        if self._reference_cursor is not None:
+            attributes.append("_reference_cursor")
+
+        return attributes
+
+    def _build_info_joint_table(self, model):
+        """
+        Resolves the root joints reported in the info dictionary of the step function to their addresses
+        in qpos and qvel. Joints that do not exist in the model are skipped.
+
+        Args:
+            model: Mujoco model.
+
+        Returns:
+            Tuple of the list of joint names found in the model, and two np.arrays containing their
+            addresses in qpos and qvel.
+
+        """
+
+        joint_names = []
+        qpos_adr = []
+        qvel_adr = []
+        for joint_name in self._info_joint_names:
+            joint_id = mujoco.mj_name2id(model, mujoco.mjtObj.mjOBJ_JOINT, joint_name)
+            if joint_id != -1:
+                joint_names.append(joint_name)
+                qpos_adr.append(model.jnt_qposadr[joint_id])
+                qvel_adr.append(model.jnt_dofadr[joint_id])
+
+        return joint_names, np.array(qpos_adr, dtype=int), np.array(qvel_adr, dtype=int)
+
     def _get_interpolate_map_params(self):
         """
         Returns all parameters needed to do the interpolation mapping for the respective environment.
@@ -991,6 +1674,8 @@ class LocoEnv(MultiMuJoCo):
 
     _registered_envs = dict()
 
+    _info_joint_names = ["pelvis_tx", "pelvis_tz", "pelvis_ty", "pelvis_tilt", "pelvis_list", "pelvis_rotation"]
+
 
 class ValidTaskConf:
 
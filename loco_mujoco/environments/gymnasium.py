@@ -92,7 +92,7 @@ class GymnasiumWrapper(Env):
         Closes the environment.
 
         """
-        self._env.stop()
+        self._env.close()
 
     def create_dataset(self, **kwargs):
         """
@@ -27,6 +27,9 @@ class Atlas(BaseRobotHumanoid):
     * **Walking**: The robot has to walk forward with a fixed speed of 1.25 m/s.
     * **Carry**: The robot has to walk forward with a fixed speed of 1.25 m/s while carrying a weight.
       The mass is either specified by the user or sampled from a uniformly from [0.1 kg, 1 kg, 5 kg, 10 kg].
+      By default, one model is compiled per weight. With runtime_weight=True, a single model is compiled
+      and the mass of the weight is set at each reset instead. With weight_mass_range=(low, high), the mass is
+      sampled uniformly from the given range at each reset.
 
 
     Dataset Types
@@ -262,7 +265,7 @@ class Atlas(BaseRobotHumanoid):
 
     The terminal state is reached when the robot falls, or rather starts falling. The condition to check if the robot
     is falling is based on the orientation of the robot, the height of the center of mass, and the orientation of the
-    back joint. More details can be found in the  :code:`_has_fallen` method of the environment.
+    back joint. More details can be found in the  :code:`_get_fallen_bounds` method of the environment.
 
     Methods
     ------------
@@ -273,7 +276,7 @@ class Atlas(BaseRobotHumanoid):
                                      data_types=["real", "perfect"])
 
     def __init__(self, disable_arms=True, disable_back_joint=True, hold_weight=False,
-                 weight_mass=None, **kwargs):
+                 weight_mass=None, runtime_weight=False, weight_mass_range=None, **kwargs):
         """
         Constructor.
 
@@ -303,6 +306,11 @@ class Atlas(BaseRobotHumanoid):
         self._hold_weight = hold_weight
         self._weight_mass = weight_mass
         self._valid_weights = [0.1, 1.0, 5.0, 10.0]
+        # a single model is compiled and the mass of the weight is set at each reset
+        self._check_weight_params(hold_weight, weight_mass, runtime_weight, weight_mass_range)
+        self._runtime_weight = hold_weight and (runtime_weight or weight_mass_range is not None)
+        self._weight_mass_range = weight_mass_range
+        self._current_weight_mass = None
 
         if disable_arms or hold_weight:
             xml_handle = mjcf.from_path(xml_path)
@@ -321,6 +329,11 @@ class Atlas(BaseRobotHumanoid):
                 color_red = np.array([1.0, 0.0, 0.0, 1.0])
                 xml_handle = self._add_weight(xml_handle, weight_mass, color_red)
                 xml_handles.append(xml_handle)
+            elif self._runtime_weight:
+                # the weight is compiled with the highest mass, which is replaced at reset
+                weight_high = self._get_weight_mass_bounds()[1]
+                xml_handle = self._add_weight(xml_handle, weight_high, self._interpolate_box_color(1.0))
+                xml_handles.append(xml_handle)
             elif hold_weight and weight_mass is None:
                 for i, w in enumerate(self._valid_weights):
                     color = self._get_box_color(i)
@@ -363,59 +376,26 @@ class Atlas(BaseRobotHumanoid):
 
         return joints_to_remove, motors_to_remove, equ_constr_to_remove
 
-    def _has_fallen(self, obs, return_err_msg=False):
+    def _get_fallen_bounds(self):
         """
-        Checks if a model has fallen.
-
-        Args:
-            obs (np.array): Current observation.
-            return_err_msg (bool): If True, an error message with violations is returned.
+        Returns the table of bounds defining if the model has fallen.
 
         Returns:
-            True, if the model has fallen for the current observation, False otherwise.
-            Optionally an error message is returned.
+            List of tuples (condition name, key, low, high).
 
         """
 
-        pelvis_euler = self._get_from_obs(obs, ["q_pelvis_tilt", "q_pelvis_list", "q_pelvis_rotation"])
-        pelvis_y_condition = (obs[0] < -0.3) or (obs[0] > 0.1)
-        pelvis_tilt_condition = (pelvis_euler[0] < (-np.pi / 4.5)) or (pelvis_euler[0] > (np.pi / 12))
-        pelvis_list_condition = (pelvis_euler[1] < -np.pi / 12) or (pelvis_euler[1] > np.pi / 8)
-        pelvis_rotation_condition = (pelvis_euler[2] < (-np.pi / 10)) or (pelvis_euler[2] > (np.pi / 10))
-        pelvis_condition = (pelvis_y_condition or pelvis_tilt_condition or
-                            pelvis_list_condition or pelvis_rotation_condition)
+        bounds = [("pelvis_y_condition", "q_pelvis_ty", -0.3, 0.1),
+                  ("pelvis_tilt_condition", "q_pelvis_tilt", -np.pi / 4.5, np.pi / 12),
+                  ("pelvis_list_condition", "q_pelvis_list", -np.pi / 12, np.pi / 8),
+                  ("pelvis_rotation_condition", "q_pelvis_rotation", -np.pi / 10, np.pi / 10)]
 
         if not self._disable_back_joint:
-            back_euler = self._get_from_obs(obs, ["q_back_bky", "q_back_bkx", "q_back_bkz"])
-
-            back_extension_condition = (back_euler[0] < (-np.pi / 4)) or (back_euler[0] > (np.pi / 10))
-            back_bending_condition = (back_euler[1] < -np.pi / 10) or (back_euler[1] > np.pi / 10)
-            back_rotation_condition = (back_euler[2] < (-np.pi / 4.5)) or (back_euler[2] > (np.pi / 4.5))
-            back_condition = (back_extension_condition or back_bending_condition or back_rotation_condition)
-        else:
-            back_condition = back_extension_condition = back_bending_condition = back_rotation_condition = False
-
-        if return_err_msg:
-            error_msg = ""
-            if pelvis_y_condition:
-                error_msg += "pelvis_y_condition violated.\n"
-            elif pelvis_tilt_condition:
-                error_msg += "pelvis_tilt_condition violated.\n"
-            elif pelvis_list_condition:
-                error_msg += "pelvis_list_condition violated.\n"
-            elif pelvis_rotation_condition:
-                error_msg += "pelvis_rotation_condition violated.\n"
-            elif back_extension_condition:
-                error_msg += "back_extension_condition violated.\n"
-            elif back_bending_condition:
-                error_msg += "back_bending_condition violated.\n"
-            elif back_rotation_condition:
-                error_msg += "back_rotation_condition violated.\n"
-
-            return pelvis_condition or back_condition, error_msg
-        else:
+            bounds += [("back_extension_condition", "q_back_bky", -np.pi / 4, np.pi / 10),
+                       ("back_bending_condition", "q_back_bkx", -np.pi / 10, np.pi / 10),
+                       ("back_rotation_condition", "q_back_bkz", -np.pi / 4.5, np.pi / 4.5)]
 
-            return pelvis_condition or back_condition
+        return bounds
 
     @staticmethod
     def generate(task="walk", dataset_type="real", **kwargs):
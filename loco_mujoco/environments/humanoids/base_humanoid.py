@@ -126,58 +126,25 @@ class BaseHumanoid(LocoEnv):
 
         return joints_to_remove, motors_to_remove, equ_constr_to_remove, collision_groups
 
-    def _has_fallen(self, obs, return_err_msg=False):
+    def _get_fallen_bounds(self):
         """
-        Checks if a model has fallen.
-
-        Args:
-            obs (np.array): Current observation.
-            return_err_msg (bool): If True, an error message with violations is returned.
+        Returns the table of bounds defining if the model has fallen.
 
         Returns:
-            True, if the model has fallen for the current observation, False otherwise.
-            Optionally an error message is returned.
+            List of tuples (condition name, key, low, high).
 
         """
 
-        pelvis_euler = self._get_from_obs(obs, ["q_pelvis_tilt", "q_pelvis_list", "q_pelvis_rotation"])
-
-        pelvis_height_condition = (obs[0] < -0.46) or (obs[0] > 0.1)
-        pelvis_tilt_condition = (pelvis_euler[0] < (-np.pi / 4.5)) or (pelvis_euler[0] > (np.pi / 12))
-        pelvis_list_condition = (pelvis_euler[1] < -np.pi / 12) or (pelvis_euler[1] > np.pi / 8)
-        pelvis_rotation_condition = (pelvis_euler[2] < (-np.pi / 9)) or (pelvis_euler[2] > (np.pi / 9))
-
-        pelvis_condition = (pelvis_height_condition or pelvis_tilt_condition
-                            or pelvis_list_condition or pelvis_rotation_condition)
-
-        lumbar_euler = self._get_from_obs(obs, ["q_lumbar_extension", "q_lumbar_bending", "q_lumbar_rotation"])
-
-        lumbar_extension_condition = (lumbar_euler[0] < (-np.pi / 4)) or (lumbar_euler[0] > (np.pi / 10))
-        lumbar_bending_condition = (lumbar_euler[1] < -np.pi / 10) or (lumbar_euler[1] > np.pi / 10)
-        lumbar_rotation_condition = (lumbar_euler[2] < (-np.pi / 4.5)) or (lumbar_euler[2] > (np.pi / 4.5))
-
-        lumbar_condition = (lumbar_extension_condition or lumbar_bending_condition or lumbar_rotation_condition)
-
-        if return_err_msg:
-            error_msg = ""
-            if pelvis_height_condition:
-                error_msg += "pelvis_height_condition violated.\n"
-            if pelvis_tilt_condition:
-                error_msg += "pelvis_tilt_condition violated.\n"
-            if pelvis_list_condition:
-                error_msg += "pelvis_list_condition violated.\n"
-            if pelvis_rotation_condition:
-                error_msg += "pelvis_rotation_condition violated.\n"
-            if lumbar_extension_condition:
-                error_msg += "lumbar_extension_condition violated.\n"
-            if lumbar_bending_condition:
-                error_msg += "lumbar_bending_condition violated.\n"
-            if lumbar_rotation_condition:
-                error_msg += "lumbar_rotation_condition violated.\n"
-
-            return pelvis_condition or lumbar_condition, error_msg
-        else:
-            return (pelvis_condition or lumbar_condition)
+        bounds = [("pelvis_height_condition", "q_pelvis_ty", -0.46, 0.1),
+                  ("pelvis_tilt_condition", "q_pelvis_tilt", -np.pi / 4.5, np.pi / 12),
+                  ("pelvis_list_condition", "q_pelvis_list", -np.pi / 12, np.pi / 8),
+                  ("pelvis_rotation_condition", "q_pelvis_rotation", -np.pi / 9, np.pi / 9)]
+
+        bounds += [("lumbar_extension_condition", "q_lumbar_extension", -np.pi / 4, np.pi / 10),
+                   ("lumbar_bending_condition", "q_lumbar_bending", -np.pi / 10, np.pi / 10),
+                   ("lumbar_rotation_condition", "q_lumbar_rotation", -np.pi / 4.5, np.pi / 4.5)]
+
+        return bounds
 
     def _get_grf_size(self):
         """
@@ -190,23 +157,17 @@ class BaseHumanoid(LocoEnv):
         else:
             return 12
 
-    def _get_ground_forces(self):
+    def _get_ground_force_groups(self):
         """
-        Returns the ground forces (np.array). By default, 4 ground force sensors are used.
-        Environments that use more or less have to override this function.
+        Returns the names of the collision groups for which the ground forces are computed. With box feet, one
+        ground force sensor is used per foot, otherwise two.
 
         """
 
         if self._use_box_feet:
-            grf = np.concatenate([self._get_collision_force("floor", "foot_r")[:3],
-                                  self._get_collision_force("floor", "foot_l")[:3]])
+            return ["foot_r", "foot_l"]
         else:
-            grf = np.concatenate([self._get_collision_force("floor", "foot_r")[:3],
-                                  self._get_collision_force("floor", "front_foot_r")[:3],
-                                  self._get_collision_force("floor", "foot_l")[:3],
-                                  self._get_collision_force("floor", "front_foot_l")[:3]])
-
-        return grf
+            return ["foot_r", "front_foot_r", "foot_l", "front_foot_l"]
 
     @staticmethod
     def generate(env, path, task="walk", dataset_type="real", debug=False, **kwargs):
@@ -247,8 +208,10 @@ class BaseHumanoid(LocoEnv):
             if "reward_params" in kwargs.keys():
                 reward_params = kwargs["reward_params"]
                 del kwargs["reward_params"]
-            else:
+            elif reward_type == "target_velocity":
                 reward_params = dict(target_velocity=1.25)
+            else:
+                reward_params = None
         elif task == "run":
             use_mini_dataset = not os.path.exists(Path(loco_mujoco.__file__).resolve().parent / path)
             if debug or use_mini_dataset:
@@ -262,8 +225,10 @@ class BaseHumanoid(LocoEnv):
             if "reward_params" in kwargs.keys():
                 reward_params = kwargs["reward_params"]
                 del kwargs["reward_params"]
-            else:
+            elif reward_type == "target_velocity":
                 reward_params = dict(target_velocity=2.5)
+            else:
+                reward_params = None
 
         # Generate the MDP
         mdp = env(reward_type=reward_type, reward_params=reward_params, **kwargs)
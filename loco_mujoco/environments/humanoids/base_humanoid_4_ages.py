@@ -133,17 +133,16 @@ class BaseHumanoid4Ages(BaseHumanoid):
                         curr_model = self._current_model_idx
                         valid_traj_range = self._scaling_trajectory_map[curr_model]
                         traj_no = np.random.randint(valid_traj_range[0], valid_traj_range[1])
-                        sample = self.trajectories.reset_trajectory(traj_no=traj_no)
+                        self._reset_from_trajectory(traj_no=traj_no)
                     else:
-                        sample = self.trajectories.reset_trajectory()
+                        self._reset_from_trajectory()
                 elif self._init_step_no is not None:
                     traj_len = self.trajectories.trajectory_length
                     n_traj = self.trajectories.number_of_trajectories
                     assert self._init_step_no <= traj_len * n_traj
                     substep_no = int(self._init_step_no % traj_len)
                     traj_no = int(self._init_step_no / traj_len)
-                    sample = self.trajectories.reset_trajectory(substep_no, traj_no)
-                self.set_sim_state(sample)
+                    self._reset_from_trajectory(substep_no, traj_no)
 
     def load_trajectory(self, traj_params, scaling_trajectory_map=None, warn=True):
         """
@@ -266,15 +265,52 @@ class BaseHumanoid4Ages(BaseHumanoid):
         """
 
         obs = super(BaseHumanoid4Ages, self)._create_observation(obs)
+        obs = np.concatenate([obs, self._get_current_env_id_map()])
+        return obs
+
+    def _compile_observation(self, obs_helper, model):
+        """
+        Compiles the observation of a model into a flat gather plan and reserves the environment id.
+
+        Args:
+            obs_helper (ObservationHelper): Observation helper of the model.
+            model (MjModel): Mujoco model.
+
+        Returns:
+            An ObservationCompiler.
+
+        """
+
+        compiler = super(BaseHumanoid4Ages, self)._compile_observation(obs_helper, model)
+        compiler.add_tail("env_type", len(self._get_env_id_map(0, self.n_all_models)))
+
+        return compiler
+
+    def _set_observation_constants(self, obs, compiler):
+        """
+        Writes the id of the current environment to the observation.
+
+        Args:
+            obs (np.array): Observation buffer to be modified.
+            compiler (ObservationCompiler): Compiler of the current model.
+
+        """
+
+        super(BaseHumanoid4Ages, self)._set_observation_constants(obs, compiler)
+        obs[compiler.get_tail("env_type")] = self._get_current_env_id_map()
+
+    def _get_current_env_id_map(self):
+        """
+        Returns the binary vector identifying the current environment among all scalings.
+
+        """
 
         if self.more_than_one_env:
             model_idx = self._current_model_idx
         else:
             model_idx = self._default_scalings.index(self._scalings[0])
 
-        env_id_map = self._get_env_id_map(model_idx, self.n_all_models)
-        obs = np.concatenate([obs, env_id_map])
-        return obs
+        return self._get_env_id_map(model_idx, self.n_all_models)
 
     def _get_reward_function(self, reward_type, reward_params):
         """
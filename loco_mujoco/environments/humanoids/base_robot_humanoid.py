@@ -3,6 +3,7 @@ import warnings
 from pathlib import Path
 from copy import deepcopy
 
+import mujoco
 from mushroom_rl.utils.running_stats import *
 
 import loco_mujoco
@@ -98,8 +99,9 @@ class BaseRobotHumanoid(LocoEnv):
 
         low, high = super(BaseRobotHumanoid, self)._get_observation_space()
         if self._hold_weight:
-            low = np.concatenate([low, [self._valid_weights[0]]])
-            high = np.concatenate([high, [self._valid_weights[-1]]])
+            weight_low, weight_high = self._get_weight_mass_bounds()
+            low = np.concatenate([low, [weight_low]])
+            high = np.concatenate([high, [weight_high]])
 
         return low, high
 
@@ -123,6 +125,164 @@ class BaseRobotHumanoid(LocoEnv):
 
         return obs
 
+    def _compile_observation(self, obs_helper, model):
+        """
+        Compiles the observation of a model into a flat gather plan and reserves the carried weight.
+
+        Args:
+            obs_helper (ObservationHelper): Observation helper of the model.
+            model (MjModel): Mujoco model.
+
+        Returns:
+            An ObservationCompiler.
+
+        """
+
+        compiler = super(BaseRobotHumanoid, self)._compile_observation(obs_helper, model)
+        if self._hold_weight:
+            compiler.add_tail("weight", 1)
+
+        return compiler
+
+    def _set_observation_constants(self, obs, compiler):
+        """
+        Writes the mass of the carried weight to the observation.
+
+        Args:
+            obs (np.array): Observation buffer to be modified.
+            compiler (ObservationCompiler): Compiler of the current model.
+
+        """
+
+        super(BaseRobotHumanoid, self)._set_observation_constants(obs, compiler)
+        if self._hold_weight:
+            obs[compiler.get_tail("weight")] = self._model.body("weight").mass
+
+    def setup(self, obs):
+        """
+        Function to setup the initial state of the simulation. If the mass of the carried weight is set at
+        runtime, a new mass is sampled before the initial state is set.
+
+        Args:
+            obs (np.array): Observation to initialize the environment from;
+
+        """
+
+        if self._hold_weight and self._runtime_weight:
+            self._set_weight_mass(self._sample_weight_mass())
+
+        super(BaseRobotHumanoid, self).setup(obs)
+
+    def set_state(self, state):
+        """
+        Restores a state captured with get_state. If the mass of the carried weight is set at runtime, the
+        mass of the captured episode is restored as well.
+
+        Args:
+            state (np.array): State of shape (dim_state,).
+
+        """
+
+        super(BaseRobotHumanoid, self).set_state(state)
+
+        if self._hold_weight and self._runtime_weight and \
+                self._model.body_mass[self._model.body("weight").id] != self._current_weight_mass:
+            self._set_weight_mass(self._current_weight_mass)
+            # setting the constants of the model overwrites the data, hence the state is restored again
+            self._get_state_layout().set(self, state)
+
+    @staticmethod
+    def _check_weight_params(hold_weight, weight_mass, runtime_weight, weight_mass_range):
+        """
+        Checks that the parameters of the carried weight do not contradict each other.
+
+        Args:
+            hold_weight (bool): If True, the robot carries a weight.
+            weight_mass (float): Fixed mass of the weight.
+            runtime_weight (bool): If True, the mass of the weight is set at each reset.
+            weight_mass_range (tuple): Range the mass of the weight is sampled from at each reset.
+
+        """
+
+        if not hold_weight and (runtime_weight or weight_mass_range is not None):
+            raise ValueError("The parameters runtime_weight and weight_mass_range require hold_weight=True.")
+        if weight_mass is not None and (runtime_weight or weight_mass_range is not None):
+            raise ValueError("A fixed weight_mass can not be combined with runtime_weight or weight_mass_range.")
+        if weight_mass_range is not None and not 0.0 < weight_mass_range[0] <= weight_mass_range[1]:
+            raise ValueError(f"Invalid weight_mass_range {weight_mass_range}, it has to be a tuple (low, high) "
+                             f"with 0 < low <= high.")
+
+    def _get_weight_mass_bounds(self):
+        """
+        Returns a tuple of the lowest and highest mass of the carried weight.
+
+        """
+
+        if self._weight_mass_range is not None:
+            return self._weight_mass_range[0], self._weight_mass_range[1]
+        else:
+            return self._valid_weights[0], self._valid_weights[-1]
+
+    def _sample_weight_mass(self):
+        """
+        Samples the mass of the carried weight, either uniformly from the weight_mass_range or from the
+        valid weights.
+
+        Returns:
+            The mass of the weight (float).
+
+        """
+
+        if self._weight_mass_range is not None:
+            return float(np.random.uniform(*self._weight_mass_range))
+        else:
+            return float(np.random.choice(self._valid_weights))
+
+    def _set_weight_mass(self, mass):
+        """
+        Sets the mass of the carried weight in the current model. The inertia is scaled with the mass, as the
+        shape of the weight does not change, and the color is interpolated according to the mass.
+
+        Args:
+            mass (float): New mass of the weight.
+
+        """
+
+        body_id = self._model.body("weight").id
+        self._model.body_inertia[body_id] *= mass / self._model.body_mass[body_id]
+        self._model.body_mass[body_id] = mass
+
+        low, high = self._get_weight_mass_bounds()
+        interpolation_var = (mass - low) / (high - low) if high > low else 1.0
+        self._model.geom_rgba[self._model.geom_bodyid == body_id] = self._interpolate_box_color(interpolation_var)
+
+        # the constants (e.g., subtree masses) depend on the masses of the bodies
+        mujoco.mj_setConst(self._model, self._data)
+        self._current_weight_mass = mass
+
+    def _modifies_models_at_reset(self):
+        """
+        Returns True if the models are modified in place at reset, which is also the case if the mass of the
+        carried weight is set at runtime.
+
+        """
+
+        return super(BaseRobotHumanoid, self)._modifies_models_at_reset() or \
+            (self._hold_weight and self._runtime_weight)
+
+    def _get_episode_state_attributes(self):
+        """
+        Returns the names of all attributes holding Python-side state of the current episode, including
+        the mass of the carried weight if it is set at runtime.
+
+        """
+
+        attributes = super(BaseRobotHumanoid, self)._get_episode_state_attributes()
+        if self._hold_weight and self._runtime_weight:
+            attributes.append("_current_weight_mass")
+
+        return attributes
+
     def _get_box_color(self, ind):
         """
         Calculates the rgba color based on the index of the environment.
@@ -135,9 +295,23 @@ class BaseRobotHumanoid(LocoEnv):
 
         """
 
+        return self._interpolate_box_color(ind / (len(self._valid_weights) - 1))
+
+    @staticmethod
+    def _interpolate_box_color(interpolation_var):
+        """
+        Interpolates the rgba color of the weight between blue (lightest) and red (heaviest).
+
+        Args:
+            interpolation_var (float): Interpolation variable between 0 and 1.
+
+        Returns:
+            rgba np.array.
+
+        """
+
         red_rgba = np.array([1.0, 0.0, 0.0, 1.0])
         blue_rgba = np.array([0.2, 0.0, 1.0, 1.0])
-        interpolation_var = ind / (len(self._valid_weights) - 1)
         color = blue_rgba + ((red_rgba - blue_rgba) * interpolation_var)
 
         return color
@@ -176,8 +350,10 @@ class BaseRobotHumanoid(LocoEnv):
             if "reward_params" in kwargs.keys():
                 reward_params = kwargs["reward_params"]
                 del kwargs["reward_params"]
-            else:
+            elif reward_type == "target_velocity":
                 reward_params = dict(target_velocity=1.25)
+            else:
+                reward_params = None
             
             mdp = env(reward_type=reward_type, reward_params=reward_params, **kwargs)
         
@@ -185,8 +361,10 @@ class BaseRobotHumanoid(LocoEnv):
             if "reward_params" in kwargs.keys():
                 reward_params = kwargs["reward_params"]
                 del kwargs["reward_params"]
-            else:
+            elif reward_type == "target_velocity":
                 reward_params = dict(target_velocity=1.25)
+            else:
+                reward_params = None
             
             mdp = env(hold_weight=True, reward_type=reward_type, reward_params=reward_params, **kwargs)
             
@@ -194,8 +372,10 @@ class BaseRobotHumanoid(LocoEnv):
             if "reward_params" in kwargs.keys():
                 reward_params = kwargs["reward_params"]
                 del kwargs["reward_params"]
-            else:
+            elif reward_type == "target_velocity":
                 reward_params = dict(target_velocity=2.5)
+            else:
+                reward_params = None
                 
             mdp = env(reward_type=reward_type, reward_params=reward_params, **kwargs)
 
@@ -1012,7 +1012,7 @@ class MyoSkeleton(LocoEnv):
 
     The terminal state is reached when the humanoid falls, or rather starts falling. The condition to check if the humanoid
     is falling is based on the orientation of the humanoid, the height of the center of mass, and the orientation of the
-    back joint. More details can be found in the  :code:`_has_fallen` method of the environment.
+    back joint. More details can be found in the  :code:`_get_fallen_bounds` method of the environment.
 
     Methods
     ------------
@@ -1063,25 +1063,14 @@ class MyoSkeleton(LocoEnv):
 
         super().__init__(xml_handle, action_spec, observation_spec, collision_groups, **kwargs)
 
-    def _get_ground_forces(self):
+    def _get_ground_force_groups(self):
         """
-        Returns the ground forces (np.array).
+        Returns the names of the collision groups for which the ground forces are computed.
 
         """
 
-        grf = np.concatenate([self._get_collision_force("floor", "right_foot1")[:3],
-                              self._get_collision_force("floor", "right_foot2")[:3],
-                              self._get_collision_force("floor", "right_foot3")[:3],
-                              self._get_collision_force("floor", "right_foot4")[:3],
-                              self._get_collision_force("floor", "right_foot5")[:3],
-                              self._get_collision_force("floor", "left_foot1")[:3],
-                              self._get_collision_force("floor", "left_foot2")[:3],
-                              self._get_collision_force("floor", "left_foot3")[:3],
-                              self._get_collision_force("floor", "left_foot4")[:3],
-                              self._get_collision_force("floor", "left_foot5")[:3]]
-                             )
-
-        return grf
+        return ["right_foot1", "right_foot2", "right_foot3", "right_foot4", "right_foot5",
+                "left_foot1", "left_foot2", "left_foot3", "left_foot4", "left_foot5"]
 
     def _get_xml_modifications(self):
         """
@@ -1114,58 +1103,25 @@ class MyoSkeleton(LocoEnv):
 
         return joints_to_remove, motors_to_remove, equ_constr_to_remove, collision_groups
 
-    def _has_fallen(self, obs, return_err_msg=False):
+    def _get_fallen_bounds(self):
         """
-        Checks if a model has fallen.
-
-        Args:
-            obs (np.array): Current observation.
-            return_err_msg (bool): If True, an error message with violations is returned.
+        Returns the table of bounds defining if the model has fallen.
 
         Returns:
-            True, if the model has fallen for the current observation, False otherwise.
-            Optionally an error message is returned.
+            List of tuples (condition name, key, low, high).
 
         """
 
-        pelvis_euler = self._get_from_obs(obs, ["q_pelvis_tilt", "q_pelvis_list", "q_pelvis_rotation"])
-
-        pelvis_height_condition = (obs[0] < -0.46) or (obs[0] > 0.1)
-        pelvis_tilt_condition = (pelvis_euler[0] < (-np.pi / 4.5)) or (pelvis_euler[0] > (np.pi / 12))
-        pelvis_list_condition = (pelvis_euler[1] < -np.pi / 12) or (pelvis_euler[1] > np.pi / 8)
-        pelvis_rotation_condition = (pelvis_euler[2] < (-np.pi / 9)) or (pelvis_euler[2] > (np.pi / 9))
-
-        pelvis_condition = (pelvis_height_condition or pelvis_tilt_condition
-                            or pelvis_list_condition or pelvis_rotation_condition)
-
-        lumbar_euler = self._get_from_obs(obs, ["q_L5_S1_Flex_Ext", "q_L5_S1_Lat_Bending", "q_L5_S1_axial_rotation"])
-
-        lumbar_extension_condition = (lumbar_euler[0] < (-np.pi / 4)) or (lumbar_euler[0] > (np.pi / 10))
-        lumbar_bending_condition = (lumbar_euler[1] < -np.pi / 10) or (lumbar_euler[1] > np.pi / 10)
-        lumbar_rotation_condition = (lumbar_euler[2] < (-np.pi / 4.5)) or (lumbar_euler[2] > (np.pi / 4.5))
-
-        lumbar_condition = (lumbar_extension_condition or lumbar_bending_condition or lumbar_rotation_condition)
-
-        if return_err_msg:
-            error_msg = ""
-            if pelvis_height_condition:
-                error_msg += "pelvis_height_condition violated.\n"
-            if pelvis_tilt_condition:
-                error_msg += "pelvis_tilt_condition violated.\n"
-            if pelvis_list_condition:
-                error_msg += "pelvis_list_condition violated.\n"
-            if pelvis_rotation_condition:
-                error_msg += "pelvis_rotation_condition violated.\n"
-            if lumbar_extension_condition:
-                error_msg += "lumbar_extension_condition violated.\n"
-            if lumbar_bending_condition:
-                error_msg += "lumbar_bending_condition violated.\n"
-            if lumbar_rotation_condition:
-                error_msg += "lumbar_rotation_condition violated.\n"
-
-            return pelvis_condition or lumbar_condition, error_msg
-        else:
-            return (pelvis_condition or lumbar_condition)
+        bounds = [("pelvis_height_condition", "q_pelvis_ty", -0.46, 0.1),
+                  ("pelvis_tilt_condition", "q_pelvis_tilt", -np.pi / 4.5, np.pi / 12),
+                  ("pelvis_list_condition", "q_pelvis_list", -np.pi / 12, np.pi / 8),
+                  ("pelvis_rotation_condition", "q_pelvis_rotation", -np.pi / 9, np.pi / 9)]
+
+        bounds += [("lumbar_extension_condition", "q_L5_S1_Flex_Ext", -np.pi / 4, np.pi / 10),
+                   ("lumbar_bending_condition", "q_L5_S1_Lat_Bending", -np.pi / 10, np.pi / 10),
+                   ("lumbar_rotation_condition", "q_L5_S1_axial_rotation", -np.pi / 4.5, np.pi / 4.5)]
+
+        return bounds
 
     def _get_observation_specification(self):
         """
@@ -1241,8 +1197,10 @@ class MyoSkeleton(LocoEnv):
             if "reward_params" in kwargs.keys():
                 reward_params = kwargs["reward_params"]
                 del kwargs["reward_params"]
-            else:
+            elif reward_type == "target_velocity":
                 reward_params = dict(target_velocity=1.25)
+            else:
+                reward_params = None
         elif task == "run":
             path = "datasets/humanoids/real/myosuite_humanoid_running.npz"
             use_mini_dataset = not os.path.exists(Path(loco_mujoco.__file__).resolve().parent / path)
@@ -1256,8 +1214,10 @@ class MyoSkeleton(LocoEnv):
             if "reward_params" in kwargs.keys():
                 reward_params = kwargs["reward_params"]
                 del kwargs["reward_params"]
-            else:
+            elif reward_type == "target_velocity":
                 reward_params = dict(target_velocity=2.5)
+            else:
+                reward_params = None
 
         # Generate the MDP
         mdp = MyoSkeleton(reward_type=reward_type, reward_params=reward_params, **kwargs)
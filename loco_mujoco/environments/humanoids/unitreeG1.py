@@ -233,7 +233,7 @@ class UnitreeG1(BaseRobotHumanoid):
 
     The terminal state is reached when the robot falls, or rather starts falling. The condition to check if the robot
     is falling is based on the orientation of the robot, the height of the center of mass, and the orientation of the
-    back joint. More details can be found in the  :code:`_has_fallen` method of the environment.
+    back joint. More details can be found in the  :code:`_get_fallen_bounds` method of the environment.
 
     Methods
     ------------
@@ -292,26 +292,15 @@ class UnitreeG1(BaseRobotHumanoid):
 
         super().__init__(xml_handles, action_spec, observation_spec, collision_groups, **kwargs)
 
-    def _get_ground_forces(self):
+    def _get_ground_force_groups(self):
         """
-        Calculates the ground forces (np.array). Per foot, the ground reaction force (linear --> 3D) is measured at
-        4 points resulting in a 4*3*2=24 dimensional force vector.
-
-        Returns:
-            The ground forces (np.array) vector of all foots.
+        Returns the names of the collision groups for which the ground forces are computed. Per foot, the ground
+        reaction force (linear --> 3D) is measured at 4 points resulting in a 4*3*2=24 dimensional force vector.
 
         """
 
-        grf = np.concatenate([self._get_collision_force("floor", "right_foot_1")[:3],
-                              self._get_collision_force("floor", "right_foot_2")[:3],
-                              self._get_collision_force("floor", "right_foot_3")[:3],
-                              self._get_collision_force("floor", "right_foot_4")[:3],
-                              self._get_collision_force("floor", "left_foot_1")[:3],
-                              self._get_collision_force("floor", "left_foot_2")[:3],
-                              self._get_collision_force("floor", "left_foot_3")[:3],
-                              self._get_collision_force("floor", "left_foot_4")[:3]])
-
-        return grf
+        return ["right_foot_1", "right_foot_2", "right_foot_3", "right_foot_4",
+                "left_foot_1", "left_foot_2", "left_foot_3", "left_foot_4"]
 
     @staticmethod
     def _get_grf_size():
@@ -354,43 +343,21 @@ class UnitreeG1(BaseRobotHumanoid):
 
         return joints_to_remove, motors_to_remove, equ_constr_to_remove
 
-    def _has_fallen(self, obs, return_err_msg=False):
+    def _get_fallen_bounds(self):
         """
-        Checks if a model has fallen.
-
-        Args:
-            obs (np.array): Current observation.
-            return_err_msg (bool): If True, an error message with violations is returned.
+        Returns the table of bounds defining if the model has fallen.
 
         Returns:
-            True, if the model has fallen for the current observation, False otherwise.
-            Optionally an error message is returned.
+            List of tuples (condition name, key, low, high).
 
         """
 
-        pelvis_euler = self._get_from_obs(obs, ["q_pelvis_tilt", "q_pelvis_list", "q_pelvis_rotation"])
-        pelvis_y_condition = (obs[0] < -0.3) or (obs[0] > 0.1)
-        pelvis_tilt_condition = (pelvis_euler[0] < (-np.pi / 4.5)) or (pelvis_euler[0] > (np.pi / 12))
-        pelvis_list_condition = (pelvis_euler[1] < -np.pi / 12) or (pelvis_euler[1] > np.pi / 8)
-        pelvis_rotation_condition = (pelvis_euler[2] < (-np.pi / 8)) or (pelvis_euler[2] > (np.pi / 8))
-        pelvis_condition = (pelvis_y_condition or pelvis_tilt_condition or
-                            pelvis_list_condition or pelvis_rotation_condition)
-
-        if return_err_msg:
-            error_msg = ""
-            if pelvis_y_condition:
-                error_msg += "pelvis_y_condition violated.\n"
-            elif pelvis_tilt_condition:
-                error_msg += "pelvis_tilt_condition violated.\n"
-            elif pelvis_list_condition:
-                error_msg += "pelvis_list_condition violated.\n"
-            elif pelvis_rotation_condition:
-                error_msg += "pelvis_rotation_condition violated.\n"
-
-            return pelvis_condition, error_msg
-        else:
-
-            return pelvis_condition
+        bounds = [("pelvis_y_condition", "q_pelvis_ty", -0.3, 0.1),
+                  ("pelvis_tilt_condition", "q_pelvis_tilt", -np.pi / 4.5, np.pi / 12),
+                  ("pelvis_list_condition", "q_pelvis_list", -np.pi / 12, np.pi / 8),
+                  ("pelvis_rotation_condition", "q_pelvis_rotation", -np.pi / 8, np.pi / 8)]
+
+        return bounds
 
     @staticmethod
     def generate(task="walk", dataset_type="real", **kwargs):
@@ -14,8 +14,10 @@ from loco_mujoco.environments import LocoEnv
 from loco_mujoco.utils.reward import VelocityVectorReward
 from loco_mujoco.utils.math import rotate_obs
 from loco_mujoco.utils.goals import GoalDirectionVelocity
-from loco_mujoco.utils.math import mat2angle_xy, angle2mat_xy, transform_angle_2pi
+from loco_mujoco.utils.math import mat2angle_xy, angle2mat_xy, transform_angle_2pi, mat2angle_xy_batch, \
+    angle2mat_xy_batch
 from loco_mujoco.utils.checks import check_validity_task_mode_dataset
+from loco_mujoco.utils.observation import ObservationCompiler
 
 
 class UnitreeA1(LocoEnv):
@@ -183,7 +185,7 @@ class UnitreeA1(LocoEnv):
 
     The terminal state is reached when the robot falls, or rather starts falling. The condition to check if the robot
     is falling is based on the orientation of the robot and the height of the center of mass. More details can be found
-    in the  :code:`_has_fallen` method of the environment.
+    in the  :code:`_get_fallen_bounds` method of the environment.
 
     Methods
     ------------
@@ -193,6 +195,8 @@ class UnitreeA1(LocoEnv):
     valid_task_confs = ValidTaskConf(tasks=["simple", "hard"],
                                      data_types=["real", "perfect"])
 
+    _info_joint_names = ["trunk_tx", "trunk_tz", "trunk_ty", "trunk_tilt", "trunk_list", "trunk_rotation"]
+
     def __init__(self, action_mode="torque", setup_random_rot=False,
                  default_target_velocity=0.5, camera_params=None, **kwargs):
         """
@@ -242,6 +246,8 @@ class UnitreeA1(LocoEnv):
         super().__init__(xml_handle, action_spec, observation_spec,  collision_groups,
                          camera_params=camera_params, **kwargs)
 
+        self._dir_arrow_site_id = self._model.site("dir_arrow").id
+
     def setup(self, obs):
         """
         Function to setup the initial state of the simulation. Initialization can be done either
@@ -266,32 +272,80 @@ class UnitreeA1(LocoEnv):
 
             if self.trajectories is not None:
                 if self._random_start:
-                    sample = self.trajectories.reset_trajectory()
-                    if self.setup_random_rot:
-                        angle = np.random.uniform(0, 2 * np.pi)
-                        sample = rotate_obs(sample, angle,  *self._get_relevant_idx_rotation())
+                    self._reset_from_trajectory(random_rot=self.setup_random_rot)
                 elif self._init_step_no is not None:
                     traj_len = self.trajectories.trajectory_length
                     n_traj = self.trajectories.number_of_trajectories
                     assert self._init_step_no <= traj_len * n_traj
                     substep_no = int(self._init_step_no % traj_len)
                     traj_no = int(self._init_step_no / traj_len)
-                    sample = self.trajectories.reset_trajectory(substep_no, traj_no)
+                    self._reset_from_trajectory(substep_no, traj_no)
                 else:
                     # sample random trajectory and use the first sample
-                    sample = self.trajectories.reset_trajectory(substep_no=0)
-                    if self.setup_random_rot:
-                        angle = np.random.uniform(0, 2 * np.pi)
-                        sample = rotate_obs(sample, angle,  *self._get_relevant_idx_rotation())
+                    self._reset_from_trajectory(substep_no=0, random_rot=self.setup_random_rot)
+
+    def _reset_from_trajectory(self, substep_no=None, traj_no=None, random_rot=False):
+        """
+        Resets the trajectory, sets the state of the simulation to the chosen sample and sets the goal of
+        the sample. If the trajectories are packed, the state is copied from the reset state bank of the
+        current model.
+
+        Args:
+            substep_no (int, None): Starting point of the trajectory.
+                If None, the trajectory starts from a random point.
+            traj_no (int, None): Number of the trajectory to start from.
+                If None, it starts from a random trajectory
+            random_rot (bool): If True, the robot is rotated by a random angle around the vertical axis.
+
+        """
+
+        bank = self._get_reset_state_bank()
+
+        if bank is None:
+            sample = self.trajectories.reset_trajectory(substep_no, traj_no)
+            if random_rot:
+                angle = np.random.uniform(0, 2 * np.pi)
+                sample = rotate_obs(sample, angle,  *self._get_relevant_idx_rotation())
+
+            rot_mat = self.trajectories.get_from_sample(sample, "dir_arrow")
+            # copy the goal speed, as the sample might be a view of the trajectory buffer
+            desired_vel = self.trajectories.get_from_sample(sample, "goal_speed").copy()
+
+            # set the state of the simulation
+            self.set_sim_state(sample)
+        else:
+            self.trajectories.reset_cursor(substep_no, traj_no)
+            bank.set_state(self._data, self.trajectories.traj_no, self.trajectories.subtraj_step_no)
+            if random_rot:
+                self._rotate_sim_state(np.random.uniform(0, 2 * np.pi))
+
+            rot_mat = self.trajectories.get_current_value("dir_arrow")
+            desired_vel = self.trajectories.get_current_value("goal_speed")
 
-                # set the goal
-                rot_mat = self.trajectories.get_from_sample(sample, "dir_arrow")
-                angle = mat2angle_xy(rot_mat)
-                desired_vel = self.trajectories.get_from_sample(sample, "goal_speed")
-                self._goal.set_goal(angle, desired_vel)
+        # set the goal
+        angle = mat2angle_xy(rot_mat)
+        self._goal.set_goal(angle, desired_vel)
 
-                # set the state of the simulation
-                self.set_sim_state(sample)
+    def _rotate_sim_state(self, angle):
+        """
+        Rotates the state of the simulation around the vertical axis. This is the equivalent of
+        rotate_obs for the simulation state.
+
+        Args:
+            angle (float): Angle of rotation in radians.
+
+        """
+
+        joint_names = {key: name for key, name, ot in self.obs_helper.observation_spec}
+        rot_adr = self._model.joint(joint_names["q_trunk_rotation"]).qposadr[0]
+        xvel_adr = self._model.joint(joint_names["dq_trunk_tx"]).dofadr[0]
+        yvel_adr = self._model.joint(joint_names["dq_trunk_ty"]).dofadr[0]
+
+        qpos, qvel = self._data.qpos, self._data.qvel
+        xvel, yvel = qvel[xvel_adr], qvel[yvel_adr]
+        qpos[rot_adr] = (qpos[rot_adr] + angle + np.pi) % (2 * np.pi) - np.pi
+        qvel[xvel_adr] = np.cos(angle) * xvel - np.sin(angle) * yvel
+        qvel[yvel_adr] = np.sin(angle) * xvel + np.cos(angle) * yvel
 
     def set_sim_state(self, sample):
         """
@@ -331,7 +385,8 @@ class UnitreeA1(LocoEnv):
                                              goal_velocity_idx=self._goal_velocity_idx)
                 dataset = self.trajectories.create_dataset(ignore_keys=ignore_keys,
                                                            state_callback=self._modify_observation_callback,
-                                                           state_callback_params=state_callback_params)
+                                                           state_callback_params=state_callback_params,
+                                                           batched_state_callback=True)
             else:
                 raise ValueError("No trajectory was passed to the environment. "
                                  "To create a dataset pass a trajectory first.")
@@ -397,7 +452,7 @@ class UnitreeA1(LocoEnv):
                 sin_cos = states[:, i-2:i]
                 angle = np.arctan2(sin_cos[:, 1], sin_cos[:, 0]) #+ np.pi/2
                 if num_data > 1:
-                    data = [angle2mat_xy(a).reshape((9,)) for a in angle]
+                    data = angle2mat_xy_batch(angle).reshape((-1, 9))
                 else:
                     data = angle2mat_xy(angle).reshape((9,))
                 # calculate goal_speed
@@ -475,6 +530,58 @@ class UnitreeA1(LocoEnv):
 
         return obs
 
+    def _compile_observation(self, obs_helper, model):
+        """
+        Compiles the observation of a model into a flat gather plan. The rotation matrix of the direction
+        arrow is not gathered, but replaced by its sin-cos feature followed by the goal velocity.
+
+        Args:
+            obs_helper (ObservationHelper): Observation helper of the model.
+            model (MjModel): Mujoco model.
+
+        Returns:
+            An ObservationCompiler.
+
+        """
+
+        compiler = ObservationCompiler(obs_helper, model, exclude_keys=["dir_arrow"])
+        compiler.add_tail("dir_arrow", 2)
+        compiler.add_tail("goal_speed", 1)
+        if self._use_foot_forces:
+            compiler.add_tail("foot_forces", self._get_grf_size())
+
+        return compiler
+
+    def _update_observation(self, obs, compiler):
+        """
+        Writes the sin-cos feature of the direction arrow and the ground forces to the observation.
+
+        Args:
+            obs (np.array): Observation buffer to be modified.
+            compiler (ObservationCompiler): Compiler of the current model.
+
+        """
+
+        # the angle in the x-y-plane is read directly from the rotation matrix and rotated by 90 degrees
+        rot_mat_arrow = self._data.site_xmat[self._dir_arrow_site_id]
+        angle = np.arctan2(rot_mat_arrow[3], rot_mat_arrow[0]) - np.pi / 2
+        obs[compiler.get_tail("dir_arrow")] = np.cos(angle), np.sin(angle)
+
+        super()._update_observation(obs, compiler)
+
+    def _set_observation_constants(self, obs, compiler):
+        """
+        Writes the goal velocity of the current episode to the observation.
+
+        Args:
+            obs (np.array): Observation buffer to be modified.
+            compiler (ObservationCompiler): Compiler of the current model.
+
+        """
+
+        super()._set_observation_constants(obs, compiler)
+        obs[compiler.get_tail("goal_speed")] = self._goal.get_velocity()
+
     def _get_reward_function(self, reward_type, reward_params):
         """
         Constructs a reward function.
@@ -500,40 +607,27 @@ class UnitreeA1(LocoEnv):
 
         return goal_reward_func
 
-    def _has_fallen(self, obs, return_err_msg=False):
+    def _get_fallen_bounds(self):
         """
-        Checks if a model has fallen.
-
-        Args:
-            obs (np.array): Current observation.
-            return_err_msg (bool): If True, an error message with violations is returned.
+        Returns the table of bounds defining if the model has fallen.
 
         Returns:
-            True, if the model has fallen for the current observation, False otherwise.
-            Optionally an error message is returned.
+            List of tuples (condition name, key, low, high).
 
         """
 
-        trunk_euler = self._get_from_obs(obs, ["q_trunk_list", "q_trunk_tilt"])
-        trunk_height = self._get_from_obs(obs, ["q_trunk_tz"])
+        return [("trunk_list_condition", "q_trunk_list", -0.2793, 0.2793),
+                ("trunk_tilt_condition", "q_trunk_tilt", -0.192, 0.192),
+                ("trunk_height_condition", "q_trunk_tz", -.24, np.inf)]
 
-        trunk_list_condition = (trunk_euler[0] < -0.2793) or (trunk_euler[0] > 0.2793)
-        trunk_tilt_condition = (trunk_euler[1] < -0.192) or (trunk_euler[1] > 0.192)
-        trunk_height_condition = trunk_height[0] < -.24
-        trunk_condition = (trunk_list_condition or trunk_tilt_condition or trunk_height_condition)
+    def _get_episode_state_attributes(self):
+        """
+        Returns the names of all attributes holding Python-side state of the current episode. Next to the
+        ground force statistics, this environment keeps the goal of the current episode.
 
-        if return_err_msg:
-            error_msg = ""
-            if trunk_list_condition:
-                error_msg += "trunk_list_condition violated.\n"
-            elif trunk_tilt_condition:
-                error_msg += "trunk_tilt_condition violated.\n"
-            elif trunk_height_condition:
-                error_msg += "trunk_height_condition violated. %f \n" % trunk_height
+        """
 
-            return trunk_condition, error_msg
-        else:
-            return trunk_condition
+        return super()._get_episode_state_attributes() + ["_goal"]
 
     def _get_relevant_idx_rotation(self):
         """
@@ -548,18 +642,13 @@ class UnitreeA1(LocoEnv):
         idx_yvel = keys.index("dq_trunk_ty")
         return idx_rot, idx_xvel, idx_yvel
 
-    def _get_ground_forces(self):
+    def _get_ground_force_groups(self):
         """
-        Returns the ground forces (np.array).
+        Returns the names of the collision groups for which the ground forces are computed.
 
         """
 
-        grf = np.concatenate([self._get_collision_force("floor", "foot_FL")[:3],
-                              self._get_collision_force("floor", "foot_FR")[:3],
-                              self._get_collision_force("floor", "foot_RL")[:3],
-                              self._get_collision_force("floor", "foot_RR")[:3]])
-
-        return grf
+        return ["foot_FL", "foot_FR", "foot_RL", "foot_RR"]
 
     def _set_goal_arrow(self):
         """
@@ -722,33 +811,34 @@ class UnitreeA1(LocoEnv):
     @staticmethod
     def _modify_observation_callback(obs, rot_mat_idx_arrow, goal_velocity_idx):
         """
-        Transforms the rotation matrix from obs to a sin-cos feature.
+        Transforms the rotation matrix from obs to a sin-cos feature. Works on a single observation
+        as well as on a batch of observations.
 
         Args:
-            obs (np.array): Generated observation.
+            obs (np.array): Generated observation(s) of shape (dim_obs,) or (n_obs, dim_obs).
             rot_mat_idx_arrow (int): Index of the beginning rotation matrix in the observation.
             goal_velocity_idx (int): Index of the goal speed in the observation.
 
         Returns:
-            The final environment observation for the agent.
+            The final environment observation(s) for the agent.
 
         """
 
-        rot_mat_arrow = obs[rot_mat_idx_arrow].reshape((3, 3))
+        rot_mat_arrow = obs[..., rot_mat_idx_arrow]
         # convert mat to angle
-        angle = mat2angle_xy(rot_mat_arrow)
+        angle = mat2angle_xy_batch(rot_mat_arrow.reshape((-1, 9))).reshape(obs.shape[:-1])
         # transform the angle to be in [-pi, pi]
         angle = transform_angle_2pi(angle)
         # rotate by 90 degrees
-        angle -= np.pi / 2
+        angle = angle - np.pi / 2
         # make sin-cos transformation
-        angle = np.array([np.cos(angle), np.sin(angle)])
+        angle = np.stack([np.cos(angle), np.sin(angle)], axis=-1)
 
         # get goal velocity
-        goal_velocity = obs[goal_velocity_idx]
+        goal_velocity = obs[..., [goal_velocity_idx]]
 
         # concatenate everything to new obs
-        new_obs = np.concatenate([obs[:rot_mat_idx_arrow[0]], angle, [goal_velocity]])
+        new_obs = np.concatenate([obs[..., :rot_mat_idx_arrow[0]], angle, goal_velocity], axis=-1)
 
         return new_obs
 
@@ -873,17 +963,14 @@ class UnitreeA1(LocoEnv):
 
         rot_mat_idx = interpolate_map_params["rot_mat_idx"]
         trunk_orientation_idx = interpolate_map_params["trunk_orientation_idx"]
-        traj_list = [list() for j in range(len(traj))]
-        for i in range(len(traj_list)):
-            # if the state is a rotation
-            if i in trunk_orientation_idx:  # todo: not sure if this is actually needed.
-                # change it to the nearest rotation presentation to the previous state
-                # -> no huge jumps between -pi and pi for example
-                traj_list[i] = list(np.unwrap(traj[i]))
-            else:
-                traj_list[i] = list(traj[i])
-        # turn matrices into angles todo: this is slow, implement vectorized implementation
-        traj_list[rot_mat_idx] = np.array([mat2angle_xy(mat) for mat in traj[rot_mat_idx]])
+        traj_list = list(traj)
+        for i in trunk_orientation_idx:  # todo: not sure if this is actually needed.
+            # change it to the nearest rotation presentation to the previous state
+            # -> no huge jumps between -pi and pi for example
+            traj_list[i] = np.unwrap(traj[i])
+        # turn matrices into angles
+        rot_mats = traj[rot_mat_idx]
+        traj_list[rot_mat_idx] = mat2angle_xy_batch(rot_mats.reshape((-1, 9))).reshape(rot_mats.shape[:-1])
         return np.array(traj_list)
 
     @staticmethod
@@ -908,21 +995,19 @@ class UnitreeA1(LocoEnv):
         position_indices = interpolate_remap_params["position_indices"]
         velocity_indices = interpolate_remap_params["velocity_indices"]
         ctrl_dt = interpolate_remap_params["ctrl_dt"]
-        traj_list = [list() for j in range(len(traj))]
-        for i in range(len(traj_list)):
-            # if the state is a rotation
-            if i in trunk_orientation_idx:
-                # make sure it is in range -pi,pi
-                traj_list[i] = [transform_angle_2pi(angle) for angle in traj[i]]
-            elif i in velocity_indices:
-                # the interpolation is problematic in the joint velocities for the Unitree. Recalculate them here based
-                # on the positions
-                joint_position_idx = position_indices[velocity_indices.index(i)]
-                joint_position = traj[joint_position_idx]
-                traj_list[i] = [0.0] + list((joint_position[1:] - joint_position[:-1]) / ctrl_dt)
-            else:
-                traj_list[i] = list(traj[i])
-
-        # transforms angles into rotation matrices todo: this is slow, implement vectorized implementation
-        traj_list[angle_idx] = np.array([angle2mat_xy(angle).reshape(9,) for angle in traj[angle_idx]])
+        traj_list = list(traj)
+        for i in trunk_orientation_idx:
+            # make sure it is in range -pi,pi
+            traj_list[i] = transform_angle_2pi(traj[i])
+        for i, joint_position_idx in zip(velocity_indices, position_indices):
+            # the interpolation is problematic in the joint velocities for the Unitree. Recalculate them here based
+            # on the positions
+            joint_position = traj[joint_position_idx]
+            joint_velocity = np.zeros_like(joint_position)
+            joint_velocity[..., 1:] = (joint_position[..., 1:] - joint_position[..., :-1]) / ctrl_dt
+            traj_list[i] = joint_velocity
+
+        # transforms angles into rotation matrices
+        angles = traj[angle_idx]
+        traj_list[angle_idx] = angle2mat_xy_batch(angles).reshape(angles.shape + (9,))
         return traj_list
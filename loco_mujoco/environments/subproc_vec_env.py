@@ -0,0 +1,296 @@
+import os
+import multiprocessing as mp
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+
+class LocoSubprocVecEnv:
+    """
+    Vectorized version of a LocoMuJoCo environment simulating the environments in separate processes. Each
+    worker process holds a contiguous chunk of environments created with the Gymnasium interface. Actions,
+    observations, rewards and the absorbing flags are exchanged through shared memory buffers, such that
+    only short commands are sent over the pipes. Environments are automatically reset if an absorbing
+    state or the horizon is reached.
+
+    .. note:: The returned arrays are copies of the shared memory buffers, hence they stay valid after
+        the next call to step.
+
+    """
+
+    def __init__(self, env_name, n_envs, n_workers=None, start_method=None, seed=None, **kwargs):
+        """
+        Constructor.
+
+        Args:
+            env_name (str): Task-ID of the environment, e.g., "MyoSkeleton.walk".
+            n_envs (int): Number of environments simulated in parallel.
+            n_workers (int): Number of worker processes. The environments are distributed evenly across
+                the workers. If None, one worker per environment is used, but not more than the number of cores.
+            start_method (str): Start method of the worker processes, i.e. "fork", "spawn" or "forkserver".
+                If None, the default start method of the platform is used.
+            seed (int): If not None, the random number generator of the i-th worker is seeded with seed + i.
+            **kwargs: Additional parameters passed to the environment.
+
+        """
+
+        assert n_envs >= 1, "The number of environments has to be at least 1."
+        assert "render_mode" not in kwargs.keys(), "Rendering is not supported in the subprocess vector environment."
+
+        if n_workers is None:
+            n_workers = min(n_envs, mp.cpu_count())
+        n_workers = min(n_workers, n_envs)
+
+        self._n_envs = n_envs
+        self._n_workers = n_workers
+        self._closed = False
+
+        ctx = mp.get_context(start_method)
+
+        # the workers have to share the resource tracker of the main process, otherwise the shared buffers
+        # would be unlinked as soon as the first worker exits
+        if os.name == "posix":
+            resource_tracker.ensure_running()
+        env_slices = [slice(s[0], s[-1] + 1) for s in np.array_split(np.arange(n_envs), n_workers)]
+
+        self._remotes, self._processes = [], []
+        for i, env_slice in enumerate(env_slices):
+            remote, worker_remote = ctx.Pipe()
+            worker_seed = None if seed is None else seed + i
+            process = ctx.Process(target=_worker, args=(worker_remote, remote, env_name, kwargs,
+                                                        env_slice.stop - env_slice.start, worker_seed),
+                                  daemon=True)
+            process.start()
+            worker_remote.close()
+            self._remotes.append(remote)
+            self._processes.append(process)
+
+        # the mdp info is the only object pickled, it is needed to allocate the shared buffers
+        infos = [self._receive(remote) for remote in self._remotes]
+        self._mdp_info = infos[0]
+        obs_dim = self._mdp_info.observation_space.shape[0]
+        action_dim = self._mdp_info.action_space.shape[0]
+
+        self._shms = []
+        self._actions = self._create_buffer((n_envs, action_dim), np.float64)
+        self._obs = self._create_buffer((n_envs, obs_dim), np.float64)
+        self._final_obs = self._create_buffer((n_envs, obs_dim), np.float64)
+        self._rewards = self._create_buffer((n_envs,), np.float64)
+        self._absorbing = self._create_buffer((n_envs,), bool)
+        self._last = self._create_buffer((n_envs,), bool)
+
+        buffer_specs = [(shm.name, buffer.shape, buffer.dtype.str) for shm, buffer in
+                        zip(self._shms, [self._actions, self._obs, self._final_obs,
+                                         self._rewards, self._absorbing, self._last])]
+        for remote, env_slice in zip(self._remotes, env_slices):
+            remote.send(("attach", (buffer_specs, env_slice)))
+        for remote in self._remotes:
+            self._receive(remote)
+
+    @staticmethod
+    def make(env_name, n_envs, **kwargs):
+        """
+        Creates a subprocess vectorized environment from a Task-ID.
+
+        Args:
+            env_name (str): Task-ID of the environment, e.g., "MyoSkeleton.walk".
+            n_envs (int): Number of environments simulated in parallel.
+            **kwargs: Additional parameters passed to the constructor.
+
+        Returns:
+            A LocoSubprocVecEnv.
+
+        """
+
+        return LocoSubprocVecEnv(env_name, n_envs, **kwargs)
+
+    def reset(self):
+        """
+        Resets all environments.
+
+        Returns:
+            np.array of initial observations with shape (N, dim_obs).
+
+        """
+
+        self._command("reset")
+
+        return self._obs.copy()
+
+    def step(self, actions):
+        """
+        Steps all environments with a batch of actions. Environments reaching an absorbing state or the horizon
+        are reset automatically. In this case, the returned observation is the first observation of the new
+        episode, while the last observation of the finished episode is stored in the info dictionary.
+
+        Args:
+            actions (np.array): Batch of actions with shape (N, dim_action).
+
+        Returns:
+            Tuple of the observations (N, dim_obs), the rewards (N,), the absorbing flags (N,) and an info
+            dictionary containing the flags "last" (N,) marking the end of an episode and the
+            "final_observation" (N, dim_obs) of all finished episodes.
+
+        """
+
+        self._actions[:] = np.atleast_2d(actions)
+        self._command("step")
+
+        return self._obs.copy(), self._rewards.copy(), self._absorbing.copy(), \
+            dict(last=self._last.copy(), final_observation=self._final_obs.copy())
+
+    def close(self):
+        """
+        Stops all worker processes and releases the shared memory.
+
+        """
+
+        if self._closed:
+            return
+        self._closed = True
+
+        for remote in self._remotes:
+            try:
+                remote.send(("close", None))
+            except OSError:
+                pass
+        for process in self._processes:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                process.terminate()
+        for remote in self._remotes:
+            remote.close()
+
+        # the numpy views have to be released before the shared memory can be closed
+        self._actions = self._obs = self._final_obs = self._rewards = self._absorbing = self._last = None
+        for shm in self._shms:
+            shm.close()
+            shm.unlink()
+
+    @property
+    def n_envs(self):
+        """ Returns the number of environments. """
+
+        return self._n_envs
+
+    @property
+    def info(self):
+        """ Returns the MDPInfo of a single environment. """
+
+        return self._mdp_info
+
+    def _create_buffer(self, shape, dtype):
+        """
+        Allocates a numpy array in shared memory.
+
+        """
+
+        shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1))
+        self._shms.append(shm)
+
+        return np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+    def _command(self, cmd):
+        """
+        Sends a command to all workers and waits until all of them are done.
+
+        """
+
+        assert not self._closed, "The environment is already closed."
+
+        for remote in self._remotes:
+            remote.send((cmd, None))
+        for remote in self._remotes:
+            self._receive(remote)
+
+    @staticmethod
+    def _receive(remote):
+        """
+        Receives a message from a worker and raises its error if the worker failed.
+
+        """
+
+        status, msg = remote.recv()
+        if status == "error":
+            raise RuntimeError(f"Error in worker process:\n{msg}")
+
+        return msg
+
+    def __del__(self):
+        if hasattr(self, "_closed") and hasattr(self, "_shms"):
+            self.close()
+
+
+def _worker(remote, parent_remote, env_name, env_kwargs, n_envs, seed):
+    """
+    Main loop of a worker process simulating a chunk of environments.
+
+    """
+
+    import traceback
+    from loco_mujoco.environments.gymnasium import GymnasiumWrapper
+
+    parent_remote.close()
+    shms = []
+
+    try:
+        if seed is not None:
+            np.random.seed(seed)
+
+        envs = [GymnasiumWrapper(env_name, **env_kwargs) for _ in range(n_envs)]
+        mdp_info = envs[0].unwrapped.info
+        horizon = mdp_info.horizon
+        steps = np.zeros(n_envs, dtype=int)
+        remote.send(("ok", mdp_info))
+
+        # attach to the shared buffers and only keep the views of this chunk of environments
+        cmd, (buffer_specs, env_slice) = remote.recv()
+        buffers = []
+        for name, shape, dtype in buffer_specs:
+            shm = shared_memory.SharedMemory(name=name)
+            shms.append(shm)
+            buffers.append(np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)[env_slice])
+        actions, obs, final_obs, rewards, absorbing, last = buffers
+        remote.send(("ok", None))
+
+        while True:
+            cmd, _ = remote.recv()
+
+            if cmd == "step":
+                for i, env in enumerate(envs):
+                    o, r, terminated, _, _ = env.step(actions[i])
+                    steps[i] += 1
+                    rewards[i] = r
+                    absorbing[i] = terminated
+                    last[i] = terminated or steps[i] >= horizon
+                    final_obs[i] = o
+                    if last[i]:
+                        o, _ = env.reset()
+                        steps[i] = 0
+                    obs[i] = o
+                remote.send(("ok", None))
+
+            elif cmd == "reset":
+                for i, env in enumerate(envs):
+                    obs[i], _ = env.reset()
+                    steps[i] = 0
+                remote.send(("ok", None))
+
+            elif cmd == "close":
+                for env in envs:
+                    env.close()
+                break
+
+            else:
+                raise NotImplementedError(f"Unknown command {cmd}.")
+
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        remote.send(("error", traceback.format_exc()))
+    finally:
+        # release the numpy views before closing the shared memory
+        actions = obs = final_obs = rewards = absorbing = last = buffers = None
+        for shm in shms:
+            shm.close()
+        remote.close()
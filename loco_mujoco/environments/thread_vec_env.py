@@ -0,0 +1,148 @@
+import os
+from copy import copy
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from loco_mujoco.environments.base import LocoEnv
+from loco_mujoco.environments.vec_env import LocoVecEnv
+
+
+class LocoThreadVecEnv(LocoVecEnv):
+    """
+    Vectorized version of a LocoMuJoCo environment simulating the environments on a persistent thread pool.
+    As in LocoVecEnv, each environment has its own Mujoco data structures, while the Mujoco models, the
+    trajectories and the reward function are shared. The environments are split into one contiguous chunk
+    per thread, and each thread simulates its chunk with a lightweight copy of the wrapped environment.
+    Since the Mujoco bindings release the GIL while stepping the physics, the simulation runs in parallel
+    on multiple cores without spawning processes or copying the trajectories. The observations are written
+    into preallocated arrays. Action normalization, the absorbing state check, the reward and the automatic
+    resets are computed on the calling thread.
+
+    .. note:: The thread pool has to be stopped with close once the environment is not needed anymore.
+
+    """
+
+    def __init__(self, env, n_envs, n_threads=None):
+        """
+        Constructor.
+
+        Args:
+            env (LocoEnv): Environment to vectorize.
+            n_envs (int): Number of environments simulated in parallel.
+            n_threads (int): Number of threads. The environments are distributed evenly across the threads.
+                If None, one thread per environment is used, but not more than the number of cores.
+
+        """
+
+        super().__init__(env, n_envs)
+
+        if n_threads is None:
+            n_threads = min(n_envs, os.cpu_count() or 1)
+        n_threads = min(n_threads, n_envs)
+
+        self._n_threads = n_threads
+        self._env_chunks = np.array_split(np.arange(n_envs), n_threads)
+        self._thread_envs = [self._create_thread_env() for _ in range(n_threads)]
+        self._pool = ThreadPoolExecutor(max_workers=n_threads, thread_name_prefix="LocoThreadVecEnv")
+
+        # the next observations are written alternately to two buffers, as the current observations are
+        # read while the next ones are written
+        obs_dim = env.info.observation_space.shape[0]
+        self._obs_buffers = [np.empty((n_envs, obs_dim)), np.empty((n_envs, obs_dim))]
+        self._obs_buffer_idx = 0
+
+    @staticmethod
+    def make(env_name, n_envs, n_threads=None, **kwargs):
+        """
+        Creates a thread vectorized environment from a Task-ID.
+
+        Args:
+            env_name (str): Task-ID of the environment, e.g., "MyoSkeleton.walk".
+            n_envs (int): Number of environments simulated in parallel.
+            n_threads (int): Number of threads.
+            **kwargs: Additional parameters passed to the environment.
+
+        Returns:
+            A LocoThreadVecEnv.
+
+        """
+
+        return LocoThreadVecEnv(LocoEnv.make(env_name, **kwargs), n_envs, n_threads)
+
+    def close(self):
+        """
+        Stops the thread pool.
+
+        """
+
+        self._pool.shutdown(wait=True)
+
+    @property
+    def n_threads(self):
+        """ Returns the number of threads. """
+
+        return self._n_threads
+
+    def _simulate_all(self, actions):
+        """
+        Simulates all environments for one control step on the thread pool.
+
+        Args:
+            actions (np.array): Batch of preprocessed actions with shape (N, dim_action).
+
+        Returns:
+            np.array of the next observations with shape (N, dim_obs).
+
+        """
+
+        next_obs = self._obs_buffers[self._obs_buffer_idx]
+        self._obs_buffer_idx = 1 - self._obs_buffer_idx
+
+        futures = [self._pool.submit(self._simulate_chunk, thread_env, env_idx, actions, next_obs)
+                   for thread_env, env_idx in zip(self._thread_envs, self._env_chunks)]
+
+        # wait for all threads and raise the first error
+        for future in futures:
+            future.result()
+
+        return next_obs
+
+    def _simulate_chunk(self, thread_env, env_idx, actions, next_obs):
+        """
+        Simulates a chunk of environments for one control step with the environment of a thread.
+
+        Args:
+            thread_env (LocoEnv): Environment copy owned by the thread.
+            env_idx (np.array): Indices of the environments in the chunk.
+            actions (np.array): Batch of preprocessed actions with shape (N, dim_action).
+            next_obs (np.array): Buffer of shape (N, dim_obs) the next observations are written to.
+
+        """
+
+        for i in env_idx:
+            self._load_slot(i, thread_env)
+            next_obs[i] = self._simulate(actions[i], self._obs[i], thread_env)
+            self._store_slot(i, thread_env)
+
+    def _create_thread_env(self):
+        """
+        Creates a shallow copy of the wrapped environment to be used by a single thread. All attributes
+        modified while simulating are either part of a slot, and hence loaded before each simulation,
+        or are replaced by thread-local instances.
+
+        Returns:
+            The copied environment.
+
+        """
+
+        thread_env = copy(self._env)
+
+        # the contact force aggregator keeps a buffer of the forces, it is recreated lazily for each thread
+        thread_env._grf_aggregator = None
+
+        return thread_env
+
+    def __del__(self):
+        if hasattr(self, "_pool"):
+            self.close()
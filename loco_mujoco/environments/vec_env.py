@@ -0,0 +1,332 @@
+from copy import deepcopy
+
+import numpy as np
+import mujoco
+
+from loco_mujoco.environments.base import LocoEnv
+from loco_mujoco.utils import ReferenceTrackingReward
+
+
+class LocoVecEnv:
+    """
+    Vectorized version of a LocoMuJoCo environment. It keeps N Mujoco data structures per Mujoco model of
+    the wrapped environment and steps all of them with a single batched call. Action normalization, the
+    absorbing state check and the reward are computed on the whole batch, while the physics is simulated
+    for each environment separately. Environments are automatically reset if an absorbing state or the
+    horizon is reached.
+
+    .. note:: The wrapped environment is owned by the vectorized environment, as its simulation state is
+        swapped between the N environments. It should not be stepped on its own anymore.
+
+    """
+
+    def __init__(self, env, n_envs):
+        """
+        Constructor.
+
+        Args:
+            env (LocoEnv): Environment to vectorize.
+            n_envs (int): Number of environments simulated in parallel.
+
+        """
+
+        assert n_envs >= 1, "The number of environments has to be at least 1."
+        assert isinstance(env, LocoEnv), "Only LocoMuJoCo environments can be vectorized."
+        assert env._obs_history is None, "The observation history is not supported in the vectorized environment."
+
+        self._env = env
+        self._n_envs = n_envs
+
+        self._slots = []
+        for i in range(n_envs):
+            # models may be modified in place at reset, hence each environment needs its own copy
+            if i == 0 or not env._modifies_models_at_reset():
+                models = list(env._models)
+            else:
+                models = [deepcopy(m) for m in env._models]
+            datas = env._datas if i == 0 else [mujoco.MjData(m) for m in models]
+            episode_state = {attr: deepcopy(getattr(env, attr)) for attr in env._get_episode_state_attributes()}
+            self._slots.append(dict(models=models, datas=datas, model_idx=env._current_model_idx,
+                                    episode_state=episode_state))
+
+        self._obs = None
+        self._steps = np.zeros(n_envs, dtype=int)
+
+    @staticmethod
+    def make(env_name, n_envs, **kwargs):
+        """
+        Creates a vectorized environment from a Task-ID.
+
+        Args:
+            env_name (str): Task-ID of the environment, e.g., "UnitreeH1.walk.real".
+            n_envs (int): Number of environments simulated in parallel.
+            **kwargs: Additional parameters passed to the environment.
+
+        Returns:
+            A LocoVecEnv.
+
+        """
+
+        return LocoVecEnv(LocoEnv.make(env_name, **kwargs), n_envs)
+
+    def reset(self):
+        """
+        Resets all environments.
+
+        Returns:
+            np.array of initial observations with shape (N, dim_obs).
+
+        """
+
+        self._obs = np.stack([self._reset_slot(i) for i in range(self._n_envs)])
+        self._steps[:] = 0
+
+        return self._obs.copy()
+
+    def step(self, actions):
+        """
+        Steps all environments with a batch of actions. Environments reaching an absorbing state or the horizon
+        are reset automatically. In this case, the returned observation is the first observation of the new
+        episode, while the last observation of the finished episode is stored in the info dictionary.
+
+        Args:
+            actions (np.array): Batch of actions with shape (N, dim_action).
+
+        Returns:
+            Tuple of the observations (N, dim_obs), the rewards (N,), the absorbing flags (N,) and an info
+            dictionary containing the flags "last" (N,) marking the end of an episode and the
+            "final_observation" (N, dim_obs) of all finished episodes.
+
+        """
+
+        assert self._obs is not None, "Please reset the environment before stepping it."
+
+        env = self._env
+        actions = np.atleast_2d(actions)
+        assert actions.shape[0] == self._n_envs
+
+        actions = env._preprocess_action(actions)
+
+        next_obs = self._simulate_all(actions)
+
+        absorbing = env.is_absorbing_batch(next_obs)
+        rewards = env.reward_batch(self._obs, actions, next_obs, absorbing, self._advance_reference_cursors())
+
+        self._steps += 1
+        last = absorbing | (self._steps >= env.info.horizon)
+
+        final_obs = next_obs.copy()
+        for i in np.flatnonzero(last):
+            next_obs[i] = self._reset_slot(i)
+            self._steps[i] = 0
+
+        self._obs = next_obs
+
+        return next_obs.copy(), rewards, absorbing, dict(last=last, final_observation=final_obs)
+
+    def set_sim_state(self, samples):
+        """
+        Sets the simulation state of all environments from a batch of samples. The observations returned
+        by the last call to step or reset are not updated.
+
+        Args:
+            samples (np.array): Batch of flat samples with shape (N, dim_sample). See LocoEnv.set_sim_state
+                for the layout of a flat sample.
+
+        """
+
+        samples = np.atleast_2d(samples)
+        assert samples.shape[0] == self._n_envs
+
+        for i, sample in enumerate(samples):
+            self._load_slot(i)
+            self._env.set_sim_state(sample)
+            self._store_slot(i)
+
+    def get_state(self):
+        """
+        Captures the full state of all environments. See LocoEnv.get_state for the content of a state.
+
+        Returns:
+            np.array of states with shape (N, dim_state).
+
+        """
+
+        assert self._obs is not None, "Please reset the environment before capturing its state."
+
+        states = None
+        for i in range(self._n_envs):
+            self._load_slot(i)
+            if states is None:
+                states = np.empty((self._n_envs, self._env._get_state_layout().size))
+            self._env.get_state(states[i])
+
+        return states
+
+    def set_state(self, states):
+        """
+        Restores the states of all environments. A single state is restored in all environments, which allows
+        to branch N rollouts from the same state.
+
+        Args:
+            states (np.array): Batch of states with shape (N, dim_state), or a single state of shape (dim_state,).
+
+        Returns:
+            np.array of the current observations with shape (N, dim_obs).
+
+        """
+
+        assert self._obs is not None, "Please reset the environment before restoring its state."
+
+        states = np.broadcast_to(states, (self._n_envs, np.shape(states)[-1]))
+
+        for i in range(self._n_envs):
+            self._load_slot(i)
+            self._env.set_state(states[i])
+            self._obs[i] = self._env._modify_observation(self._env._obs)
+            self._store_slot(i)
+
+        return self._obs.copy()
+
+    @property
+    def n_envs(self):
+        """ Returns the number of environments. """
+
+        return self._n_envs
+
+    @property
+    def info(self):
+        """ Returns the MDPInfo of a single environment. """
+
+        return self._env.info
+
+    @property
+    def unwrapped(self):
+        """ Returns the wrapped environment. """
+
+        return self._env
+
+    def _simulate_all(self, actions):
+        """
+        Simulates all environments for one control step.
+
+        Args:
+            actions (np.array): Batch of preprocessed actions with shape (N, dim_action).
+
+        Returns:
+            np.array of the next observations with shape (N, dim_obs).
+
+        """
+
+        next_obs = np.empty_like(self._obs)
+        for i in range(self._n_envs):
+            self._load_slot(i)
+            next_obs[i] = self._simulate(actions[i], self._obs[i])
+            self._store_slot(i)
+
+        return next_obs
+
+    def _simulate(self, action, obs, env=None):
+        """
+        Simulates the currently loaded environment for one control step, without computing
+        the reward and the absorbing state.
+
+        Args:
+            action (np.array): Preprocessed action.
+            obs (np.array): Current observation.
+            env (LocoEnv): Environment the slot is loaded into. If None, the wrapped environment is used.
+
+        Returns:
+            The next observation (np.array).
+
+        """
+
+        env = self._env if env is None else env
+        ctrl_action = None
+
+        for i in range(env._n_intermediate_steps):
+
+            if env._recompute_action_per_step or ctrl_action is None:
+                ctrl_action = env._compute_action(obs, action)
+                env._data.ctrl[env._action_indices] = ctrl_action
+
+            env._simulation_pre_step()
+
+            mujoco.mj_step(env._model, env._data, env._n_substeps)
+
+            env._simulation_post_step()
+
+            if env._recompute_action_per_step:
+                obs = env._build_observation()
+
+        if not env._recompute_action_per_step:
+            obs = env._build_observation()
+
+        env._obs = obs
+
+        return env._modify_observation(obs)
+
+    def _advance_reference_cursors(self):
+        """
+        Advances the reference cursor of each environment, if the reference tracking reward is used.
+
+        Returns:
+            np.array of the indices of the next reference samples with shape (N,), or None.
+
+        """
+
+        if self._env._reference_cursor is None:
+            return None
+
+        return np.array([ReferenceTrackingReward.advance_cursor(slot["episode_state"]["_reference_cursor"])
+                         for slot in self._slots])
+
+    def _reset_slot(self, i):
+        """
+        Resets the i-th environment.
+
+        Returns:
+            The initial observation (np.array) of the i-th environment.
+
+        """
+
+        self._load_slot(i)
+        obs = self._env.reset()
+        self._store_slot(i)
+
+        return obs
+
+    def _load_slot(self, i, env=None):
+        """
+        Loads the simulation and episode state of the i-th environment into the wrapped environment,
+        or into env if specified.
+
+        """
+
+        env = self._env if env is None else env
+        slot = self._slots[i]
+
+        env._models = slot["models"]
+        env._datas = slot["datas"]
+        env._current_model_idx = slot["model_idx"]
+        env._model = env._models[env._current_model_idx]
+        env._data = env._datas[env._current_model_idx]
+        env.obs_helper = env.obs_helpers[env._current_model_idx]
+
+        for attr, value in slot["episode_state"].items():
+            setattr(env, attr, value)
+
+    def _store_slot(self, i, env=None):
+        """
+        Stores the simulation and episode state of the wrapped environment, or of env if specified,
+        in the i-th slot.
+
+        """
+
+        env = self._env if env is None else env
+        slot = self._slots[i]
+
+        slot["model_idx"] = env._current_model_idx
+
+        for attr in slot["episode_state"].keys():
+            slot["episode_state"][attr] = getattr(env, attr)
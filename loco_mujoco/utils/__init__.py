@@ -1,7 +1,14 @@
 from .reward import *
 from .trajectory import *
+from .observation import ObservationCompiler, ObservationHistory
+from .reset_bank import ResetStateBank
+from .state import StateLayout
+from .contacts import ContactForceAggregator
 from .checks import *
 from .video import video2gif
+from .compile_service import ModelCompileService, get_compile_service, shutdown_compile_service, \
+    get_compile_context
 from .domain_randomization import *
 from .myomodel_init import fetch_myoskeleton, clear_myoskeleton
-from .dataset import download_all_datasets, download_real_datasets, download_perfect_datasets
+from .dataset import download_all_datasets, download_real_datasets, download_perfect_datasets, \
+    convert_real_datasets_to_mmap
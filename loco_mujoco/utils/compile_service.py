@@ -0,0 +1,265 @@
+import os
+import atexit
+import pickle
+import threading
+from copy import deepcopy
+from itertools import count
+from collections import deque
+import multiprocessing
+
+import mujoco
+
+
+class ModelCompileService:
+    """
+    Process-wide service compiling randomized Mujoco models on a single pool of worker processes. All domain
+    randomization handlers of a process register their xml handles at the same service, such that the number of
+    compile processes is bounded by a global budget instead of growing with the number of environments and
+    xml handles.
+
+    For each registered xml handle, a fixed number of models is prefetched, i.e., compiled ahead of time. Whenever a
+    model is taken, the compilation of its replacement is queued behind all pending compilations of the other
+    handles, such that the workers are shared fairly across handles. The values of the plan are sampled in this
+    process from the generator passed at registration, hence a seeded generator produces the same models
+    independently of the number of workers. The sampled values are set in the xml handle, which is sent to the
+    workers as a self-contained xml string that Mujoco compiles directly. The assets of a handle are sent
+    along and deserialized once per worker.
+
+    The service is created lazily with get_compile_service and stopped with shutdown_compile_service, which is
+    also called at exit. As the workers are started when the first xml handle is registered, other threads
+    (e.g., the reset thread of an environment or a LocoThreadVecEnv) may already be running. Forking the process
+    at this point could copy locks held by these threads into the workers. Hence, the workers are started with
+    the forkserver start method, or spawn where it is not available (see get_compile_context). With both methods,
+    the main module is imported again in the workers, so scripts using parallel domain randomization have to
+    protect their entry point with :code:`if __name__ == "__main__":`.
+
+    """
+
+    def __init__(self, n_workers):
+        """
+        Constructor.
+
+        Args:
+            n_workers (int): Number of worker processes.
+
+        """
+
+        assert n_workers >= 1, "At least one worker is required."
+
+        self._n_workers = n_workers
+        self._pool = None
+        self._jobs = dict()
+        self._keys = count()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def register(self, xml_handle, plan, rng, prefetch=1):
+        """
+        Registers an xml handle and starts prefetching randomized models.
+
+        Args:
+            xml_handle: Mujoco xml handle. The sampled values are set in a copy of this handle.
+            plan (DomainRandomizationPlan): Plan created from the xml handle.
+            rng (np.random.Generator): Generator used to sample the values of the plan. It must not be used
+                elsewhere, as models are prefetched in the background.
+            prefetch (int): Number of models compiled ahead of time.
+
+        Returns:
+            The key used to request models.
+
+        """
+
+        assert prefetch >= 1, "At least one model has to be prefetched."
+
+        with self._lock:
+            assert not self._closed, "The compile service is already shut down."
+
+            # the workers are started with the first registration
+            if self._pool is None:
+                self._pool = get_compile_context().Pool(self._n_workers)
+
+            key = next(self._keys)
+
+            # the assets are serialized once, workers deserialize them once per key
+            self._jobs[key] = dict(xml_handle=deepcopy(xml_handle), plan=plan, rng=rng,
+                                   assets=pickle.dumps(xml_handle.get_assets()), pending=deque(),
+                                   lock=threading.Lock())
+
+        for i in range(prefetch):
+            self._submit(key)
+
+        return key
+
+    def get(self, key, timeout=None):
+        """
+        Returns the next randomized model of a registered xml handle, waiting for it if it is not compiled yet.
+
+        Args:
+            key (int): Key returned by register.
+            timeout (float): Maximum time in seconds to wait for the model. If None, there is no limit. If the
+                model is not compiled in time, a multiprocessing.TimeoutError is raised.
+
+        Returns:
+            Tuple of the randomized model and the values sampled from the plan.
+
+        """
+
+        with self._lock:
+            assert not self._closed, "The compile service is already shut down."
+            result, values = self._jobs[key]["pending"].popleft()
+
+        self._submit(key)
+
+        return result.get(timeout), values
+
+    def unregister(self, key):
+        """
+        Stops prefetching models of a registered xml handle. Models already being compiled are discarded.
+
+        Args:
+            key (int): Key returned by register.
+
+        """
+
+        with self._lock:
+            self._jobs.pop(key, None)
+
+    def shutdown(self):
+        """
+        Stops all worker processes. Pending compilations are discarded.
+
+        """
+
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._jobs.clear()
+
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool.join()
+                self._pool = None
+
+    @property
+    def n_workers(self):
+        """ Returns the number of worker processes. """
+
+        return self._n_workers
+
+    @property
+    def closed(self):
+        """ Returns True if the service is shut down. """
+
+        return self._closed
+
+    def _submit(self, key):
+        """
+        Samples the values of the next model and queues its compilation. The xml string is created outside of
+        the lock of the service, such that handles of other environments are not blocked meanwhile.
+
+        """
+
+        with self._lock:
+            job = self._jobs.get(key)
+        if job is None:
+            return
+
+        # sampling and queueing is done under the lock of the key to keep the values in the order of the models
+        with job["lock"]:
+            values = job["plan"].sample(job["rng"])
+            xml_string = job["plan"].apply_to_xml(job["xml_handle"], values).to_xml_string()
+
+            with self._lock:
+                if self._closed or key not in self._jobs:
+                    return
+                result = self._pool.apply_async(_compile_job, (key, xml_string, job["assets"]))
+                job["pending"].append((result, values))
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_compile_context():
+    """
+    Returns the multiprocessing context used to start compile workers. The forkserver start method is used if
+    available and spawn otherwise, as forking a process running other threads is unsafe.
+
+    Returns:
+        A multiprocessing context.
+
+    """
+
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    else:
+        return multiprocessing.get_context("spawn")
+
+
+def get_compile_service(n_workers=None):
+    """
+    Returns the compile service of the process, which is created on the first call.
+
+    Args:
+        n_workers (int): Number of worker processes of the service. Only used when the service is created. If None,
+            the number is read from the environment variable LOCO_MUJOCO_COMPILE_WORKERS and defaults to the
+            minimum of 4 and the number of cores.
+
+    Returns:
+        The ModelCompileService of the process.
+
+    """
+
+    global _service
+
+    with _service_lock:
+        if _service is None or _service.closed:
+            if n_workers is None:
+                n_workers = int(os.environ.get("LOCO_MUJOCO_COMPILE_WORKERS", min(4, os.cpu_count() or 1)))
+            _service = ModelCompileService(n_workers)
+        elif n_workers is not None and n_workers != _service.n_workers:
+            raise ValueError(f"The compile service is already running with {_service.n_workers} workers.")
+
+        return _service
+
+
+def shutdown_compile_service():
+    """
+    Shuts down the compile service of the process, if it is running.
+
+    """
+
+    global _service
+
+    with _service_lock:
+        if _service is not None:
+            _service.shutdown()
+            _service = None
+
+
+atexit.register(shutdown_compile_service)
+
+
+# assets of the registered keys, cached in each worker process
+_worker_assets = dict()
+
+
+def _compile_job(key, xml_string, assets):
+    """
+    Compiles a randomized model in a worker process.
+
+    Args:
+        key (int): Key of the xml handle.
+        xml_string (str): Xml string of the randomized model.
+        assets (bytes): Serialized assets of the xml handle.
+
+    Returns:
+        The randomized model.
+
+    """
+
+    if key not in _worker_assets:
+        _worker_assets[key] = pickle.loads(assets)
+
+    return mujoco.MjModel.from_xml_string(xml=xml_string, assets=_worker_assets[key])
@@ -0,0 +1,63 @@
+import numpy as np
+import mujoco
+
+
+class ContactForceAggregator:
+    """
+    Computes the contact forces between several pairs of collision groups with a single pass over the
+    contacts of a Mujoco data structure. The geoms of all groups are resolved once to a membership table,
+    such that the contacts belonging to each pair are found with a few vectorized lookups. As in
+    :code:`_get_collision_force` of the Mujoco environment, the force of the first contact found between the
+    two groups of a pair is returned.
+
+    """
+
+    def __init__(self, model, collision_groups, pairs):
+        """
+        Constructor.
+
+        Args:
+            model (MjModel): Mujoco model.
+            collision_groups (dict): Dictionary mapping the name of each collision group to a set of geom ids.
+            pairs (list): List of tuples (group1, group2) of the names of the collision groups.
+
+        """
+
+        self._n_pairs = len(pairs)
+
+        # membership table of each geom in the first and the second group of each pair
+        self._in_group1 = np.zeros((model.ngeom, self._n_pairs), dtype=bool)
+        self._in_group2 = np.zeros((model.ngeom, self._n_pairs), dtype=bool)
+        for i, (group1, group2) in enumerate(pairs):
+            self._in_group1[list(collision_groups[group1]), i] = True
+            self._in_group2[list(collision_groups[group2]), i] = True
+
+        self._forces = np.zeros((self._n_pairs, 6))
+        self._pair_idx = np.arange(self._n_pairs)
+
+    def __call__(self, model, data):
+        """
+        Computes the contact forces of all pairs.
+
+        Args:
+            model (MjModel): Mujoco model.
+            data (MjData): Mujoco data structure.
+
+        Returns:
+            np.array of shape (n_pairs, 6) containing the 3D force and 3D torque of each pair in the contact frame.
+            The entries are zero if there is no contact between the groups of a pair. The array is overwritten
+            by the next call.
+
+        """
+
+        self._forces[:] = 0.0
+
+        if data.ncon > 0:
+            geom1, geom2 = data.contact.geom1, data.contact.geom2
+            match = (self._in_group1[geom1] & self._in_group2[geom2]) | \
+                    (self._in_group2[geom1] & self._in_group1[geom2])
+            first_contact = np.argmax(match, axis=0)
+            for i in np.flatnonzero(match[first_contact, self._pair_idx]):
+                mujoco.mj_contactForce(model, data, first_contact[i], self._forces[i])
+
+        return self._forces
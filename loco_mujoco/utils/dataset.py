@@ -88,6 +88,22 @@ def download_perfect_datasets():
     os.remove(file_path)
 
 
+def convert_real_datasets_to_mmap():
+    """
+    Converts all installed real datasets to the memory-mapped trajectory format. The converted
+    datasets are automatically used by the environments.
+
+    """
+
+    from loco_mujoco.utils.trajectory import convert_npz_to_mmap
+
+    dataset_path = Path(loco_mujoco.__file__).resolve().parent / "datasets"
+
+    for path in sorted(dataset_path.glob("*/real/**/*.npz")):
+        print("Converting %s ..." % path)
+        convert_npz_to_mmap(path)
+
+
 def download_raw_mocap_datasets():
     """
     Download and installs raw mocap datasets, which are not optimized for any specific humanoid model.
@@ -1,9 +1,26 @@
 import yaml
 import mujoco
 import numpy as np
-from copy import deepcopy
+from pathlib import Path
 from dm_control import mjcf
-from multiprocessing import Queue, Pool
+from loco_mujoco.utils.compile_service import get_compile_service, get_compile_context
+
+
+# parameters that can be randomized directly in the compiled model and the respective attributes of the model
+DIRECT_JOINT_PARAMS = {"damping": "dof_damping", "frictionloss": "dof_frictionloss", "armature": "dof_armature",
+                       "stiffness": "jnt_stiffness"}
+DIRECT_GEOM_PARAMS = {"friction": "geom_friction"}
+DIRECT_INERTIAL_PARAMS = {"mass": "body_mass", "diaginertia": "body_inertia"}
+DIRECT_MODEL_ATTRIBUTES = list(DIRECT_JOINT_PARAMS.values()) + list(DIRECT_GEOM_PARAMS.values()) + \
+    list(DIRECT_INERTIAL_PARAMS.values())
+
+# parameters supported for each kind of component
+SUPPORTED_PARAMS = {"joint": ("damping", "frictionloss", "armature", "stiffness"),
+                    "geom": ("mass", "friction", "density"),
+                    "inertial": ("mass", "diaginertia", "fullinertia")}
+
+# attributes of the model stored in the parameter table of a bank of randomized models
+BANK_PARAMETER_ATTRIBUTES = DIRECT_MODEL_ATTRIBUTES + ["body_ipos", "body_iquat"]
 
 
 class DomainRandomizationHandler:
@@ -117,11 +134,46 @@ class DomainRandomizationHandler:
     Compilation of a model given its XML file can be time-consuming. To speed up the domain randomization process, the
     domain randomization can be done in parallel. Then, models with randomized parameters will be compiled *while the
     training of another model is running*. To enable parallel compilation, set the parameter :code:`parallel` to :code:`True`.
-    Instead of compiling just one model in parallel, we allow to compile multiple models in parallel for to speed up even
-    further. To do so, set the :code:`N_worker_per_xml` parameter to the number of workers you want to use for each XML file.
+    The models are compiled by a single pool of workers shared by all environments of the process (see
+    :code:`ModelCompileService`). Its size is set with the environment variable :code:`LOCO_MUJOCO_COMPILE_WORKERS`
+    or by calling :code:`get_compile_service` before creating the environments. The :code:`N_worker_per_xml`
+    parameter sets how many models are compiled ahead of time for each XML file. The parameters are sampled in the
+    main process, hence the randomized models are reproducible with a :code:`seed`.
+
+    .. note:: Parallelization is done using :code:`multiprocessing` with the forkserver (or spawn) start method,
+     hence the entry point of scripts using it has to be protected with :code:`if __name__ == "__main__":`.
+     If this is interfering with your code, we suggest to disable parallelization.
+
+    Direct Randomization
+    --------------------
+
+    Most of the parameters above do not require to recompile the model, as they are stored as they are in the
+    compiled model. If :code:`direct` is set to :code:`True`, the damping, frictionloss, armature and stiffness of
+    the joints, the friction of the geoms, and the mass and diaginertia of the inertials are written directly into
+    the arrays of the compiled model (e.g., :code:`dof_damping`, :code:`geom_friction` or :code:`body_mass`), sampled
+    around the nominal values of the model. Hence, the model and its data are reused across episodes. Only the
+    remaining parameters (the mass and density of the geoms, and fullinertia) are randomized by recompiling the
+    XML file. If none of them is randomized, no model is compiled and no workers are started at all.
+
+    Sampling
+    --------
+
+    The config is compiled once per XML file into a :code:`DomainRandomizationPlan`, a flat table of all randomized
+    parameters. All parameters of a model are sampled at once from a :code:`np.random.Generator`, which can be seeded
+    with :code:`seed`. The values sampled for the last randomized model can be retrieved with
+    :code:`get_sampled_parameters`, e.g., for logging. In parallel mode, each worker samples with its own generator,
+    so the models are not reproducible.
 
-    .. note:: Parallelization is done using :code:`multiprocessing`. If this is interfering with your code, we suggest
-     to disable parallelization.
+    Model Bank
+    ----------
+
+    Instead of compiling the randomized models while training, a bank of randomized models can be generated
+    offline with :code:`save_bank`. Each model is stored as binary Mujoco model (:code:`.mjb`) together with a table
+    of its randomized parameters (:code:`parameters_<model-id>.npz`). If :code:`bank_path` is passed, a random entry
+    of the bank is loaded whenever a randomized model is requested, such that neither compilation nor workers are
+    needed at run time. As the entries are drawn with the generator of the handler, runs are reproducible given the
+    bank and the seed. In direct mode, the bank only contains the parameters requiring a recompilation, while the other ones
+    are still randomized directly in the loaded model.
 
     Example
     -------
@@ -188,7 +240,8 @@ class DomainRandomizationHandler:
 
     """
 
-    def __init__(self, xml_handles, domain_rand_conf_path, parallel=True, N_worker_per_xml=4):
+    def __init__(self, xml_handles, domain_rand_conf_path, parallel=True, N_worker_per_xml=4, direct=False,
+                 bank_path=None, seed=None):
         """
         Constructor.
 
@@ -196,7 +249,13 @@ class DomainRandomizationHandler:
             xml_handles : List of Mujoco xml handles.
             domain_rand_conf_path (str): Path to the domain randomization config file.
             parallel (bool): If True, domain randomization will be done in parallel to speed up the simulation runtime.
-            N_worker_per_xml (int): Number of workers for parallel domain randomization.
+            N_worker_per_xml (int): Number of models compiled ahead of time per xml handle for parallel domain
+                randomization. The models are compiled by the compile service shared within the process.
+            direct (bool): If True, all parameters not requiring a recompilation are randomized directly in the
+                compiled model.
+            bank_path (str): Path to a bank of randomized models created with save_bank. If provided, the
+                randomized models are loaded from the bank instead of being compiled.
+            seed (int): Seed of the generator used for sampling. If None, the seed is drawn from np.random.
 
         """
 
@@ -204,28 +263,463 @@ class DomainRandomizationHandler:
         self._xml_handles = xml_handles
         self._domain_rand_conf_path = domain_rand_conf_path
         self._curr_model_id = None
-        self.parallel = parallel
-
-        if parallel:
-            self._send_queues = [Queue(N_worker_per_xml) for i in range(len(self._xml_handles))]
-            self._recv_queues = [Queue(1) for i in range(len(self._xml_handles))]
-            self._pools = [Pool(N_worker_per_xml, build_MjModel_from_xml_handle_job,
-                               (deepcopy(h), domain_rand_conf_path, sq, rq)) for h, sq, rq in
-                           zip(self._xml_handles, self._send_queues, self._recv_queues)]
-            for rq in self._recv_queues:
-                for i in range(N_worker_per_xml):
-                    rq.put("get")
 
-    def get_randomized_model(self, model_id):
-        """ Returns a randomized model based on the model-id. """
+        config = load_domain_randomization_config(domain_rand_conf_path)
+        if direct:
+            self._config, self._direct_config = split_domain_randomization_config(config)
+        else:
+            self._config, self._direct_config = config, None
+
+        # drawing the seed from np.random keeps runs reproducible with a global seed
+        if seed is None:
+            seed = np.random.randint(np.iinfo(np.int32).max)
+        self._rng = np.random.default_rng(seed)
+
+        # the plans of the directly randomized parameters require a compiled model, they are created lazily
+        self._xml_plans = [DomainRandomizationPlan(h, self._config) for h in self._xml_handles]
+        self._direct_plans = [None] * len(self._xml_handles)
+        self._sampled_values = [dict() for i in range(len(self._xml_handles))]
+        self._needs_recompilation = not direct or any(plan.size > 0 for plan in self._xml_plans)
+
+        # the files of the bank, their sampled values and the index of the last loaded entry per model
+        if bank_path is not None and self._needs_recompilation:
+            self._bank_files = [get_bank_files(bank_path, i) for i in range(len(self._xml_handles))]
+            self._bank_values = [load_bank_parameters(bank_path, i)["plan_values"]
+                                 for i in range(len(self._xml_handles))]
+            for plan, values in zip(self._xml_plans, self._bank_values):
+                assert values.shape[1] == plan.size, f"The bank {bank_path} was created with another config."
+        else:
+            self._bank_files = None
+        self._bank_path = bank_path
+        self._bank_entries = [None] * len(self._xml_handles)
 
+        self.parallel = parallel and self._needs_recompilation and self._bank_files is None
         if self.parallel:
-            model = self._send_queues[model_id].get()
-            self._recv_queues[model_id].put("get")
+            self._compile_service = get_compile_service()
+            # each xml handle gets its own generator, as its models are sampled in the background
+            self._compile_keys = [self._compile_service.register(h, plan, self._spawn_rng(), N_worker_per_xml)
+                                  for h, plan in zip(self._xml_handles, self._xml_plans)]
         else:
-            model = build_MjModel_from_xml_handle(self._xml_handles[model_id], self._domain_rand_conf_path)
+            self._compile_service = None
+            self._compile_keys = []
+
+    def get_randomized_model(self, model_id):
+        """ Returns a newly compiled randomized model based on the model-id. """
+
+        plan = self._xml_plans[model_id]
+        if self._bank_files is not None:
+            entry = self._rng.integers(len(self._bank_files[model_id]))
+            model = mujoco.MjModel.from_binary_path(str(self._bank_files[model_id][entry]))
+            values = self._bank_values[model_id][entry]
+            self._bank_entries[model_id] = entry
+        elif self.parallel:
+            model, values = self._compile_service.get(self._compile_keys[model_id])
+        else:
+            values = plan.sample(self._rng)
+            model = build_MjModel_from_plan(self._xml_handles[model_id], plan, values)
+
+        self._sampled_values[model_id] = plan.to_dict(values)
+
+        if self._direct_config is not None:
+            self._randomize_model_direct(model_id, model)
+
         return model
 
+    def randomize_model(self, model_id, model, data=None):
+        """
+        Randomizes all parameters not requiring a recompilation in place. The sampled values are drawn
+        around the nominal values of the model, which are copied on the first call for each model-id.
+
+        Args:
+            model_id (int): Id of the model.
+            model: Mujoco model to be randomized.
+            data: Mujoco data of the model. If provided, the constants depending on the masses are recomputed,
+                for which the data is used as scratch space.
+
+        """
+
+        assert self._direct_config is not None, "The direct randomization is not enabled."
+
+        self._randomize_model_direct(model_id, model)
+
+        if data is not None:
+            mujoco.mj_setConst(model, data)
+
+    def close(self):
+        """
+        Stops prefetching randomized models for this handler. The shared compile service keeps running.
+
+        """
+
+        if self._compile_service is not None and not self._compile_service.closed:
+            for key in self._compile_keys:
+                self._compile_service.unregister(key)
+        self._compile_keys = []
+
+    def get_sampled_parameters(self, model_id):
+        """
+        Returns the values sampled for the last randomized model, e.g., for logging.
+
+        Args:
+            model_id (int): Id of the model.
+
+        Returns:
+            Dictionary mapping the names of the randomized parameters (see DomainRandomizationPlan) to their values.
+
+        """
+
+        return dict(self._sampled_values[model_id])
+
+    def save_bank(self, bank_path, n_models, n_workers=1, seed=None):
+        """
+        Generates a bank of randomized models and stores it in a directory. For each xml handle, n_models are
+        compiled and saved as binary Mujoco models. The sampled values and the randomized attributes of all
+        models are saved in a table. In direct mode, only the parameters requiring a recompilation are randomized.
+
+        Args:
+            bank_path (str): Path to the directory of the bank.
+            n_models (int): Number of randomized models per xml handle.
+            n_workers (int): Number of processes used for compilation.
+            seed (int): Seed used to randomize the models. If None, the generator of the handler is used.
+
+        """
+
+        bank_path = Path(bank_path)
+        bank_path.mkdir(parents=True, exist_ok=True)
+
+        rng = self._rng if seed is None else np.random.default_rng(seed)
+        for model_id, (xml_handle, plan) in enumerate(zip(self._xml_handles, self._xml_plans)):
+            values = plan.sample(rng, n_models)
+            files = [bank_path / f"model_{model_id}_{i}.mjb" for i in range(n_models)]
+            if n_workers > 1:
+                assets = xml_handle.get_assets()
+                jobs = [(plan.apply_to_xml(xml_handle, v).to_xml_string(), assets, f) for v, f in zip(values, files)]
+                with get_compile_context().Pool(n_workers) as pool:
+                    parameters = pool.starmap(build_bank_entry_job, jobs)
+            else:
+                parameters = [build_bank_entry(xml_handle, plan, v, f) for v, f in zip(values, files)]
+
+            np.savez(bank_path / f"parameters_{model_id}.npz", plan_values=values, plan_names=np.array(plan.names),
+                     **{attr: np.stack([p[attr] for p in parameters]) for attr in BANK_PARAMETER_ATTRIBUTES})
+
+        with open(bank_path / "config.yaml", "w") as file:
+            yaml.safe_dump(self._config, file)
+
+    def get_bank_parameters(self, model_id):
+        """
+        Returns the table of randomized parameters of the bank.
+
+        Args:
+            model_id (int): Id of the model.
+
+        Returns:
+            Dictionary mapping the model attributes to arrays with one row per entry of the bank. The sampled
+            values of the plan and their names are stored under "plan_values" and "plan_names".
+
+        """
+
+        assert self._bank_path is not None, "No bank of randomized models is used."
+
+        return load_bank_parameters(self._bank_path, model_id)
+
+    @property
+    def bank_entries(self):
+        """ Returns the index of the last loaded entry of the bank for each model. """
+
+        return self._bank_entries
+
+    @property
+    def needs_recompilation(self):
+        """ Returns True if the models have to be recompiled for randomization. """
+
+        return self._needs_recompilation
+
+    def _randomize_model_direct(self, model_id, model):
+        """
+        Writes sampled values of the directly randomized parameters into the model.
+
+        Args:
+            model_id (int): Id of the model.
+            model: Mujoco model to be randomized.
+
+        """
+
+        if self._direct_plans[model_id] is None:
+            self._direct_plans[model_id] = DomainRandomizationPlan(self._xml_handles[model_id], self._direct_config,
+                                                                   model)
+        plan = self._direct_plans[model_id]
+
+        values = plan.sample(self._rng)
+        plan.apply_to_model(model, values)
+        self._sampled_values[model_id].update(plan.to_dict(values))
+
+    def _spawn_rng(self):
+        """
+        Returns a new generator seeded from the generator of the handler.
+
+        """
+
+        return np.random.default_rng(self._rng.integers(np.iinfo(np.int64).max))
+
+    def __del__(self):
+        if hasattr(self, "_compile_keys"):
+            self.close()
+
+
+class DomainRandomizationPlan:
+    """
+    Domain randomization config compiled for a single xml handle. The config is resolved once into a flat table
+    of entries (component, parameter, distribution, distribution parameters), and the values of all entries are
+    stored in a single vector. Hence, sampling a vector, or a batch of vectors, takes one call of the generator
+    per distribution type (normal and uniform), and the config is neither parsed nor the xml traversed again.
+
+    Each entry either targets an element of the xml handle, or, if a compiled model is passed, the array of the
+    model for all parameters that can be randomized directly (e.g., :code:`dof_damping` for the damping of a joint).
+    The nominal values, around which the distributions are centered, are read once from the xml handle or the model,
+    respectively. The entries are named "<component>/<name>/<parameter>", e.g., "joint/FR_hip_joint/damping",
+    "inertial/FR_hip/mass" or "geom/FR_hip/0/friction", where geoms are referred to by their body and index.
+
+    """
+
+    def __init__(self, xml_handle, config, model=None):
+        """
+        Constructor.
+
+        Args:
+            xml_handle: Mujoco xml handle.
+            config (dict): Domain randomization config.
+            model: Mujoco model compiled from the xml handle. If provided, all parameters that do not require a
+                recompilation target the model.
+
+        """
+
+        self._names = []
+        self._xml_entries = []
+        self._model_entries = []
+        self._nominal, self._normal_scale, self._uniform_low, self._uniform_high = [], [], [], []
+        self._normal_idx, self._uniform_idx = [], []
+        self._size = 0
+
+        # the elements of the xml handle targeted by the entries, resolved once per handle
+        self._bound_handle = None
+        self._bound_elements = None
+
+        config = config if config is not None else dict()
+        config_joints = config.get("Joints", None)
+        config_default = config.get("Default", None)
+        config_interial = config.get("Inertial", None)
+        config_geoms = config.get("Geoms", None)
+
+        for i, jh in enumerate(xml_handle.find_all("joint")):
+            if config_joints is not None and jh.name in config_joints.keys():
+                self._add_entries(config_joints[jh.name], ("joint", i), jh, jh, jh.name, model)
+            elif config_default is not None and "Joints" in config_default.keys():
+                if "exclude" in config_default.keys() and jh.name not in config_default["exclude"]:
+                    self._add_entries(config_default["Joints"], ("joint", i), jh, jh, jh.name, model)
+
+        for i, bh in enumerate(xml_handle.find_all("body")):
+            if config_interial is not None and bh.name in config_interial.keys() and bh.inertial is not None:
+                self._add_entries(config_interial[bh.name], ("inertial", i), bh.inertial, bh, bh.name, model)
+            elif config_default is not None and "Inertial" in config_default.keys() and bh.inertial is not None:
+                self._add_entries(config_default["Inertial"], ("inertial", i), bh.inertial, bh, bh.name, model)
+            if config_geoms is not None and bh.name in config_geoms.keys() and bh.geom is not None:
+                for j, g in enumerate(bh.geom):
+                    self._add_entries(config_geoms[bh.name], ("geom", i, j), g, g, f"{bh.name}/{j}", model)
+            elif config_default is not None and "Geoms" in config_default.keys() and bh.geom is not None:
+                for j, g in enumerate(bh.geom):
+                    self._add_entries(config_default["Geoms"], ("geom", i, j), g, g, f"{bh.name}/{j}", model)
+
+        self._nominal = np.array(self._nominal)
+        self._normal_scale = np.array(self._normal_scale)
+        self._uniform_low = np.array(self._uniform_low)
+        self._uniform_high = np.array(self._uniform_high)
+        self._normal_idx = np.array(self._normal_idx, dtype=int)
+        self._uniform_idx = np.array(self._uniform_idx, dtype=int)
+
+    def sample(self, rng, n=None):
+        """
+        Samples the values of all entries.
+
+        Args:
+            rng (np.random.Generator): Generator used for sampling.
+            n (int): Number of samples. If None, a single sample is returned.
+
+        Returns:
+            np.array of shape (size,), or of shape (n, size) if n is provided.
+
+        """
+
+        n_samples = 1 if n is None else n
+        values = np.empty((n_samples, self._size))
+
+        if len(self._normal_idx) > 0:
+            values[:, self._normal_idx] = np.clip(rng.normal(self._nominal[self._normal_idx], self._normal_scale,
+                                                             size=(n_samples, len(self._normal_idx))), 0.0, np.inf)
+        if len(self._uniform_idx) > 0:
+            values[:, self._uniform_idx] = rng.uniform(self._uniform_low, self._uniform_high,
+                                                       size=(n_samples, len(self._uniform_idx)))
+
+        return values[0] if n is None else values
+
+    def apply_to_xml(self, xml_handle, values):
+        """
+        Sets the sampled values of all entries targeting the xml handle.
+
+        Args:
+            xml_handle: Mujoco xml handle the plan was created from, or a copy of it.
+            values (np.array): Sampled values of shape (size,).
+
+        Returns:
+            Modified Mujoco XML Handle.
+
+        """
+
+        for element, (locator, param_name, value_slice, basis) in zip(self._get_xml_elements(xml_handle),
+                                                                      self._xml_entries):
+            value = values[value_slice]
+            if param_name == "fullinertia":
+                # the singular values are randomized, the full inertia is computed again
+                U, Vh = basis
+                triu = U @ np.diag(value) @ Vh
+                value = np.array([triu[0, 0], triu[1, 1], triu[2, 2], triu[0, 1], triu[0, 2], triu[1, 2]])
+            elif len(value) == 1:
+                value = float(value[0])
+            setattr(element, param_name, value)
+
+        return xml_handle
+
+    def apply_to_model(self, model, values):
+        """
+        Writes the sampled values of all entries targeting the model into the model.
+
+        Args:
+            model: Mujoco model the plan was created with, or a model compiled from the same xml handle.
+            values (np.array): Sampled values of shape (size,).
+
+        """
+
+        for attr, idx, shape, value_slice in self._model_entries:
+            getattr(model, attr)[idx] = values[value_slice].reshape(shape)
+
+    def to_dict(self, values):
+        """
+        Maps sampled values to the names of the entries.
+
+        Args:
+            values (np.array): Sampled values of shape (size,) or (n, size).
+
+        Returns:
+            Dictionary mapping the names of the entries to their values.
+
+        """
+
+        return {name: values[..., value_slice] if value_slice.stop - value_slice.start > 1
+                else values[..., value_slice.start] for name, value_slice in self._names}
+
+    @property
+    def names(self):
+        """ Returns the names of all entries. """
+
+        return [name for name, value_slice in self._names]
+
+    @property
+    def size(self):
+        """ Returns the size of the vector of sampled values. """
+
+        return self._size
+
+    def _add_entries(self, conf, locator, h, id_handle, element_name, model):
+        """
+        Adds the entries of all parameters of a component.
+
+        Args:
+            conf (dict): Dictionary defining the randomization properties of the component.
+            locator (tuple): Kind and index of the component in the xml handle.
+            h: Mujoco xml handle of the component.
+            id_handle: Mujoco xml handle of the element identifying the component in the model.
+            element_name (str): Name of the component.
+            model: Mujoco model or None.
+
+        """
+
+        kind = locator[0]
+        direct_params, obj_type = {"joint": (DIRECT_JOINT_PARAMS, mujoco.mjtObj.mjOBJ_JOINT),
+                                   "inertial": (DIRECT_INERTIAL_PARAMS, mujoco.mjtObj.mjOBJ_BODY),
+                                   "geom": (DIRECT_GEOM_PARAMS, mujoco.mjtObj.mjOBJ_GEOM)}[kind]
+
+        for param_name, param in conf.items():
+            if param_name not in SUPPORTED_PARAMS[kind]:
+                raise ValueError(f"Parameter {param_name} currently nor supported for domain randomization.")
+
+            name = f"{kind}/{element_name}/{param_name}"
+            dist, dist_params = get_distribution(param_name, param, h, name)
+
+            value_slice_start = self._size
+            if model is not None and param_name in direct_params.keys():
+                attr = direct_params[param_name]
+                element_id = mujoco.mj_name2id(model, obj_type, id_handle.full_identifier)
+                assert element_id >= 0, f"Could not find the {kind} {id_handle.full_identifier} in the model."
+                if attr.startswith("dof_"):
+                    # the parameters of the joints are stored per degree of freedom
+                    idx = np.where(model.dof_jntid == element_id)[0]
+                else:
+                    idx = element_id
+                nominal = getattr(model, attr)[idx]
+                self._model_entries.append((attr, idx, np.shape(nominal),
+                                            slice(value_slice_start, value_slice_start + np.size(nominal))))
+                nominal = np.ravel(nominal).astype(float)
+            else:
+                nominal, basis = get_xml_nominal_value(kind, param_name, h)
+                self._xml_entries.append((locator, param_name,
+                                          slice(value_slice_start, value_slice_start + len(nominal)), basis))
+
+            check_distribution(dist, dist_params, nominal, param_name, name)
+
+            size = len(nominal)
+            value_idx = list(range(value_slice_start, value_slice_start + size))
+            self._nominal.extend(nominal)
+            if dist == "sigma":
+                self._normal_idx.extend(value_idx)
+                self._normal_scale.extend(np.broadcast_to(dist_params, size))
+            elif dist == "uniform_range":
+                self._uniform_idx.extend(value_idx)
+                self._uniform_low.extend(np.broadcast_to(dist_params[0], size))
+                self._uniform_high.extend(np.broadcast_to(dist_params[1], size))
+            else:
+                self._uniform_idx.extend(value_idx)
+                self._uniform_low.extend(nominal - dist_params)
+                self._uniform_high.extend(nominal + dist_params)
+
+            self._names.append((name, slice(value_slice_start, value_slice_start + size)))
+            self._size += size
+
+    def _get_xml_elements(self, xml_handle):
+        """
+        Returns the elements of the xml handle targeted by the entries.
+
+        """
+
+        if self._bound_handle is not xml_handle:
+            joints = xml_handle.find_all("joint")
+            bodies = xml_handle.find_all("body")
+            elements = []
+            for locator, param_name, value_slice, basis in self._xml_entries:
+                if locator[0] == "joint":
+                    elements.append(joints[locator[1]])
+                elif locator[0] == "inertial":
+                    elements.append(bodies[locator[1]].inertial)
+                else:
+                    elements.append(bodies[locator[1]].geom[locator[2]])
+            self._bound_handle, self._bound_elements = xml_handle, elements
+
+        return self._bound_elements
+
+    def __getstate__(self):
+        # the bound xml handle is not sent to other processes
+        state = self.__dict__.copy()
+        state["_bound_handle"], state["_bound_elements"] = None, None
+        return state
+
 
 def apply_domain_randomization(xml_handle, domain_randomization_config):
     """
@@ -234,7 +728,8 @@ def apply_domain_randomization(xml_handle, domain_randomization_config):
 
     Args:
         xml_handle: Handle to Mujoco XML.
-        domain_randomization_config (str): Path to the configuration file for domain randomization.
+        domain_randomization_config (str or dict): Path to the configuration file for domain randomization or
+            the loaded configuration.
 
     Returns:
         Modified Mujoco XML Handle.
@@ -242,276 +737,109 @@ def apply_domain_randomization(xml_handle, domain_randomization_config):
     """
 
     if domain_randomization_config is not None:
-        with open(domain_randomization_config, 'r') as file:
-            config = yaml.safe_load(file)
-        # apply domain randomization on joints
-        if config is not None:
-            if "Joints" in config.keys():
-                config_joints = config["Joints"]
-            else:
-                config_joints = None
-            if "Default" in config.keys():
-                config_default = config["Default"]
-            else:
-                config_default = None
-            if "Inertial" in config.keys():
-                config_interial = config["Inertial"]
-            else:
-                config_interial = None
-            if "Geoms" in config.keys():
-                config_geoms = config["Geoms"]
-            else:
-                config_geoms = None
-
-            # apply all modification to joints
-            all_joints = xml_handle.find_all("joint")
-            for jh in all_joints:
-                if config_joints is not None and jh.name in config_joints.keys():
-                    conf = config_joints[jh.name]
-                    set_joint_conf(conf, jh)
-                elif config_default is not None and "Joints" in config_default.keys():
-                    if "exclude" in config_default.keys() and jh.name not in config_default["exclude"]:
-                        conf = config_default["Joints"]
-                        set_joint_conf(conf, jh)
-            # apply all modifications to interial elements
-            all_bodies = xml_handle.find_all("body")
-            for bh in all_bodies:
-                # apply modification to inertial
-                if config_interial is not None and bh.name in config_interial.keys() and bh.inertial is not None:
-                    conf = config_interial[bh.name]
-                    set_inertial_conf(conf, bh.inertial)
-                elif config_default is not None and "Inertial" in config_default.keys() and bh.inertial is not None:
-                    conf = config_default["Inertial"]
-                    set_inertial_conf(conf, bh.inertial)
-                # apply modifications to geoms
-                if config_geoms is not None and bh.name in config_geoms.keys() and bh.geom is not None:
-                    conf = config_geoms[bh.name]
-                    for g in bh.geom:
-                        set_geom_conf(conf, g)
-                elif config_default is not None and "Geoms" in config_default.keys() and bh.geom is not None:
-                    conf = config_default["Geoms"]
-                    for g in bh.geom:
-                        set_geom_conf(conf, g)
+        plan = DomainRandomizationPlan(xml_handle, load_domain_randomization_config(domain_randomization_config))
+        rng = np.random.default_rng(np.random.randint(np.iinfo(np.int32).max))
+        plan.apply_to_xml(xml_handle, plan.sample(rng))
 
     return xml_handle
 
 
-def set_joint_conf(conf, jh):
+def get_xml_nominal_value(kind, param_name, h):
     """
-    Set the properties of the joint handle (jh) to the randomization properties defined in conf.
+    Returns the nominal value of a parameter in the xml handle.
 
     Args:
-        conf (dict): Dictionary defining the randomization properties of the joint.
-        jh: Mujoco joint handle to be modified.
+        kind (str): Kind of the component, either "joint", "inertial" or "geom".
+        param_name (str): Name of the parameter.
+        h: Mujoco xml handle of the component.
 
     Returns:
-        Mujoco joint handle.
+        Tuple of the nominal value as flat np.array and the basis of the singular values for fullinertia.
 
     """
 
-    for param_name, param in conf.items():
-        valid_params = {"sigma", "uniform_range", "uniform_range_delta"}
-        found_valid_elements = list(set(param.keys()) & valid_params)  # get number by intersection
-        assert len(found_valid_elements) == 1, f"Exactly one parameter should be provided for joint " \
-                                               f"{jh.name}, but found {len(found_valid_elements)}" \
-                                               f" for {param_name}. Valid parameters are {valid_params}."
-        if "sigma" in param.keys():
-            if param_name == "damping":
-                jh.damping = np.clip(np.random.normal(jh.damping if jh.damping is not None else 0.0,
-                                                      param["sigma"]), 0.0, np.Inf)
-            elif param_name == "frictionloss":
-                jh.frictionloss = np.clip(np.random.normal(jh.frictionloss
-                                                           if jh.frictionloss is not None else 0.0,
-                                                           param["sigma"]), 0.0, np.Inf)
-            elif param_name == "armature":
-                jh.armature = np.clip(np.random.normal(jh.armature if jh.armature is not None else 0.0,
-                                                       param["sigma"]), 0.0, np.Inf)
-            elif param_name == "stiffness":
-                jh.stiffness = np.clip(np.random.normal(jh.stiffness
-                                                        if jh.stiffness is not None else 0.0,
-                                                        param["sigma"]), 0.0, np.Inf)
-            else:
-                raise ValueError(f"Parameter {param_name} currently nor supported "
-                                 f"for domain randomization.")
-        elif "uniform_range" in param.keys():
-            low, high = check_uniform_range_conf(jh, param["uniform_range"])
-            if param_name == "damping":
-                jh.damping = np.random.uniform(low, high)
-            elif param_name == "frictionloss":
-                jh.frictionloss = np.random.normal(low, high)
-            elif param_name == "armature":
-                jh.armature = np.random.normal(low, high)
-            elif param_name == "stiffness":
-                jh.stiffness = np.random.normal(low, high)
-            else:
-                raise ValueError(f"Parameter {param_name} currently nor supported "
-                                 f"for domain randomization.")
-        elif "uniform_range_delta":
-            delta = check_uniform_range_delta_conf(jh, param["uniform_range_delta"])
-            if param_name == "damping":
-                if jh.damping is None:
-                    jh.damping = 0.0
-                low, high = jh.damping - delta, jh.damping + delta
-                assert low > 0.0, f"uniform_range_delta param ({delta}) for joint {jh.name} is bigger" \
-                                  f" than damping ({jh.damping}). Negative dampings are not allowed."
-                jh.damping = np.random.uniform(low, high)
-            elif param_name == "frictionloss":
-                if jh.frictionloss is None:
-                    jh.frictionloss = 0.0
-                low, high = jh.frictionloss - delta, jh.frictionloss + delta
-                assert low > 0.0, f"uniform_range_delta param ({delta}) for joint {jh.name} is bigger" \
-                                  f" than frictionloss ({jh.frictionloss}). Negative frictionlosses are not allowed."
-                jh.frictionloss = np.random.normal(low, high)
-            elif param_name == "armature":
-                if jh.armature is None:
-                    jh.armature = 0.0
-                low, high = jh.armature - delta, jh.armature + delta
-                assert low > 0.0, f"uniform_range_delta param ({delta}) for joint {jh.name} is bigger" \
-                                  f" than armature ({jh.armature}). Negative armatures are not allowed."
-                jh.armature = np.random.normal(low, high)
-            elif param_name == "stiffness":
-                if jh.stiffness is None:
-                    jh.stiffness = 0.0
-                low, high = jh.stiffness - delta, jh.stiffness + delta
-                assert low > 0.0, f"uniform_range_delta param ({delta}) for joint {jh.name} is bigger" \
-                                  f" than stiffness ({jh.stiffness}). Negative stiffness are not allowed."
-                jh.stiffness = np.random.normal(low, high)
-            else:
-                raise ValueError(f"Parameter {param_name} currently nor supported "
-                                 f"for domain randomization.")
+    value = getattr(h, param_name)
+    if kind == "joint":
+        # unspecified joint parameters default to zero
+        value = value if value is not None else 0.0
+    else:
+        name = h.parent.name
+        if kind == "geom" and param_name == "density":
+            assert value is not None, f"Randomizing the density is not allowed when not specified in the xml. " \
+                                      f"Error occurred in body {name}."
+        else:
+            assert value is not None, f"Randomizing {param_name} not allowed if not specified in xml. " \
+                                      f"Error occurred in body {name}."
 
-    return jh
+    if param_name == "fullinertia":
+        # Do svd and apply randomization only on singular values
+        fi = value
+        triu = np.array([[fi[0], fi[3], fi[4]], [0.0, fi[1], fi[5]], [0.0, 0.0, fi[2]]])
+        U, sing_val, Vh = np.linalg.svd(triu, compute_uv=True)
+        return sing_val, (U, Vh)
 
+    return np.atleast_1d(np.array(value, dtype=float)), None
 
-def set_geom_conf(conf, gh):
+
+def get_distribution(param_name, param, h, name):
     """
-    Set the properties of the geom handle (gh) to the randomization properties defined in conf.
+    Returns the randomization distribution of a parameter.
 
     Args:
-        conf (dict): Dictionary defining the randomization properties of the geom.
-        gh: Mujoco geom handle to be modified.
+        param_name (str): Name of the parameter.
+        param (dict): Config of the parameter.
+        h: Mujoco xml handle of the component.
+        name (str): Name of the entry used in error messages.
 
     Returns:
-        Mujoco geom handle.
+        Tuple of the distribution name and its parameters.
 
     """
 
-    for param_name, param in conf.items():
-        valid_params = {"sigma", "uniform_range", "uniform_range_delta"}
-        found_valid_elements = list(set(param.keys()) & valid_params)    # get number by intersection
-        assert len(found_valid_elements) == 1, f"Exactly one parameter should be provided for geom of " \
-                                               f"body {gh.parent.name}, but found {len(found_valid_elements)}" \
-                                               f" for {param_name}. Valid parameters are {valid_params}."
-
-        if param_name == "mass":
-            assert gh.mass is not None, f"Randomizing masses not allowed if not specified in xml. " \
-                                        f"Error occurred in body {gh.parent.name}."
-            if "sigma" in param.keys():
-                gh.mass = np.clip(np.random.normal(gh.mass, param["sigma"]), 0.0, np.Inf)
-            elif "uniform_range" in param.keys():
-                low, high = check_uniform_range_conf(gh, param["uniform_range"])
-                gh.mass = np.random.uniform(low, high)
-            elif "uniform_range_delta" in param.keys():
-                delta = check_uniform_range_delta_conf(gh, param["uniform_range_delta"])
-                low, high = gh.mass - delta, gh.mass + delta
-                assert low > 0.0, f"uniform_range_delta param ({delta}) for body {gh.parent.name} is bigger" \
-                                  f" than mass ({gh.mass}). Negative masses are not allowed."
-                gh.mass = np.random.uniform(low, high)
-        elif param_name == "friction":
-            if "sigma" in param.keys():
-                dim_sigma = len(param["sigma"])
-                assert dim_sigma == 3, f"sigma for randomizing friction in geom of body {gh.parent.name} " \
-                                       f"needs to be 3-dimensional but is {dim_sigma}."
-                assert gh.friction is not None, f"Randomizing friction not allowed if not specified in xml. " \
-                                                f"Error occurred in body {gh.parent.name}."
-                gh.friction = np.clip(np.random.normal(gh.friction, param["sigma"]), 0.0, np.Inf)
-            elif "uniform_range_delta" in param.keys():
-                dim_range = len(param["uniform_range_delta"])
-                assert dim_range == 3, f"uniform_range_delta for randomizing friction in geom of body {gh.parent.name} " \
-                                       f"needs to be 3-dimensional but is {dim_range}."
-                delta = param["uniform_range_delta"]
-                assert gh.friction is not None, f"Randomizing friction not allowed if not specified in xml. " \
-                                                f"Error occurred in body {gh.parent.name}."
-                assert np.all(gh.friction >= delta), f"uniform_delta range is bigger than friction coefficient. " \
-                                                     f"Negative friction coefficients are not allowed. " \
-                                                     f"Error occurred in body {gh.parent.name}."
-                low, high = gh.friction - delta, gh.friction + delta
-                gh.friction = np.random.uniform(low, high)
-        elif param_name == "density":
-            assert gh.density is not None, f"Randomizing the density is not allowed when not specified in the xml. " \
-                                           f"Error occurred in body {gh.parent.name}."
-            if "sigma" in param.keys():
-                gh.density = np.clip(np.random.normal(gh.density, param["sigma"]), 0.0, np.Inf)
-            elif "uniform_range" in param.keys():
-                low, high = check_uniform_range_conf(gh, param["uniform_range"])
-                gh.density = np.random.uniform(low, high)
-            elif "uniform_range_delta" in param.keys():
-                delta = check_uniform_range_delta_conf(gh, param["uniform_range_delta"])
-                low, high = gh.density - delta, gh.density + delta
-                assert low > 0.0, f"uniform_range_delta param ({delta}) for body {gh.parent.name} is bigger" \
-                                  f" than density ({gh.density}). Negative density are not allowed."
-                gh.density = np.random.uniform(low, high)
-
-    return gh
-
-
-def set_inertial_conf(conf, ih):
+    valid_params = {"sigma", "uniform_range", "uniform_range_delta"}
+    found_valid_elements = list(set(param.keys()) & valid_params)  # get number by intersection
+    assert len(found_valid_elements) == 1, f"Exactly one parameter should be provided for {name}, but found " \
+                                           f"{len(found_valid_elements)}. Valid parameters are {valid_params}."
+    dist = found_valid_elements[0]
+
+    if dist == "uniform_range":
+        dist_params = np.array(check_uniform_range_conf(h, param[dist]))
+    elif dist == "uniform_range_delta" and param_name != "friction":
+        dist_params = np.array(check_uniform_range_delta_conf(h, param[dist]))
+    else:
+        dist_params = np.array(param[dist], dtype=float)
+
+    if param_name in ("diaginertia", "fullinertia"):
+        assert dist == "uniform_range_delta", f"domain randomization of inertia only allowed using " \
+                                              f"uniform_range_delta, but found {list(param.keys())}."
+    if param_name == "friction":
+        assert dist != "uniform_range", "domain randomization of friction not allowed using uniform_range."
+        assert dist_params.shape == (3,), f"{dist} for randomizing {name} needs to be 3-dimensional but is " \
+                                          f"{dist_params.size}."
+
+    return dist, dist_params
+
+
+def check_distribution(dist, dist_params, nominal, param_name, name):
     """
-    Set the properties of the inertial handle (ih) to the randomization properties defined in conf.
+    Checks that a distribution centered around the nominal value does not produce negative values.
 
     Args:
-        conf (dict): Dictionary defining the randomization properties of the inertial.
-        ih: Mujoco inertial handle to be modified.
-
-    Returns:
-        Mujoco inertial handle.
+        dist (str): Name of the distribution.
+        dist_params (np.array): Parameters of the distribution.
+        nominal (np.array): Nominal value of the parameter.
+        param_name (str): Name of the parameter.
+        name (str): Name of the entry used in error messages.
 
     """
 
-    for param_name, param in conf.items():
-        valid_params = {"sigma", "uniform_range", "uniform_range_delta"}
-        found_valid_elements = list(set(param.keys()) & valid_params)    # get number by intersection
-        assert len(found_valid_elements) == 1, f"Exactly one parameter should be provided for inertial of " \
-                                               f"body {ih.parent.name}, but found {len(found_valid_elements)}" \
-                                               f" for {param_name}. Valid parameters are {valid_params}."
-
-        if param_name == "mass":
-            assert ih.mass is not None, "Randomizing masses not allowed if not specified in xml."
-            if "sigma" in param.keys():
-                ih.mass = np.clip(np.random.normal(ih.mass, param["sigma"]), 0.0, np.Inf)
-            elif "uniform_range" in param.keys():
-                low, high = check_uniform_range_conf(ih, param["uniform_range"])
-                ih.mass = np.random.uniform(low, high)
-            elif "uniform_range_delta" in param.keys():
-                delta = check_uniform_range_delta_conf(ih, param["uniform_range_delta"])
-                low, high = ih.mass - delta, ih.mass + delta
-                assert low > 0.0, f"uniform_range_delta param ({delta}) for body {ih.parent.name} is bigger" \
-                                  f" than mass ({ih.mass}). Negative masses are not allowed."
-                ih.mass = np.random.uniform(low, high)
-
-        elif param_name == "diaginertia" or "fullinertia":
-            assert "uniform_range_delta" in found_valid_elements, f"domain randomization of inertia only allowed using " \
-                                                                  f"uniform_range_delta, but found {list(param.keys())}."
-            if param_name == "diaginertia":
-                assert ih.diaginertia is not None, "Randomizing diaginertia not allowed if not specified in the xml."
-                delta = check_uniform_range_delta_conf(ih, param["uniform_range_delta"])
-                lows, highs = ih.diaginertia - delta, ih.diaginertia + delta
-                check_lows_singular_values(lows, delta, ih, ih.diaginertia)
-                ih.diaginertia = np.random.uniform(lows, highs)
-            elif param_name == "fullinertia":
-                assert ih.fullinertia is not None, "Randomizing fullinertia not allowed if not specified in the xml."
-                delta = check_uniform_range_delta_conf(ih, param["uniform_range_delta"])
-                # Do svd and apply randomization only on singular values
-                fi = ih.fullinertia
-                triu = np.array([[fi[0], fi[3], fi[4]], [0.0, fi[1], fi[5]], [0.0, 0.0, fi[2]]])
-                U, sing_val, Vh = np.linalg.svd(triu, compute_uv=True)
-                lows, highs = sing_val - delta, sing_val + delta
-                check_lows_singular_values(lows, delta, ih, sing_val)
-                new_sing_val = np.random.uniform(lows, highs)
-                new_triu = U @ np.diag(new_sing_val) @ Vh
-                ih.fullinertia = np.array([new_triu[0, 0], new_triu[1, 1], new_triu[2, 2],
-                                           new_triu[0, 1], new_triu[0, 2], new_triu[1, 2]])
-    return ih
+    if dist == "uniform_range_delta":
+        if param_name == "friction":
+            valid = np.all(nominal >= dist_params)
+        else:
+            valid = np.all(nominal - dist_params > 0.0)
+        assert valid, f"uniform_range_delta param ({dist_params}) for {name} is bigger than {param_name} " \
+                      f"({nominal}). Negative values are not allowed."
 
 
 def build_MjModel_from_xml_handle(xml_handle, path_domain_rand_conf):
@@ -520,7 +848,7 @@ def build_MjModel_from_xml_handle(xml_handle, path_domain_rand_conf):
 
     Args:
         xml_handle: Mujoco xml handle.
-        path_domain_rand_conf (str): Path to the domain randomization file.
+        path_domain_rand_conf (str or dict): Path to the domain randomization file or the loaded configuration.
 
     Returns:
         Randomized model.
@@ -532,28 +860,169 @@ def build_MjModel_from_xml_handle(xml_handle, path_domain_rand_conf):
     return model
 
 
-def build_MjModel_from_xml_handle_job(xml_handle, path_domain_rand_conf, sq, rq):
+def build_MjModel_from_plan(xml_handle, plan, values):
     """
-    Worker function for parallel domain randomization. It takes in an xml_handle and a path to the domain
-    randomization file and puts a randomized model in the respective queue.
+    Sets the sampled values of a domain randomization plan in the xml_handle and compiles the model.
 
     Args:
         xml_handle: Mujoco xml handle.
-        path_domain_rand_conf (str): Path to the domain randomization file.
-        sq (Queue): Send queue used to send the model to the main tread.
-        rq (Queue): Receive queue used to receive the trigger to sample another randomized model.
+        plan (DomainRandomizationPlan): Plan created from the xml handle.
+        values (np.array): Values sampled from the plan.
+
+    Returns:
+        Randomized model.
 
     """
 
-    while True:
-        mess = rq.get()
-        if mess == "get":
-            model = build_MjModel_from_xml_handle(xml_handle, path_domain_rand_conf)
-            sq.put(model)
-        elif mess == "kill":
-            exit()
-        else:
-            raise ValueError(f"Unknown message {mess}.")
+    new_xml_handle = plan.apply_to_xml(xml_handle, values)
+    model = mujoco.MjModel.from_xml_string(xml=new_xml_handle.to_xml_string(), assets=new_xml_handle.get_assets())
+    return model
+
+
+def build_bank_entry(xml_handle, plan, values, file_path):
+    """
+    Compiles a randomized model and saves it as binary Mujoco model.
+
+    Args:
+        xml_handle: Mujoco xml handle.
+        plan (DomainRandomizationPlan): Plan created from the xml handle.
+        values (np.array): Values sampled from the plan.
+        file_path (Path): Path of the binary model.
+
+    Returns:
+        Dictionary containing the randomized attributes of the model.
+
+    """
+
+    new_xml_handle = plan.apply_to_xml(xml_handle, values)
+
+    return build_bank_entry_job(new_xml_handle.to_xml_string(), new_xml_handle.get_assets(), file_path)
+
+
+def build_bank_entry_job(xml_string, assets, file_path):
+    """
+    Worker function for generating a bank in parallel. See build_bank_entry.
+
+    Args:
+        xml_string (str): Xml string of the randomized model.
+        assets (dict): Assets of the xml handle.
+        file_path (Path): Path of the binary model.
+
+    Returns:
+        Dictionary containing the randomized attributes of the model.
+
+    """
+
+    model = mujoco.MjModel.from_xml_string(xml=xml_string, assets=assets)
+    mujoco.mj_saveModel(model, str(file_path), None)
+
+    return {attr: getattr(model, attr).copy() for attr in BANK_PARAMETER_ATTRIBUTES}
+
+
+def get_bank_files(bank_path, model_id):
+    """
+    Returns the files of the binary models of a bank ordered by their index.
+
+    Args:
+        bank_path (str): Path to the directory of the bank.
+        model_id (int): Id of the model.
+
+    Returns:
+        List of paths.
+
+    """
+
+    files = sorted(Path(bank_path).glob(f"model_{model_id}_*.mjb"), key=lambda f: int(f.stem.split("_")[-1]))
+    assert len(files) > 0, f"No randomized models found in the bank {bank_path} for model {model_id}."
+
+    return files
+
+
+def load_bank_parameters(bank_path, model_id):
+    """
+    Loads the table of randomized parameters of a bank.
+
+    Args:
+        bank_path (str): Path to the directory of the bank.
+        model_id (int): Id of the model.
+
+    Returns:
+        Dictionary mapping the names of the columns to arrays with one row per entry of the bank.
+
+    """
+
+    with np.load(Path(bank_path) / f"parameters_{model_id}.npz") as parameters:
+        return dict(parameters)
+
+
+def load_domain_randomization_config(domain_randomization_config):
+    """
+    Loads the domain randomization config file.
+
+    Args:
+        domain_randomization_config (str or dict): Path to the configuration file for domain randomization or
+            the already loaded configuration, which is returned as is.
+
+    Returns:
+        Dictionary containing the configuration.
+
+    """
+
+    if isinstance(domain_randomization_config, dict):
+        return domain_randomization_config
+
+    with open(domain_randomization_config, 'r') as file:
+        config = yaml.safe_load(file)
+
+    return config
+
+
+def split_domain_randomization_config(config):
+    """
+    Splits a domain randomization config into the parameters requiring a recompilation of the model and the
+    ones that can be randomized directly in the compiled model. Both configs keep the structure of the original one.
+
+    Args:
+        config (dict): Domain randomization config.
+
+    Returns:
+        Tuple of the config to be applied to the xml and the config to be applied directly to the model.
+
+    """
+
+    xml_config, direct_config = dict(), dict()
+    if config is None:
+        return xml_config, direct_config
+
+    def split_params(conf, direct_params):
+        xml_conf = {name: param for name, param in conf.items() if name not in direct_params}
+        direct_conf = {name: param for name, param in conf.items() if name in direct_params}
+        return xml_conf, direct_conf
+
+    for section, direct_params in (("Joints", DIRECT_JOINT_PARAMS), ("Inertial", DIRECT_INERTIAL_PARAMS),
+                                   ("Geoms", DIRECT_GEOM_PARAMS)):
+        if section in config.keys():
+            xml_config[section], direct_config[section] = dict(), dict()
+            for name, conf in config[section].items():
+                xml_config[section][name], direct_config[section][name] = split_params(conf, direct_params)
+
+    if "Default" in config.keys():
+        config_default = config["Default"]
+        xml_config["Default"], direct_config["Default"] = dict(), dict()
+        for section, conf in config_default.items():
+            if section == "Joints":
+                direct_params = DIRECT_JOINT_PARAMS
+            elif section == "Inertial":
+                direct_params = DIRECT_INERTIAL_PARAMS
+            elif section == "Geoms":
+                direct_params = DIRECT_GEOM_PARAMS
+            else:
+                # e.g., the excluded joints
+                xml_config["Default"][section], direct_config["Default"][section] = conf, conf
+                continue
+            xml_config["Default"][section], direct_config["Default"][section] = split_params(conf, direct_params)
+
+    return xml_config, direct_config
 
 
 def check_uniform_range_conf(h, params, check_low_greater_zero=True):
@@ -584,10 +1053,3 @@ def check_uniform_range_delta_conf(h, params):
     assert found_type == float, f"uniform_range_delta parameter for {name} should be a float, but found {found_type}."
     delta = params
     return delta
-
-
-def check_lows_singular_values(lows, delta, ih, sing_val):
-    assert np.all(lows > 0.0), f"Error for body f{ih.parent.name}. " \
-                               f"uniform_range_delta param ({delta}) is bigger than the smallest" \
-                               f"singular values ({np.min(sing_val)}). " \
-                               f"Negative singular values are not allowed."
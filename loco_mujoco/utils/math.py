@@ -1,4 +1,5 @@
 import numpy as np
+from scipy.spatial.transform import Rotation as R
 from mushroom_rl.utils.angles import euler_to_mat, mat_to_euler
 
 
@@ -47,6 +48,23 @@ def mat2angle_xy(mat):
     return angle
 
 
+def mat2angle_xy_batch(mats):
+    """
+    Converts a batch of rotation matrices to angles in the x-y-plane.
+
+    Args:
+        mats (np.array): np.array of shape (N, 9) or (N, 3, 3).
+
+    Returns:
+        np.array of shape (N,) constituting the rotation angles in the x-y--plane (in radians).
+
+    """
+
+    angles = R.from_matrix(np.reshape(mats, (-1, 3, 3))).as_euler("xyz")[:, -1]
+
+    return angles
+
+
 def angle2mat_xy(angle):
     """
     Converts a rotation angle in the x-y-plane to a rotation matrix.
@@ -64,15 +82,35 @@ def angle2mat_xy(angle):
     return mat
 
 
+def angle2mat_xy_batch(angles):
+    """
+    Converts a batch of rotation angles in the x-y-plane to rotation matrices.
+
+    Args:
+        angles (np.array): np.array of shape (N,) containing the angles to be converted.
+
+    Returns:
+        np.array of shape (N, 3, 3)
+
+    """
+
+    angles = np.reshape(angles, (-1,))
+    euler = np.zeros((len(angles), 3))
+    euler[:, 2] = angles
+    mats = R.from_euler("xyz", euler).as_matrix()
+
+    return mats
+
+
 def transform_angle_2pi(angle):
     """
-    Transforms an angle to be in [-pi, pi].
+    Transforms an angle or an array of angles to be in [-pi, pi].
 
     Args:
-        angle (float): Angle in radians.
+        angle (float or np.array): Angle(s) in radians.
 
     Returns:
-        Angle in radians in [-pi, pi].
+        Angle(s) in radians in [-pi, pi].
 
     """
     return (angle + np.pi) % (2 * np.pi) - np.pi
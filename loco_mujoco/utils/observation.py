@@ -0,0 +1,260 @@
+import numpy as np
+import mujoco
+from mushroom_rl.utils.mujoco import ObservationType
+
+
+class ObservationCompiler:
+    """
+    Compiles the observation specification of an ObservationHelper into a flat gather plan for a specific
+    Mujoco model. The plan stores the addresses of all observed entries in the arrays of the Mujoco data
+    structure (qpos, qvel, body and site arrays), such that an observation is built with one fancy-index
+    copy per contiguous group of entries instead of a loop over the specification. Additional entries that
+    are not part of the simulation state (e.g., ground forces or constants of the current episode) can be
+    reserved at the end of the observation as named tails.
+
+    In the opposite direction, the compiler holds a scatter plan to set the simulation state from a flat
+    sample, i.e., the concatenation of all entries of the observation specification including the x and y
+    position of the root. Only joint positions, joint velocities and site rotations are written.
+
+    """
+
+    # mapping from the observation type to the respective array in the Mujoco data structure
+    _data_attributes = {ObservationType.BODY_POS: ("xpos", "body"),
+                        ObservationType.BODY_ROT: ("xquat", "body"),
+                        ObservationType.BODY_VEL: ("cvel", "body"),
+                        ObservationType.JOINT_POS: ("qpos", "joint"),
+                        ObservationType.JOINT_VEL: ("qvel", "joint"),
+                        ObservationType.SITE_POS: ("site_xpos", "site"),
+                        ObservationType.SITE_ROT: ("site_xmat", "site")}
+
+    # observation types written when setting the simulation state
+    _settable_types = (ObservationType.JOINT_POS, ObservationType.JOINT_VEL, ObservationType.SITE_ROT)
+
+    # number of entries of the different elements in their data arrays
+    _joint_sizes = {int(mujoco.mjtJoint.mjJNT_FREE): (7, 6), int(mujoco.mjtJoint.mjJNT_BALL): (4, 3),
+                    int(mujoco.mjtJoint.mjJNT_SLIDE): (1, 1), int(mujoco.mjtJoint.mjJNT_HINGE): (1, 1)}
+    _element_sizes = {ObservationType.BODY_POS: 3, ObservationType.BODY_ROT: 4, ObservationType.BODY_VEL: 6,
+                      ObservationType.SITE_POS: 3, ObservationType.SITE_ROT: 9}
+
+    def __init__(self, obs_helper, model, n_skip=2, exclude_keys=None):
+        """
+        Constructor.
+
+        Args:
+            obs_helper (ObservationHelper): Observation helper holding the observation specification.
+            model (MjModel): Mujoco model the addresses are computed for.
+            n_skip (int): Number of entries skipped at the beginning of the observation. By default, the x and
+                y position of the root are skipped.
+            exclude_keys (list): List of keys of the observation specification that are not gathered.
+
+        """
+
+        exclude_keys = [] if exclude_keys is None else exclude_keys
+
+        attributes, addresses = [], []
+        scatter_attributes, scatter_addresses, scatter_sources = [], [], []
+        sample_size = 0
+        for key, name, ot in obs_helper.observation_spec:
+            attr, element = self._data_attributes[ot]
+            adr = self._get_address(model, name, ot, element)
+            if ot in self._settable_types:
+                scatter_attributes += [attr] * len(adr)
+                scatter_addresses.append(adr)
+                scatter_sources.append(sample_size + np.arange(len(adr)))
+            sample_size += len(adr)
+            adr = np.delete(adr, obs_helper.build_omit_idx[key])
+            if key in exclude_keys:
+                continue
+            attributes += [attr] * len(adr)
+            addresses.append(adr)
+
+        attributes = attributes[n_skip:]
+        addresses = np.concatenate(addresses)[n_skip:]
+
+        # group consecutive entries reading from the same data array
+        self._gathers = []
+        start = 0
+        for i in range(1, len(attributes) + 1):
+            if i == len(attributes) or attributes[i] != attributes[start]:
+                self._gathers.append((attributes[start], addresses[start:i].copy(), slice(start, i)))
+                start = i
+
+        self._size = len(attributes)
+        self._tails = dict()
+
+        # group the entries written when setting the simulation state by their data array
+        scatter_attributes = np.array(scatter_attributes)
+        scatter_addresses = np.concatenate([np.zeros(0, dtype=int)] + scatter_addresses)
+        scatter_sources = np.concatenate([np.zeros(0, dtype=int)] + scatter_sources)
+        self._scatters = [(str(attr), scatter_addresses[scatter_attributes == attr],
+                           scatter_sources[scatter_attributes == attr])
+                          for attr in dict.fromkeys(scatter_attributes)]
+        self._sample_size = sample_size
+
+    def add_tail(self, key, size):
+        """
+        Reserves entries at the end of the observation.
+
+        Args:
+            key (str): Name of the tail.
+            size (int): Number of entries to reserve.
+
+        Returns:
+            The slice of the tail in the observation.
+
+        """
+
+        assert key not in self._tails.keys(), "Found duplicate tail \"%s\" in the observation." % key
+
+        self._tails[key] = slice(self._size, self._size + size)
+        self._size += size
+
+        return self._tails[key]
+
+    def get_tail(self, key):
+        """
+        Returns the slice of a tail in the observation.
+
+        """
+
+        return self._tails[key]
+
+    def build(self, data, out):
+        """
+        Gathers all entries of the simulation state from a Mujoco data structure. The tails are not modified.
+
+        Args:
+            data (MjData): Mujoco data structure to gather the observation from.
+            out (np.array): Observation buffer of shape (size,) the entries are written to.
+
+        Returns:
+            The observation buffer.
+
+        """
+
+        for attr, adr, dst in self._gathers:
+            np.take(getattr(data, attr), adr, out=out[dst])
+
+        return out
+
+    def scatter(self, data, sample):
+        """
+        Sets the simulation state of a Mujoco data structure from a flat sample.
+
+        Args:
+            data (MjData): Mujoco data structure to be modified.
+            sample (np.array): Flat sample of shape (sample_size,).
+
+        """
+
+        for attr, adr, src in self._scatters:
+            np.put(getattr(data, attr), adr, sample[src])
+
+    @property
+    def size(self):
+        """ Returns the size of the observation including all tails. """
+
+        return self._size
+
+    @property
+    def scatter_plan(self):
+        """
+        Returns the scatter plan as a list of tuples of the name of the data array, the addresses in
+        the data array and the respective indices in a flat sample.
+
+        """
+
+        return self._scatters
+
+    @property
+    def sample_size(self):
+        """ Returns the size of a flat sample used to set the simulation state. """
+
+        return self._sample_size
+
+    @staticmethod
+    def _get_address(model, name, ot, element):
+        """
+        Returns the flat addresses of an entry of the observation specification in its data array.
+
+        """
+
+        if ot == ObservationType.JOINT_POS or ot == ObservationType.JOINT_VEL:
+            joint = model.joint(name)
+            qpos_size, qvel_size = ObservationCompiler._joint_sizes[int(joint.type[0])]
+            if ot == ObservationType.JOINT_POS:
+                return joint.qposadr[0] + np.arange(qpos_size)
+            else:
+                return joint.dofadr[0] + np.arange(qvel_size)
+        else:
+            size = ObservationCompiler._element_sizes[ot]
+            return getattr(model, element)(name).id * size + np.arange(size)
+
+
+class ObservationHistory:
+    """
+    Ring buffer holding the most recent observations. Each observation is written twice, at its position in
+    the ring and at the same position shifted by the length of the history, such that the history from the
+    oldest to the newest observation is always a contiguous slice of the buffer and can be returned with a
+    single copy, or as a flat view without copying.
+
+    """
+
+    def __init__(self, length, dim_obs, copy=True):
+        """
+        Constructor.
+
+        Args:
+            length (int): Number of observations in the history.
+            dim_obs (int): Dimension of a single observation.
+            copy (bool): If True, the stacked history is returned as a new array. Otherwise, it is returned as a
+                view of the ring buffer, which is overwritten by the next call to append or reset.
+
+        """
+
+        self._length = length
+        self._buffer = np.zeros((2 * length, dim_obs))
+        self._pos = 0
+        self._copy = copy
+
+    def reset(self, obs):
+        """
+        Fills the whole history with an observation.
+
+        Args:
+            obs (np.array): Observation of shape (dim_obs,).
+
+        """
+
+        self._buffer[:] = obs
+        self._pos = 0
+
+    def append(self, obs):
+        """
+        Appends an observation to the history, replacing the oldest one.
+
+        Args:
+            obs (np.array): Observation of shape (dim_obs,).
+
+        Returns:
+            The stacked history (see get).
+
+        """
+
+        self._buffer[self._pos] = obs
+        self._buffer[self._pos + self._length] = obs
+        self._pos = (self._pos + 1) % self._length
+
+        return self.get()
+
+    def get(self):
+        """
+        Returns the stacked history from the oldest to the newest observation as a flat array of shape
+        (length * dim_obs,). If the history was created with copy=False, the array is a view, which is
+        overwritten by the next call to append or reset.
+
+        """
+
+        history = self._buffer[self._pos:self._pos + self._length].reshape(-1)
+
+        return history.copy() if self._copy else history
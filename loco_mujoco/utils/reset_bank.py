@@ -0,0 +1,61 @@
+import numpy as np
+
+
+class ResetStateBank:
+    """
+    Bank of the simulation states of all samples in the trajectories of an environment. The states are
+    computed once from the trajectories with the scatter plan of an ObservationCompiler and stored as full
+    qpos and qvel vectors, such that the simulation is initialized from a sample with a single copy per data
+    array instead of flattening the sample and scattering it. As done when resetting the trajectory, the x
+    and y position of the root are set to zero. Other entries of the scatter plan (e.g., site rotations)
+    are stored separately.
+
+    """
+
+    def __init__(self, trajectory, compiler, model, keys):
+        """
+        Constructor.
+
+        Args:
+            trajectory (Trajectory): Trajectories to compute the states from.
+            compiler (ObservationCompiler): Observation compiler of the model.
+            model (MjModel): Mujoco model.
+            keys (list): Keys of the observation specification making up a flat sample.
+
+        """
+
+        samples = trajectory.get_flat_observations(keys)
+        assert samples.shape[1] == compiler.sample_size
+
+        # x and y of the root are the first two entries of a sample
+        samples[:, :2] = 0.0
+
+        n_samples = len(samples)
+        self._trajectory_length = trajectory.trajectory_length
+        self._qpos = np.tile(model.qpos0, (n_samples, 1))
+        self._qvel = np.zeros((n_samples, model.nv))
+        self._others = []
+        for attr, adr, src in compiler.scatter_plan:
+            if attr == "qpos":
+                self._qpos[:, adr] = samples[:, src]
+            elif attr == "qvel":
+                self._qvel[:, adr] = samples[:, src]
+            else:
+                self._others.append((attr, adr, samples[:, src]))
+
+    def set_state(self, data, traj_no, substep_no):
+        """
+        Sets the simulation state to the state of a sample in the trajectories.
+
+        Args:
+            data (MjData): Mujoco data structure to be modified.
+            traj_no (int): Number of the trajectory.
+            substep_no (int): Number of the sample within the trajectory.
+
+        """
+
+        i = traj_no * self._trajectory_length + substep_no
+        data.qpos[:] = self._qpos[i]
+        data.qvel[:] = self._qvel[i]
+        for attr, adr, values in self._others:
+            np.put(getattr(data, attr), adr, values[i])
@@ -23,6 +23,25 @@ class RewardInterface:
         """
         raise NotImplementedError
 
+    def call_batch(self, states, actions, next_states, absorbing):
+        """
+        Compute the rewards of a batch of transitions. By default, the reward is computed for each transition
+        separately. Reward functions should override this function with a vectorized implementation.
+
+        Args:
+            states (np.ndarray): batch of last states with shape (N, dim_state);
+            actions (np.ndarray): batch of applied actions with shape (N, dim_action);
+            next_states (np.ndarray): batch of current states with shape (N, dim_state);
+            absorbing (np.ndarray): batch of absorbing flags with shape (N,).
+
+        Returns:
+            np.ndarray of rewards with shape (N,).
+
+        """
+
+        return np.array([self(s, a, ns, ab) for s, a, ns, ab in zip(states, actions, next_states, absorbing)],
+                        dtype=float)
+
     def reset_state(self):
         """
         Reset the state of the object.
@@ -40,6 +59,9 @@ class NoReward(RewardInterface):
     def __call__(self, state, action, next_state, absorbing):
         return 0
 
+    def call_batch(self, states, actions, next_states, absorbing):
+        return np.zeros(len(states))
+
 
 class PosReward(RewardInterface):
 
@@ -50,18 +72,44 @@ class PosReward(RewardInterface):
         pos = state[self._pos_idx]
         return pos
 
+    def call_batch(self, states, actions, next_states, absorbing):
+        return states[:, self._pos_idx]
+
 
 class CustomReward(RewardInterface):
 
-    def __init__(self, reward_callback=None):
+    def __init__(self, reward_callback=None, batched_reward_callback=False):
+        """
+        Constructor.
+
+        Args:
+            reward_callback (func): Function computing the reward given the state, the action and the next state.
+            batched_reward_callback (bool): If True, the reward_callback is called with batches of states
+                (N, dim_state), actions (N, dim_action) and next states (N, dim_state) and has to return
+                the rewards of shape (N,).
+
+        """
+
         self._reward_callback = reward_callback
+        self._batched_reward_callback = batched_reward_callback
 
     def __call__(self, state, action, next_state, absorbing):
         if self._reward_callback is not None:
-            return self._reward_callback(state, action, next_state)
+            if self._batched_reward_callback:
+                return self._reward_callback(state[None], action[None], next_state[None])[0]
+            else:
+                return self._reward_callback(state, action, next_state)
         else:
             return 0
 
+    def call_batch(self, states, actions, next_states, absorbing):
+        if self._reward_callback is None:
+            return np.zeros(len(states))
+        elif self._batched_reward_callback:
+            return np.asarray(self._reward_callback(states, actions, next_states), dtype=float)
+        else:
+            return super().call_batch(states, actions, next_states, absorbing)
+
 
 class TargetVelocityReward(RewardInterface):
 
@@ -73,22 +121,31 @@ class TargetVelocityReward(RewardInterface):
         x_vel = state[self._x_vel_idx]
         return np.exp(- np.square(x_vel - self._target_vel))
 
+    def call_batch(self, states, actions, next_states, absorbing):
+        x_vel = states[:, self._x_vel_idx]
+        return np.exp(- np.square(x_vel - self._target_vel))
+
 
 class MultiTargetVelocityReward(RewardInterface):
 
     def __init__(self, target_velocity, x_vel_idx, env_id_len, scalings):
         self._target_vel = target_velocity
         self._env_id_len = env_id_len
-        self._scalings = scalings
+        self._scalings = np.asarray(scalings)
         self._x_vel_idx = x_vel_idx
 
+        # weights converting the big-endian binary environment id to an index
+        self._env_id_weights = 2 ** np.arange(env_id_len - 1, -1, -1)
+
     def __call__(self, state, action, next_state, absorbing):
-        x_vel = state[self._x_vel_idx]
-        env_id = state[-self._env_id_len:]
+        return self.call_batch(state[None], None, None, None)[0]
+
+    def call_batch(self, states, actions, next_states, absorbing):
+        x_vel = states[:, self._x_vel_idx]
+        env_id = states[:, -self._env_id_len:]
 
         # convert binary array to index
-        ind = np.packbits(env_id.astype(int), bitorder='big') >> (8 - env_id.shape[0])
-        ind = ind[0]
+        ind = env_id.astype(int) @ self._env_id_weights
         scaling = self._scalings[ind]
 
         # calculate target vel
@@ -115,3 +172,154 @@ class VelocityVectorReward(RewardInterface):
         des_vel = state[self._goal_vel_idx] * cos_sine
 
         return np.exp(-5.0*np.linalg.norm(curr_velocity_xy - des_vel))
+
+    def call_batch(self, states, actions, next_states, absorbing):
+
+        # get current velocity vectors in x-y-plane
+        curr_velocity_xy = states[:, [self._x_vel_idx, self._y_vel_idx]]
+
+        # get desired velocity vectors in x-y-plane
+        cos_sine = states[:, self._angle_idx]
+        des_vel = states[:, self._goal_vel_idx] * cos_sine
+
+        return np.exp(-5.0*np.linalg.norm(curr_velocity_xy - des_vel, axis=1))
+
+
+class ReferenceTrackingReward(RewardInterface):
+    """
+    DeepMimic-style reward tracking the joint positions and velocities of a reference trajectory:
+
+        r = w_p * exp(-s_p * ||q - q_ref||^2) + w_v * exp(-s_v * ||dq - dq_ref||^2)
+
+    The reference arrays are extracted once from the trajectory. The reward is computed on the next state,
+    which is compared to the reference sample following the one the episode started from. The reward keeps
+    track of the current reference sample in a cursor and has to be reset at the beginning of each episode.
+    Simulations running several episodes at once keep one cursor per episode (see get_reference_cursor)
+    and pass the reference samples to call_batch instead.
+
+    """
+
+    def __init__(self, pos_keys, pos_idx, vel_keys, vel_idx, trajectory=None, pos_weight=0.65, vel_weight=0.1,
+                 pos_scale=2.0, vel_scale=0.1):
+        """
+        Constructor.
+
+        Args:
+            pos_keys (list): Keys of the joint positions in the trajectory.
+            pos_idx (list): Indices of the joint positions in the state.
+            vel_keys (list): Keys of the joint velocities in the trajectory.
+            vel_idx (list): Indices of the joint velocities in the state.
+            trajectory (Trajectory): Reference trajectory. If None, it has to be set with set_trajectory
+                before computing a reward.
+            pos_weight (float): Weight of the joint position term.
+            vel_weight (float): Weight of the joint velocity term.
+            pos_scale (float): Scale of the squared joint position error.
+            vel_scale (float): Scale of the squared joint velocity error.
+
+        """
+
+        assert len(pos_keys) == len(pos_idx) and len(vel_keys) == len(vel_idx)
+
+        self._pos_keys = list(pos_keys)
+        self._pos_idx = np.asarray(pos_idx, dtype=int)
+        self._vel_keys = list(vel_keys)
+        self._vel_idx = np.asarray(vel_idx, dtype=int)
+        self._pos_weight = pos_weight
+        self._vel_weight = vel_weight
+        self._pos_scale = pos_scale
+        self._vel_scale = vel_scale
+
+        self._trajectory = None
+        self._ref_pos = None
+        self._ref_vel = None
+        self._cursor = None
+
+        if trajectory is not None:
+            self.set_trajectory(trajectory)
+
+    def set_trajectory(self, trajectory):
+        """
+        Sets the reference trajectory and extracts the reference arrays from it.
+
+        Args:
+            trajectory (Trajectory): Reference trajectory.
+
+        """
+
+        self._trajectory = trajectory
+        self._ref_pos = trajectory.get_flat_observations(self._pos_keys)
+        self._ref_vel = trajectory.get_flat_observations(self._vel_keys)
+        self.reset_state()
+
+    def __call__(self, state, action, next_state, absorbing):
+        if self._cursor is None:
+            self._cursor = self.get_reference_cursor()
+
+        reference_idx = self.advance_cursor(self._cursor)
+
+        return self.call_batch(None, None, next_state[None], None, reference_idx=np.array([reference_idx]))[0]
+
+    def get_reference_cursor(self):
+        """
+        Returns the cursor of an episode starting at the current sample of the trajectory.
+
+        Returns:
+            np.array containing the index of the current reference sample and the index of the last sample of the
+            current trajectory. The indices refer to the samples of all trajectories concatenated in time.
+
+        """
+
+        traj = self._trajectory
+        assert traj is not None, "No reference trajectory has been set."
+
+        return np.array([traj.traj_no * traj.trajectory_length + traj.subtraj_step_no,
+                         (traj.traj_no + 1) * traj.trajectory_length - 1])
+
+    @staticmethod
+    def advance_cursor(cursor):
+        """
+        Advances a cursor to the next reference sample. The cursor stays at the last sample of its trajectory.
+
+        Args:
+            cursor (np.array): Cursor returned by get_reference_cursor, which is modified in place.
+
+        Returns:
+            The index of the next reference sample.
+
+        """
+
+        cursor[0] = min(cursor[0] + 1, cursor[1])
+
+        return cursor[0]
+
+    def call_batch(self, states, actions, next_states, absorbing, reference_idx=None):
+        """
+        Compute the rewards of a batch of transitions.
+
+        Args:
+            states (np.ndarray): batch of last states with shape (N, dim_state);
+            actions (np.ndarray): batch of applied actions with shape (N, dim_action);
+            next_states (np.ndarray): batch of current states with shape (N, dim_state);
+            absorbing (np.ndarray): batch of absorbing flags with shape (N,);
+            reference_idx (np.ndarray): indices of the reference samples the next states are compared to
+                with shape (N,). The indices refer to the samples of all trajectories concatenated in time. If
+                None, the transitions are assumed to be consecutive steps of the current episode.
+
+        Returns:
+            np.ndarray of rewards with shape (N,).
+
+        """
+
+        assert self._trajectory is not None, "No reference trajectory has been set."
+
+        if reference_idx is None:
+            return np.array([self(None, None, next_state, None) for next_state in next_states], dtype=float)
+
+        pos_err = np.sum(np.square(next_states[:, self._pos_idx] - self._ref_pos[reference_idx]), axis=1)
+        vel_err = np.sum(np.square(next_states[:, self._vel_idx] - self._ref_vel[reference_idx]), axis=1)
+
+        return self._pos_weight * np.exp(-self._pos_scale * pos_err) + \
+            self._vel_weight * np.exp(-self._vel_scale * vel_err)
+
+    def reset_state(self):
+        self._cursor = None
@@ -0,0 +1,116 @@
+import numpy as np
+
+
+class StateLayout:
+    """
+    Layout of the state of an environment in a flat array. The layout is a list of entries, each referring to
+    an attribute by its path starting at the environment, e.g., ("_data", "qpos"), together with its slice
+    in the flat array. The layout is computed once from the current values of the attributes, such that a
+    state is captured and restored with one copy per entry instead of copying the object graph. Hence, the
+    shapes of the arrays must not change after the layout was computed.
+
+    A path pointing to a numeric array or scalar is a single entry. A path pointing to any other object is
+    expanded into one entry per numeric attribute of the object. All other attributes of the object (e.g.,
+    None, strings or tuples) are considered constant and are not part of the state.
+
+    """
+
+    def __init__(self, root, paths):
+        """
+        Constructor.
+
+        Args:
+            root: Object the paths start at.
+            paths (list): List of tuples of attribute names.
+
+        """
+
+        self._entries = []
+        self._size = 0
+
+        for path in paths:
+            value = self._resolve(root, path)
+            if not self._add_entry(path, value):
+                if not hasattr(value, "__dict__"):
+                    raise TypeError("The attribute %s can not be part of the state." % ".".join(path))
+                for name, attr_value in vars(value).items():
+                    self._add_entry(path + (name,), attr_value)
+
+    def get(self, root, out=None):
+        """
+        Captures the state.
+
+        Args:
+            root: Object the paths start at.
+            out (np.array): Array of shape (size,) the state is written to. If None, a new array is allocated.
+
+        Returns:
+            The state as np.array of shape (size,).
+
+        """
+
+        out = np.empty(self._size) if out is None else out
+
+        for path, state_slice, shape, value_type in self._entries:
+            out[state_slice] = np.ravel(self._resolve(root, path))
+
+        return out
+
+    def set(self, root, state):
+        """
+        Restores the state. Arrays are overwritten in place, while scalars are reassigned with their
+        original type.
+
+        Args:
+            root: Object the paths start at.
+            state (np.array): State of shape (size,).
+
+        """
+
+        assert len(state) == self._size
+
+        for path, state_slice, shape, value_type in self._entries:
+            if shape is None:
+                setattr(self._resolve(root, path[:-1]), path[-1], value_type(state[state_slice.start]))
+            else:
+                np.copyto(self._resolve(root, path), state[state_slice].reshape(shape), casting="unsafe")
+
+    @property
+    def size(self):
+        """ Returns the size of the flat state. """
+
+        return self._size
+
+    def _add_entry(self, path, value):
+        """
+        Adds an entry to the layout if the value is a numeric array or scalar.
+
+        Returns:
+            True, if the entry was added.
+
+        """
+
+        if isinstance(value, np.ndarray) and (np.issubdtype(value.dtype, np.number) or value.dtype == bool):
+            shape, value_type, size = value.shape, value.dtype, value.size
+        elif isinstance(value, (bool, int, float, np.bool_, np.number)):
+            shape, value_type, size = None, type(value), 1
+        else:
+            return False
+
+        self._entries.append((path, slice(self._size, self._size + size), shape, value_type))
+        self._size += size
+
+        return True
+
+    @staticmethod
+    def _resolve(root, path):
+        """
+        Returns the attribute at the end of a path.
+
+        """
+
+        value = root
+        for name in path:
+            value = getattr(value, name)
+
+        return value
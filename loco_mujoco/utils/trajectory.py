@@ -1,5 +1,9 @@
+import os
+import json
+import shutil
+import hashlib
 import warnings
-from copy import deepcopy
+from pathlib import Path
 
 import numpy as np
 from scipy import interpolate
@@ -14,10 +18,17 @@ class Trajectory:
     All trajectories are required to be of equal length.
 
     """
+
+    # maximum trajectory length for which the interpolation is done with the spline basis matrix
+    _max_len_interpolation_matrix = 500
+
+    # version of the interpolation and of the cache format, has to be increased whenever one of them changes
+    _cache_version = 1
+
     def __init__(self, keys, low, high, joint_pos_idx, interpolate_map, interpolate_remap,
                  traj_path=None, traj_files=None, interpolate_map_params=None, interpolate_remap_params=None,
                  traj_dt=0.002, control_dt=0.01, ignore_keys=None, clip_trajectory_to_joint_ranges=False,
-                 traj_info=None, warn=True):
+                 traj_info=None, warn=True, packed=True, use_cache=False, cache_dir=None):
         """
         Constructor.
 
@@ -31,7 +42,9 @@ class Trajectory:
                 interpolation.
             traj_path (string): path with the trajectory for the model to follow. Should be a numpy zipped file (.npz)
                 with a 'trajectory_data' array and possibly a 'split_points' array inside. The 'trajectory_data'
-                should be in the shape (joints x observations). If traj_files is specified, this should be None.
+                should be in the shape (joints x observations). If a memory-mapped version of the file was created
+                with convert_npz_to_mmap, it is opened lazily instead. The path can also point directly to the
+                memory-mapped directory. If traj_files is specified, this should be None.
             traj_files (dict): Dictionary containing all trajectory files. If traj_path is specified, this
                 should be None.
             interpolate_map_params: Set of parameters needed to do the interpolation by the Unitree environment.
@@ -43,6 +56,13 @@ class Trajectory:
                 between the low and high values in the trajectory.
             traj_info (list): A list of custom labels for each trajectory.
             warn (bool): If True, a warning will be raised, if some trajectory ranges are violated.
+            packed (bool): If True, all trajectories are stored in a single contiguous array of shape
+                (n_trajectories, n_samples, dim_sample) and the samples are returned as views of a preallocated
+                buffer. Note that these views are only valid until the next sample is requested.
+            use_cache (bool): If True, the interpolated trajectories are stored in a persistent cache on disk and
+                loaded from there if the same dataset is interpolated with the same functions and parameters again.
+            cache_dir (str): Directory of the cache. If None, the directory returned by
+                get_trajectory_cache_dir is used.
 
         """
 
@@ -51,7 +71,7 @@ class Trajectory:
 
         # load data
         if traj_path is not None:
-            self._trajectory_files = np.load(traj_path, allow_pickle=True)
+            self._trajectory_files = load_trajectory_files(traj_path)
         else:
             self._trajectory_files = traj_files
 
@@ -91,17 +111,36 @@ class Trajectory:
         self.control_dt = control_dt
 
         # interpolation of the trajectories
+        self._packed = None
         if self.traj_dt != control_dt:
-            self._interpolate_trajectories(map_funct=interpolate_map,
-                                           map_params=interpolate_map_params,
-                                           re_map_funct=interpolate_remap,
-                                           re_map_params=interpolate_remap_params)
+            cache_path = self._get_cache_path(cache_dir, interpolate_map, interpolate_remap,
+                                              interpolate_map_params, interpolate_remap_params) if use_cache else None
+            if cache_path is not None and cache_path.is_dir():
+                self._load_cached_trajectories(cache_path)
+            else:
+                self._interpolate_trajectories(map_funct=interpolate_map,
+                                               map_params=interpolate_map_params,
+                                               re_map_funct=interpolate_remap,
+                                               re_map_params=interpolate_remap_params)
+                if cache_path is not None:
+                    self._save_cached_trajectories(cache_path)
+
+        # pack all trajectories in a single array, the observations in self.trajectories become views of it
+        if not packed:
+            self._packed = None
+        elif self._packed is None:
+            self._pack_trajectories()
 
         self.subtraj_step_no = 0
         self.traj_no = 0
-        self.subtraj = self._get_subtraj(self.traj_no)
+        if self._packed is not None:
+            self.subtraj = None
+            self._xy_offset = np.zeros(2)
+        else:
+            self.subtraj = self._get_subtraj(self.traj_no)
 
-    def create_dataset(self, ignore_keys=None, state_callback=None, state_callback_params=None):
+    def create_dataset(self, ignore_keys=None, state_callback=None, state_callback_params=None,
+                       batched_state_callback=False):
         """
         Creates a dataset used by imitation learning algorithms.
 
@@ -110,6 +149,9 @@ class Trajectory:
             state_callback (func): Function that should be called on each state.
             state_callback_params (dict): Dictionary of parameters needed to make
                 the state transformation.
+            batched_state_callback (bool): If True, the state_callback is called only once with all states
+                of shape (n_states, dim_state) and has to return the transformed states of shape
+                (n_states, dim_transformed_state).
 
         Returns:
             Dictionary containing states, next_states, absorbing and last flags. For the states the shape is
@@ -120,29 +162,35 @@ class Trajectory:
         flat_traj = self.flattened_trajectories()
 
         # create a dict and extract all elements except the ones specified in ignore_keys.
-        all_data = dict(zip(self.keys, deepcopy(list(flat_traj))))
+        all_data = dict(zip(self.keys, flat_traj))
         if ignore_keys is not None:
             for ikey in ignore_keys:
                 del all_data[ikey]
 
         traj = list(all_data.values())
 
-        # create states array shape=(n_states, dim_obs)
+        # create states array shape=(n_states, dim_obs), the concatenation copies the trajectory data
         states = np.concatenate(traj, axis=1)
 
         if state_callback is not None:
-            transformed_states = []
-            for state in states:
-                transformed_states.append(state_callback(state, **state_callback_params))
-            states = np.array(transformed_states)
-
-        # convert to dict with states and next_states
-        splitted_states = np.split(states, self.split_points[1:-1])
-        new_states = np.concatenate([s[:-1]for s in splitted_states])
-        new_next_states = np.concatenate([s[1:]for s in splitted_states])
+            state_callback_params = dict() if state_callback_params is None else state_callback_params
+            if batched_state_callback:
+                states = state_callback(states, **state_callback_params)
+            else:
+                transformed_states = []
+                for state in states:
+                    transformed_states.append(state_callback(state, **state_callback_params))
+                states = np.array(transformed_states)
+
+        # convert to dict with states and next_states, the last state of each trajectory has no next state
+        is_last_state = np.zeros(len(states), dtype=bool)
+        is_last_state[self.split_points[1:] - 1] = True
+        idx = np.flatnonzero(~is_last_state)
+        new_states = states[idx]
+        new_next_states = states[idx + 1]
 
         absorbing = np.zeros(len(new_states))  # we assume that there are no absorbing states in the trajectory
-        last = np.concatenate([np.concatenate([np.zeros(len(s)-2), [1.0]]) for s in splitted_states])
+        last = is_last_state[idx + 1].astype(float)
 
         if self._traj_info is not None:
             info = np.array([[l] * self.trajectory_length for l in self._traj_info]).reshape(-1)
@@ -170,6 +218,13 @@ class Trajectory:
         assert np.all(len_obs == len_obs[0]), "Some observations have different lengths than others. " \
                                               "Trajectory is corrupted. "
 
+        # if all trajectories are of equal length, the split is a reshape. This avoids copying the data, which
+        # keeps memory-mapped trajectories shared across processes.
+        len_trajectories = np.diff(self.split_points)
+        if self.split_points[0] == 0 and self.split_points[-1] == len_obs[0] and \
+                np.all(len_trajectories == len_trajectories[0]):
+            return [obs.reshape((len(len_trajectories), len_trajectories[0]) + obs.shape[1:]) for obs in trajectories]
+
         # split trajectory into multiple trajectories using split points
         for i in range(len(trajectories)):
             trajectories[i] = np.split(trajectories[i], self.split_points[1:-1])
@@ -196,42 +251,28 @@ class Trajectory:
 
         assert (map_funct is None) == (re_map_funct is None)
 
-        new_trajs = list()
-
-        # interpolate over each trajectory
-        for i in range(self.number_of_trajectories):
-
-            traj = [obs[i] for obs in self.trajectories]
-
-            x = np.arange(self.trajectory_length)
-            new_traj_sampling_factor = self.traj_dt / self.control_dt
-            x_new = np.linspace(0, self.trajectory_length - 1, round(self.trajectory_length * new_traj_sampling_factor),
-                                endpoint=True)
+        x = np.arange(self.trajectory_length)
+        new_traj_sampling_factor = self.traj_dt / self.control_dt
+        x_new = np.linspace(0, self.trajectory_length - 1, round(self.trajectory_length * new_traj_sampling_factor),
+                            endpoint=True)
 
-            # preprocess trajectory
-            traj = map_funct(traj) if map_params is None else map_funct(traj, **map_params)
+        # preprocess all trajectories to an array of shape (n_observations, n_trajectories, n_samples)
+        trajs = map_funct(self.trajectories) if map_params is None else map_funct(self.trajectories, **map_params)
 
-            new_traj = interpolate.interp1d(x, traj, kind="cubic", axis=1)(x_new)
-
-            # postprocess trajectory
-            new_traj = re_map_funct(new_traj) if re_map_params is None else re_map_funct(new_traj, **re_map_params)
-
-            new_trajs.append(new_traj)
+        # interpolate all trajectories at once. Cubic spline interpolation is linear in the data, hence for
+        # short trajectories, it is done with a single product with the precomputed spline basis matrix.
+        if len(x) <= self._max_len_interpolation_matrix:
+            interpolation_matrix = interpolate.interp1d(x, np.eye(len(x)), kind="cubic", axis=0)(x_new)
+            new_trajs = trajs @ interpolation_matrix.T
+        else:
+            new_trajs = interpolate.interp1d(x, trajs, kind="cubic", axis=-1)(x_new)
 
-        # convert trajectory back to original shape
-        trajectories = []
-        for i in range(self.number_obs_trajectory):
-            trajectories.append([])
-            for traj in new_trajs:
-                trajectories[i].append(traj[i])
-            trajectories[i] = np.array(trajectories[i])
-        self.trajectories = trajectories
+        # postprocess all trajectories back to the original shape
+        new_trajs = re_map_funct(new_trajs) if re_map_params is None else re_map_funct(new_trajs, **re_map_params)
+        self.trajectories = [np.asarray(obs) for obs in new_trajs]
 
         # interpolation of split_points
-        self.split_points = [0]
-        for k in range(self.number_of_trajectories):
-           self.split_points.append(self.split_points[-1] + len(self.trajectories[0][k]))
-        self.split_points = np.array(self.split_points)
+        self.split_points = np.arange(self.number_of_trajectories + 1) * self.trajectory_length
 
     def reset_trajectory(self, substep_no=None, traj_no=None):
         """
@@ -249,17 +290,11 @@ class Trajectory:
 
         """
 
-        if traj_no is None:
-            self.traj_no = np.random.randint(0, self.number_of_trajectories)
-        else:
-            assert 0 <= traj_no <= self.number_of_trajectories
-            self.traj_no = traj_no
+        self.reset_cursor(substep_no, traj_no)
 
-        if substep_no is None:
-            self.subtraj_step_no = np.random.randint(0, self.trajectory_length)
-        else:
-            assert 0 <= substep_no <= self.trajectory_length
-            self.subtraj_step_no = substep_no
+        if self._packed is not None:
+            self._get_ith_sample_from_subtraj(self.subtraj_step_no)
+            return list(self._reset_views)
 
         # choose a sub trajectory
         self.subtraj = self._get_subtraj(self.traj_no)
@@ -272,6 +307,35 @@ class Trajectory:
 
         return sample
 
+    def reset_cursor(self, substep_no=None, traj_no=None):
+        """
+        Resets the current trajectory and substep like reset_trajectory, but without creating the sample.
+        This is only supported for packed trajectories, for which no sub trajectory has to be copied.
+
+        Args:
+            substep_no (int, None): Starting point of the trajectory.
+                If None, the trajectory starts from a random point.
+            traj_no (int, None): Number of the trajectory to start from.
+                If None, it starts from a random trajectory
+
+        """
+
+        if traj_no is None:
+            self.traj_no = np.random.randint(0, self.number_of_trajectories)
+        else:
+            assert 0 <= traj_no <= self.number_of_trajectories
+            self.traj_no = traj_no
+
+        if substep_no is None:
+            self.subtraj_step_no = np.random.randint(0, self.trajectory_length)
+        else:
+            assert 0 <= substep_no <= self.trajectory_length
+            self.subtraj_step_no = substep_no
+
+        if self._packed is not None:
+            # reset x and y to middle position without copying the sub trajectory
+            self._xy_offset[:] = self._packed[self.traj_no, self.subtraj_step_no, self._xy_cols]
+
     def check_if_trajectory_is_in_range(self, low, high, keys, j_idx, warn, clip_trajectory_to_joint_ranges):
 
         if warn or clip_trajectory_to_joint_ranges:
@@ -322,6 +386,27 @@ class Trajectory:
 
         return sample
 
+    def flatten_sample(self, sample):
+        """
+        Concatenates all observations of a sample to a flat array. If the trajectories are packed and the sample
+        consists of the leading observations of the last sample returned by this class, the respective part of
+        the preallocated sample buffer is returned without copying.
+
+        Args:
+            sample (list): Sample consisting of one entry per observation.
+
+        Returns:
+            Flat np.array containing all observations of the sample.
+
+        """
+
+        if self._packed is not None and 0 < len(sample) <= len(self._sample_views):
+            for views in (self._sample_views, self._reset_views):
+                if all(value is view for value, view in zip(sample, views)):
+                    return self._sample_buffer[:self._key_slices[len(sample) - 1].stop]
+
+        return np.concatenate([np.ravel(value) for value in sample])
+
     def get_from_sample(self, sample, key):
         """
         Returns the part of the sample whose key is specified. In contrast to the
@@ -345,6 +430,30 @@ class Trajectory:
 
         return sample[idx]
 
+    def get_current_value(self, key):
+        """
+        Returns a copy of the observation specified by the key at the current substep of the current
+        trajectory, without creating the whole sample. The x and y position are not reset.
+
+        Args:
+            key (string): Name of the observation.
+
+        Returns:
+            np.array consisting of the observation specified by the key.
+
+        """
+
+        return np.array(self.trajectories[self.get_idx(key)][self.traj_no, self.subtraj_step_no])
+
+    @property
+    def packed(self):
+        """
+        Returns True if the trajectories are packed in a single array.
+
+        """
+
+        return self._packed is not None
+
     def get_idx(self, key):
         """
         Returns the index of the key.
@@ -377,6 +486,134 @@ class Trajectory:
 
         return trajectories
 
+    def get_flat_observations(self, keys):
+        """
+        Returns the observations specified by the keys for all samples of all trajectories concatenated in time.
+        The sample i of trajectory j is found at row j * trajectory_length + i.
+
+        Args:
+            keys (list): Names of the observations to extract.
+
+        Returns:
+            np.array of shape (N_traj x N_samples_per_traj, dim_observations).
+
+        """
+
+        flat_traj = self.flattened_trajectories()
+        n_samples = self.number_of_trajectories * self.trajectory_length
+
+        if len(keys) == 0:
+            return np.zeros((n_samples, 0))
+
+        return np.concatenate([flat_traj[self.get_idx(key)] for key in keys], axis=1)
+
+    def _pack_trajectories(self):
+        """
+        Copies all observations into a single contiguous array of shape (n_trajectories, n_samples, dim_sample)
+        and replaces the observations in self.trajectories by views of this array. Packing is skipped
+        if some observations are not numeric or memory-mapped, as the copy would not be shared across processes.
+
+        """
+
+        if not all(np.issubdtype(obs.dtype, np.number) and not isinstance(obs, np.memmap)
+                   for obs in self.trajectories):
+            return
+
+        n_traj, traj_len = self.number_of_trajectories, self.trajectory_length
+        packed = np.concatenate([obs.reshape((n_traj, traj_len, -1)) for obs in self.trajectories], axis=2)
+
+        self._set_packed_trajectories(packed, [obs.shape[2:] for obs in self.trajectories])
+
+    def _set_packed_trajectories(self, packed, obs_shapes):
+        """
+        Sets the packed trajectories and replaces the observations in self.trajectories by views of them.
+
+        Args:
+            packed (np.array): Array of shape (n_trajectories, n_samples, dim_sample) containing all observations.
+            obs_shapes (list): Shape of each observation in a single sample. Empty for one-dimensional observations.
+
+        """
+
+        n_traj, traj_len = packed.shape[:2]
+        self._packed = packed
+
+        self.trajectories = []
+        self._key_slices = []
+        start = 0
+        for shape in obs_shapes:
+            key_slice = slice(start, start + int(np.prod(shape)))
+            self.trajectories.append(packed[:, :, key_slice].reshape((n_traj, traj_len) + tuple(shape)))
+            self._key_slices.append(key_slice)
+            start = key_slice.stop
+
+        # x and y are the first two observations
+        self._xy_cols = np.array([self._key_slices[0].start, self._key_slices[1].start])
+
+        # preallocated sample buffer and its views for each observation. The samples returned on reset keep
+        # the original shape of each observation, while all other samples are flattened.
+        self._sample_buffer = np.empty(packed.shape[2])
+        self._sample_views = [self._sample_buffer[key_slice] for key_slice in self._key_slices]
+        self._reset_views = [view.reshape(tuple(shape)) for view, shape in zip(self._sample_views, obs_shapes)]
+
+    def _get_cache_path(self, cache_dir, map_funct, re_map_funct, map_params, re_map_params):
+        """
+        Returns the path of the interpolated trajectories in the cache. The path is a hash of the trajectory data,
+        the time steps, the observation keys, the code of the interpolation functions and their parameters, and the
+        version of the interpolation. Returns None, if the trajectories can not be cached.
+
+        """
+
+        if not all(np.issubdtype(obs.dtype, np.number) for obs in self.trajectories):
+            return None
+
+        from loco_mujoco import __version__
+
+        h = hashlib.sha1()
+        for obj in [__version__, self._cache_version, self.keys, self.traj_dt, self.control_dt,
+                    _get_function_key(map_funct), _get_function_key(re_map_funct), map_params, re_map_params,
+                    self.split_points, self.trajectories]:
+            _update_hash(h, obj)
+
+        cache_dir = get_trajectory_cache_dir() if cache_dir is None else Path(cache_dir)
+
+        return cache_dir / h.hexdigest()
+
+    def _load_cached_trajectories(self, cache_path):
+        """
+        Loads the interpolated trajectories from the cache. The data is memory-mapped.
+
+        """
+
+        with open(cache_path / "obs_shapes.json", "r") as file:
+            obs_shapes = json.load(file)
+        packed = np.load(cache_path / "trajectories.npy", mmap_mode="r")
+
+        self._set_packed_trajectories(packed, obs_shapes)
+        self.split_points = np.arange(self.number_of_trajectories + 1) * self.trajectory_length
+
+    def _save_cached_trajectories(self, cache_path):
+        """
+        Saves the interpolated trajectories to the cache. The data is written to a temporary directory first,
+        such that other processes never read incomplete data.
+
+        """
+
+        n_traj, traj_len = self.number_of_trajectories, self.trajectory_length
+        tmp_path = cache_path.with_name(cache_path.name + ".tmp%d" % os.getpid())
+
+        try:
+            os.makedirs(tmp_path, exist_ok=True)
+            np.save(tmp_path / "trajectories.npy",
+                    np.concatenate([obs.reshape((n_traj, traj_len, -1)) for obs in self.trajectories], axis=2))
+            with open(tmp_path / "obs_shapes.json", "w") as file:
+                json.dump([list(obs.shape[2:]) for obs in self.trajectories], file)
+            os.rename(tmp_path, cache_path)
+        except OSError as e:
+            # another process might have written the same trajectories in the meantime
+            if not cache_path.is_dir():
+                warnings.warn("Failed to cache the interpolated trajectories: %s" % e, RuntimeWarning)
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
     def _get_subtraj(self, i):
         """
         Returns a copy of the i-th trajectory included in trajectories.
@@ -387,10 +624,16 @@ class Trajectory:
 
     def _get_ith_sample_from_subtraj(self, i):
         """
-        Returns a copy of the i-th sample included in the current subtraj.
+        Returns a copy of the i-th sample included in the current subtraj. If the trajectories are packed,
+        the sample is a list of views of the preallocated sample buffer.
 
         """
 
+        if self._packed is not None:
+            np.copyto(self._sample_buffer, self._packed[self.traj_no, i])
+            self._sample_buffer[self._xy_cols] -= self._xy_offset
+            return list(self._sample_views)
+
         return [np.array(obs[i].copy()).flatten() for obs in self.subtraj]
 
     @property
@@ -416,3 +659,151 @@ class Trajectory:
 
         """
         return self.trajectories[0].shape[0]
+
+
+def get_trajectory_cache_dir():
+    """
+    Returns the directory of the cache for interpolated trajectories. It can be set with the
+    environment variable LOCO_MUJOCO_CACHE_DIR and defaults to ~/.cache/loco_mujoco/trajectories.
+
+    """
+
+    if "LOCO_MUJOCO_CACHE_DIR" in os.environ:
+        return Path(os.environ["LOCO_MUJOCO_CACHE_DIR"])
+    else:
+        return Path.home() / ".cache" / "loco_mujoco" / "trajectories"
+
+
+def get_mmap_path(traj_path):
+    """
+    Returns the path of the memory-mapped version of a trajectory file.
+
+    Args:
+        traj_path (str): Path to the trajectory file (.npz).
+
+    Returns:
+        Path to the directory containing the memory-mapped trajectory.
+
+    """
+
+    traj_path = Path(traj_path)
+
+    return traj_path.with_name(traj_path.stem + "_mmap")
+
+
+def convert_npz_to_mmap(traj_path, mmap_path=None):
+    """
+    Converts a trajectory file (.npz) to an uncompressed directory containing one numpy file (.npy) per
+    observation. These files can be memory-mapped, such that the data does not need to be decompressed
+    at startup and is shared by the page cache of the OS across all processes using the same dataset.
+
+    Args:
+        traj_path (str): Path to the trajectory file (.npz).
+        mmap_path (str): Path to the output directory. If None, the directory is created next to the trajectory
+            file, in which case it is found automatically when loading the trajectory file.
+
+    Returns:
+        Path to the directory containing the memory-mapped trajectory.
+
+    """
+
+    mmap_path = get_mmap_path(traj_path) if mmap_path is None else Path(mmap_path)
+    os.makedirs(mmap_path, exist_ok=True)
+
+    trajectory_files = np.load(traj_path, allow_pickle=True)
+    for key in trajectory_files.files:
+        data = trajectory_files[key]
+        assert data.dtype != object, "Only numeric trajectory data can be memory-mapped."
+        np.save(mmap_path / (key + ".npy"), data)
+
+    # the order of the keys is relevant when checking the joint ranges
+    with open(mmap_path / "keys.json", "w") as file:
+        json.dump(trajectory_files.files, file)
+
+    return mmap_path
+
+
+def load_trajectory_files(traj_path):
+    """
+    Loads the trajectory files. If a memory-mapped version of the trajectory exists, it is opened lazily.
+    Otherwise, the trajectory file (.npz) is loaded.
+
+    Args:
+        traj_path (str): Path to the trajectory file (.npz) or to a directory containing a memory-mapped trajectory.
+
+    Returns:
+        Dictionary mapping the observation keys to the trajectory data.
+
+    """
+
+    mmap_path = Path(traj_path) if os.path.isdir(traj_path) else get_mmap_path(traj_path)
+
+    if mmap_path.is_dir():
+        with open(mmap_path / "keys.json", "r") as file:
+            keys = json.load(file)
+        return {key: np.load(mmap_path / (key + ".npy"), mmap_mode="r") for key in keys}
+    else:
+        return np.load(traj_path, allow_pickle=True)
+
+
+def _get_function_key(funct):
+    """
+    Returns a key identifying a function by its fully qualified name and its code, or None. Functions with the
+    same name (e.g., lambdas) but different code have different keys.
+
+    """
+
+    if funct is None:
+        return None
+
+    funct = getattr(funct, "__func__", funct)
+    name = "%s.%s" % (getattr(funct, "__module__", ""), getattr(funct, "__qualname__", repr(funct)))
+    code = getattr(funct, "__code__", None)
+
+    return [name, _get_code_key(code) if code is not None else None]
+
+
+def _get_code_key(code):
+    """
+    Returns a key of a code object consisting of its bytecode, its constants and the names it uses. Nested code
+    objects (e.g., of inner functions) are included recursively.
+
+    """
+
+    consts = []
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            consts.append(_get_code_key(const))
+        elif isinstance(const, frozenset):
+            consts.append(sorted(repr(c) for c in const))
+        else:
+            consts.append(const)
+
+    return [code.co_code, consts, list(code.co_names)]
+
+
+def _update_hash(h, obj):
+    """
+    Updates a hash with a (nested) object containing numpy arrays, lists, tuples, dictionaries and scalars.
+
+    """
+
+    if isinstance(obj, np.ndarray):
+        h.update(str((obj.shape, obj.dtype.str)).encode())
+        h.update(np.ascontiguousarray(obj).data)
+    elif isinstance(obj, bytes):
+        h.update(b"b%d:" % len(obj))
+        h.update(obj)
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"[%d" % len(obj))
+        for o in obj:
+            _update_hash(h, o)
+        h.update(b"]")
+    elif isinstance(obj, dict):
+        h.update(b"{%d" % len(obj))
+        for k in sorted(obj.keys()):
+            _update_hash(h, k)
+            _update_hash(h, obj[k])
+        h.update(b"}")
+    else:
+        h.update(repr(obj).encode())
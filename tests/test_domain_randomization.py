@@ -0,0 +1,221 @@
+import threading
+
+import yaml
+import numpy as np
+import mujoco
+
+from loco_mujoco import LocoEnv
+from loco_mujoco.utils import DomainRandomizationPlan, get_compile_service, shutdown_compile_service
+
+
+CONFIG = {"Joints": {"FR_hip_joint": {"damping": {"uniform_range": [1.0, 3.0]},
+                                      "frictionloss": {"uniform_range_delta": 0.1}}},
+          "Inertial": {"FR_hip": {"mass": {"uniform_range_delta": 0.2},
+                                  "diaginertia": {"uniform_range_delta": 0.0001}}},
+          "Geoms": {"FR_hip": {"friction": {"sigma": [0.1, 0.001, 0.0001]}}}}
+
+
+def test_direct_domain_randomization(tmp_path):
+
+    config_path = tmp_path / "domain_randomization.yaml"
+    with open(config_path, "w") as file:
+        yaml.safe_dump(CONFIG, file)
+
+    np.random.seed(0)
+    env = LocoEnv.make("UnitreeA1.simple", domain_randomization_config=str(config_path), direct_dom_rand=True)
+    assert not env._domain_rand.needs_recompilation
+
+    model, data = env._model, env._data
+    nominal = mujoco.MjModel.from_xml_string(env._xml_handles[0].to_xml_string(),
+                                             env._xml_handles[0].get_assets())
+    joint_id = mujoco.mj_name2id(model, mujoco.mjtObj.mjOBJ_JOINT, "FR_hip_joint")
+    body_id = mujoco.mj_name2id(model, mujoco.mjtObj.mjOBJ_BODY, "FR_hip")
+    dof_id = model.jnt_dofadr[joint_id]
+
+    for i in range(5):
+        env.reset()
+
+        # the model and the data are reused
+        assert env._model is model and env._data is data
+
+        # the values are sampled around the nominal values instead of the previously sampled ones
+        assert 1.0 <= model.dof_damping[dof_id] <= 3.0
+        assert abs(model.dof_frictionloss[dof_id] - nominal.dof_frictionloss[dof_id]) <= 0.1
+        assert abs(model.body_mass[body_id] - nominal.body_mass[body_id]) <= 0.2
+        assert np.all(np.abs(model.body_inertia[body_id] - nominal.body_inertia[body_id]) <= 0.0001)
+        assert np.isclose(model.body_subtreemass[0], np.sum(model.body_mass))
+
+        # parameters that are not part of the config are left untouched
+        other_dofs = np.arange(model.nv) != dof_id
+        assert np.array_equal(model.dof_damping[other_dofs], nominal.dof_damping[other_dofs])
+
+    geom_ids = np.where(model.geom_bodyid == body_id)[0]
+    assert not np.array_equal(model.geom_friction[geom_ids], nominal.geom_friction[geom_ids])
+    assert np.array_equal(model.geom_friction[model.geom_bodyid != body_id],
+                          nominal.geom_friction[model.geom_bodyid != body_id])
+
+    for i in range(5):
+        env.step(np.random.randn(env.info.action_space.shape[0]) * 0.1)
+
+
+def test_domain_randomization_bank(tmp_path):
+
+    config = {"Inertial": {"FR_thigh": {"mass": {"uniform_range_delta": 0.2}}}}
+    config_path = tmp_path / "domain_randomization.yaml"
+    with open(config_path, "w") as file:
+        yaml.safe_dump(config, file)
+
+    env = LocoEnv.make("UnitreeA1.simple", domain_randomization_config=str(config_path), parallel_dom_rand=False)
+    env.save_domain_randomization_bank(tmp_path / "bank", n_models=4, seed=0)
+
+    np.random.seed(0)
+    env = LocoEnv.make("UnitreeA1.simple", domain_randomization_config=str(config_path),
+                       domain_randomization_bank=str(tmp_path / "bank"))
+    assert not env._domain_rand.parallel
+    parameters = env._domain_rand.get_bank_parameters(0)
+    assert parameters["body_mass"].shape == (4, env._model.nbody)
+
+    for i in range(5):
+        env.reset()
+        # the model that was randomized last is the loaded entry of the bank
+        entry = env._domain_rand.bank_entries[0]
+        assert np.array_equal(env._models[0].body_mass, parameters["body_mass"][entry])
+        env.step(np.random.randn(env.info.action_space.shape[0]) * 0.1)
+
+
+def test_domain_randomization_plan():
+
+    config = {"Default": {"exclude": ["trunk_tx", "trunk_ty", "trunk_tz", "trunk_rotation", "trunk_list",
+                                      "trunk_tilt"],
+                          "Joints": {"damping": {"sigma": 0.1}}},
+              "Inertial": {"FR_hip": {"mass": {"uniform_range_delta": 0.2},
+                                      "diaginertia": {"uniform_range_delta": 0.0001}}}}
+
+    env = LocoEnv.make("UnitreeA1.simple")
+    xml_handle = env._xml_handles[0]
+    plan = DomainRandomizationPlan(xml_handle, config)
+    assert plan.size == len(plan.names) + 2
+
+    # a batch of samples is equal to the same number of single samples
+    batch = plan.sample(np.random.default_rng(0), 100)
+    assert batch.shape == (100, plan.size)
+    values = plan.to_dict(batch)
+    assert np.all(np.abs(values["inertial/FR_hip/mass"] - 0.696) <= 0.2)
+    assert np.all(values["joint/FR_hip_joint/damping"] >= 0.0)
+
+    # the xml and the model path produce the same model
+    model_plan = DomainRandomizationPlan(xml_handle, config, env._model)
+    model = mujoco.MjModel.from_xml_string(xml_handle.to_xml_string(), xml_handle.get_assets())
+    model_plan.apply_to_model(model, batch[0])
+    plan.apply_to_xml(xml_handle, batch[0])
+    compiled_model = mujoco.MjModel.from_xml_string(xml_handle.to_xml_string(), xml_handle.get_assets())
+    assert np.allclose(model.dof_damping, compiled_model.dof_damping)
+    assert np.allclose(model.body_mass, compiled_model.body_mass)
+    assert np.allclose(model.body_inertia, compiled_model.body_inertia)
+
+    # the same seed produces the same models
+    config_env = [LocoEnv.make("UnitreeA1.simple", domain_randomization_config=config, parallel_dom_rand=False,
+                               domain_randomization_seed=0) for i in range(2)]
+    for env in config_env:
+        env.reset()
+    parameters = [env.get_domain_randomization_parameters() for env in config_env]
+    assert parameters[0].keys() == values.keys()
+    for name in parameters[0].keys():
+        assert np.array_equal(parameters[0][name], parameters[1][name])
+    assert np.array_equal(config_env[0]._model.body_mass, config_env[1]._model.body_mass)
+
+
+def test_shared_compile_service():
+
+    config = {"Inertial": {"FR_thigh": {"mass": {"uniform_range_delta": 0.2}}}}
+
+    shutdown_compile_service()
+    service = get_compile_service(2)
+    envs = [LocoEnv.make("UnitreeA1.simple", domain_randomization_config=config, N_worker_per_xml_dom_rand=2)
+            for i in range(3)]
+
+    # all environments share the same pool of workers
+    assert all(env._domain_rand._compile_service is service for env in envs)
+
+    masses = []
+    for env in envs:
+        for i in range(3):
+            env.reset()
+            masses.append(env.get_domain_randomization_parameters()["inertial/FR_thigh/mass"])
+            assert np.isclose(env._model.body_mass[mujoco.mj_name2id(env._model, mujoco.mjtObj.mjOBJ_BODY,
+                                                                     "FR_thigh")], masses[-1])
+    assert len(np.unique(masses)) == len(masses)
+
+    # the same seed produces the same models, independently of the compile workers
+    envs = [LocoEnv.make("UnitreeA1.simple", domain_randomization_config=config, N_worker_per_xml_dom_rand=2,
+                         domain_randomization_seed=0) for i in range(2)]
+    for i in range(3):
+        for env in envs:
+            env.reset()
+        parameters = [env.get_domain_randomization_parameters()["inertial/FR_thigh/mass"] for env in envs]
+        assert np.array_equal(parameters[0], parameters[1])
+        assert np.array_equal(envs[0]._model.body_mass, envs[1]._model.body_mass)
+
+    shutdown_compile_service()
+    assert service.closed
+
+
+def test_compile_service_with_compiling_thread():
+
+    config = {"Inertial": {"FR_thigh": {"mass": {"uniform_range_delta": 0.2}}}}
+    xml_handle = LocoEnv.make("UnitreeA1.simple")._xml_handles[0]
+    xml_string, assets = xml_handle.to_xml_string(), xml_handle.get_assets()
+
+    # another thread is compiling models while the workers are started
+    stop = threading.Event()
+
+    def compile_models():
+        while not stop.is_set():
+            mujoco.MjModel.from_xml_string(xml_string, assets)
+
+    thread = threading.Thread(target=compile_models)
+    thread.start()
+    try:
+        shutdown_compile_service()
+        service = get_compile_service(2)
+        key = service.register(xml_handle, DomainRandomizationPlan(xml_handle, config), np.random.default_rng(0),
+                               prefetch=2)
+        for i in range(4):
+            model, values = service.get(key, timeout=120)
+            assert isinstance(model, mujoco.MjModel)
+    finally:
+        stop.set()
+        thread.join()
+        shutdown_compile_service()
+
+
+def test_async_reset():
+
+    config = {"Inertial": {"FR_thigh": {"mass": {"uniform_range_delta": 0.2}}}}
+    envs = [LocoEnv.make("UnitreeA1.simple", domain_randomization_config=config, parallel_dom_rand=False,
+                         domain_randomization_seed=0, async_reset=async_reset) for async_reset in (False, True)]
+
+    # the prepared models match the ones randomized during reset
+    for i in range(4):
+        for env in envs:
+            env.reset()
+        assert envs[1]._prepared_reset is not None
+        parameters = [env.get_domain_randomization_parameters() for env in envs]
+        assert np.array_equal(parameters[0]["inertial/FR_thigh/mass"], parameters[1]["inertial/FR_thigh/mass"])
+        assert np.array_equal(envs[0]._model.body_mass, envs[1]._model.body_mass)
+
+        for j in range(5):
+            envs[1].step(np.random.randn(envs[1].info.action_space.shape[0]) * 0.1)
+
+    # the background preparations have to be finished before other environments start compile workers
+    for env in envs:
+        env.close()
+
+    # closing stops the background thread and the prefetching of the compile service
+    env = LocoEnv.make("UnitreeA1.simple", domain_randomization_config=config, async_reset=True)
+    env.reset()
+    service = env._domain_rand._compile_service
+    n_jobs = len(service._jobs)
+    env.close()
+    assert env._reset_executor is None and env._prepared_reset is None
+    assert len(service._jobs) == n_jobs - 1
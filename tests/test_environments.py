@@ -1,5 +1,6 @@
 from pathlib import Path
 import numpy as np
+import pytest
 
 import loco_mujoco
 from loco_mujoco import LocoEnv
@@ -122,3 +123,75 @@ def test_replays():
             task_env = gym.make("LocoMujoco", env_name=task_name, debug=True)
             task_env.play_trajectory(n_episodes=N_EPISODES_REP, n_steps_per_episode=N_STEPS_REP, render=False)
 
+
+
+def test_get_and_set_state():
+
+    for task_name in ["UnitreeA1.simple.real", "HumanoidTorque4Ages.walk.all.real"]:
+
+        np.random.seed(0)
+        env = LocoEnv.make(task_name, debug=True, use_foot_forces=True)
+        action_dim = env.info.action_space.shape[0]
+        actions = np.random.randn(20, action_dim) * 0.1
+
+        env.reset()
+        for action in actions[:5]:
+            env.step(action)
+        state = env.get_state()
+        rollout = np.array([env.step(action)[0] for action in actions])
+
+        env.reset()
+        env.set_state(state)
+        assert np.array_equal(env.get_state(), state)
+        rollout_restored = np.array([env.step(action)[0] for action in actions])
+
+        assert np.array_equal(rollout, rollout_restored)
+
+
+def test_runtime_weight():
+
+    np.random.seed(0)
+    env = LocoEnv.make("UnitreeH1.carry.real", debug=True, runtime_weight=True)
+    action_dim = env.info.action_space.shape[0]
+    assert len(env._models) == 1
+
+    weight_id = env._model.body("weight").id
+    inertia_per_kg = env._model.body_inertia[weight_id] / env._model.body_mass[weight_id]
+
+    masses = []
+    for i in range(10):
+        obs = env.reset()
+        mass = env._model.body_mass[weight_id]
+        masses.append(mass)
+
+        # the weight entry of the observation is the mass of the carried weight
+        assert mass in env._valid_weights
+        assert np.isclose(obs[-1], mass)
+        assert np.allclose(env._model.body_inertia[weight_id], inertia_per_kg * mass)
+        assert np.isclose(env._model.body_subtreemass[0], np.sum(env._model.body_mass))
+    assert len(np.unique(masses)) > 1
+
+    # the mass is part of the state
+    state = env.get_state()
+    actions = np.random.randn(20, action_dim) * 0.1
+    rollout = np.array([env.step(action)[0] for action in actions])
+    while env._model.body_mass[weight_id] == masses[-1]:
+        env.reset()
+    env.set_state(state)
+    assert env._model.body_mass[weight_id] == masses[-1]
+    assert np.array_equal(rollout, np.array([env.step(action)[0] for action in actions]))
+
+    env = LocoEnv.make("UnitreeH1.carry.real", debug=True, weight_mass_range=(0.5, 2.0))
+    low, high = env.info.observation_space.low[-1], env.info.observation_space.high[-1]
+    assert np.isclose(low, 0.5) and np.isclose(high, 2.0)
+    for i in range(5):
+        obs = env.reset()
+        assert 0.5 <= obs[-1] <= 2.0
+
+    # contradicting weight parameters are rejected
+    for kwargs in [dict(weight_mass=1.0, runtime_weight=True), dict(weight_mass=1.0, weight_mass_range=(0.5, 2.0)),
+                   dict(weight_mass_range=(2.0, 0.5))]:
+        with pytest.raises(ValueError):
+            LocoEnv.make("UnitreeH1.carry.real", debug=True, **kwargs)
+    with pytest.raises(ValueError):
+        LocoEnv.make("UnitreeH1.walk.real", debug=True, runtime_weight=True)
@@ -0,0 +1,116 @@
+import numpy as np
+import mujoco
+
+from loco_mujoco import LocoEnv
+
+
+def test_compiled_observation_matches_observation_helper():
+
+    for task_name, kwargs in [("UnitreeH1.carry.real", dict()), ("Atlas.walk.real", dict(use_foot_forces=True)),
+                              ("HumanoidTorque4Ages.walk.all.real", dict()), ("UnitreeA1.simple.real", dict())]:
+
+        np.random.seed(0)
+        env = LocoEnv.make(task_name, debug=True, **kwargs)
+        action_dim = env.info.action_space.shape[0]
+
+        for i in range(2):
+            env.reset()
+            for j in range(20):
+                obs = env._create_observation(env.obs_helper._build_obs(env._data))
+                assert np.allclose(obs, env._obs)
+                env.step(np.random.randn(action_dim) * 0.1)
+
+
+def test_set_sim_state_from_flat_sample():
+
+    env = LocoEnv.make("UnitreeA1.simple.real", debug=True)
+    env.reset()
+
+    sample = [np.array(value) + 0.1 for value in env.trajectories.reset_trajectory()]
+    env.set_sim_state(sample)
+    qpos, qvel, site_xmat = env._data.qpos.copy(), env._data.qvel.copy(), env._data.site_xmat.copy()
+
+    env.reset()
+    env.set_sim_state(np.concatenate([np.ravel(value) for value in sample]))
+
+    assert np.array_equal(qpos, env._data.qpos)
+    assert np.array_equal(qvel, env._data.qvel)
+    assert np.array_equal(site_xmat, env._data.site_xmat)
+
+
+def test_ground_forces_match_collision_forces():
+
+    for task_name in ["UnitreeG1.walk.real", "UnitreeA1.simple.real"]:
+
+        np.random.seed(0)
+        env = LocoEnv.make(task_name, debug=True, use_foot_forces=True)
+        action_dim = env.info.action_space.shape[0]
+        env.reset()
+
+        for i in range(50):
+            env.step(np.random.randn(action_dim) * 0.1)
+            grf = np.concatenate([env._get_collision_force("floor", group)[:3]
+                                  for group in env._get_ground_force_groups()])
+            assert np.array_equal(env._get_ground_forces(), grf)
+
+
+def test_reset_state_bank_matches_set_sim_state():
+
+    for task_name in ["UnitreeH1.walk.real", "HumanoidTorque4Ages.walk.all.real", "UnitreeA1.simple.real"]:
+
+        env = LocoEnv.make(task_name, debug=True)
+        env.reset()
+        bank = env._get_reset_state_bank()
+
+        traj_len, n_traj = env.trajectories.trajectory_length, env.trajectories.number_of_trajectories
+        for substep_no, traj_no in [(0, 0), (17, n_traj - 1), (traj_len - 1, 0)]:
+            mujoco.mj_resetData(env._model, env._data)
+            sample = env.trajectories.reset_trajectory(substep_no, traj_no)
+            env.set_sim_state(sample)
+            qpos, qvel, site_xmat = env._data.qpos.copy(), env._data.qvel.copy(), env._data.site_xmat.copy()
+
+            mujoco.mj_resetData(env._model, env._data)
+            bank.set_state(env._data, traj_no, substep_no)
+
+            assert np.allclose(qpos, env._data.qpos)
+            assert np.allclose(qvel, env._data.qvel)
+            assert np.allclose(site_xmat, env._data.site_xmat)
+
+
+def test_observation_history():
+
+    history_length = 3
+    for task_name in ["UnitreeH1.carry.real", "HumanoidTorque4Ages.walk.all.real"]:
+
+        np.random.seed(0)
+        env = LocoEnv.make(task_name, debug=True)
+        np.random.seed(0)
+        env_history = LocoEnv.make(task_name, debug=True, obs_history_length=history_length)
+        action_dim = env.info.action_space.shape[0]
+        obs_dim = env.info.observation_space.shape[0]
+        assert env_history.info.observation_space.shape == (history_length * obs_dim,)
+
+        for i in range(3):
+            state = np.random.get_state()
+            history = [env.reset()] * history_length
+            np.random.set_state(state)
+            obs_history = env_history.reset()
+            assert np.array_equal(np.concatenate(history), obs_history)
+
+            stored, expected = [], []
+            for j in range(10):
+                action = np.random.randn(action_dim) * 0.1
+                history = history[1:] + [env.step(action)[0]]
+                obs_history = env_history.step(action)[0]
+                assert obs_history.flags["C_CONTIGUOUS"]
+                assert np.array_equal(np.concatenate(history), obs_history)
+                stored.append(obs_history)
+                expected.append(np.concatenate(history))
+
+            # the returned observations are not overwritten by later steps
+            assert np.array_equal(np.array(stored), np.array(expected))
+
+    env_view = LocoEnv.make("UnitreeH1.carry.real", debug=True, obs_history_length=history_length,
+                            obs_history_view=True)
+    obs = env_view.reset()
+    assert np.shares_memory(obs, env_view.step(np.zeros(env_view.info.action_space.shape[0]))[0])
@@ -0,0 +1,75 @@
+import numpy as np
+
+from loco_mujoco import LocoEnv
+from loco_mujoco.utils import Trajectory, NoReward, PosReward, CustomReward, TargetVelocityReward, \
+    MultiTargetVelocityReward, VelocityVectorReward, ReferenceTrackingReward
+
+
+def test_batched_rewards_match_single_rewards():
+
+    rng = np.random.default_rng(0)
+    n, dim_state, dim_action = 32, 10, 3
+    states = rng.normal(size=(n, dim_state))
+    states[:, -2:] = rng.integers(0, 2, size=(n, 2))
+    actions = rng.normal(size=(n, dim_action))
+    next_states = rng.normal(size=(n, dim_state))
+    absorbing = np.zeros(n, dtype=bool)
+
+    rewards = [NoReward(), PosReward(pos_idx=0), TargetVelocityReward(target_velocity=1.25, x_vel_idx=1),
+               MultiTargetVelocityReward(target_velocity=1.25, x_vel_idx=1, env_id_len=2,
+                                         scalings=[0.4, 0.6, 0.8, 1.0]),
+               VelocityVectorReward(x_vel_idx=1, y_vel_idx=2, angle_idx=[-3, -2], goal_vel_idx=[-1]),
+               CustomReward(reward_callback=lambda s, a, ns: np.sum(s) * np.sum(a) - ns[0]),
+               CustomReward(reward_callback=lambda s, a, ns: np.sum(s, axis=1) * np.sum(a, axis=1) - ns[:, 0],
+                            batched_reward_callback=True)]
+
+    for reward in rewards:
+        expected = [reward(s, a, ns, ab) for s, a, ns, ab in zip(states, actions, next_states, absorbing)]
+        batch = reward.call_batch(states, actions, next_states, absorbing)
+        assert batch.shape == (n,)
+        assert np.allclose(batch, expected)
+
+
+def test_reference_tracking_reward():
+
+    rng = np.random.default_rng(0)
+    traj_files = dict(x=rng.normal(size=100), y=rng.normal(size=100), q=rng.normal(size=100),
+                      dq=rng.normal(size=100), split_points=np.array([0, 50, 100]))
+    traj = Trajectory(["x", "y", "q", "dq"], low=np.array([-np.inf]), high=np.array([np.inf]),
+                      joint_pos_idx=np.array([0, 1, 2]), interpolate_map=None, interpolate_remap=None,
+                      traj_files=traj_files, traj_dt=0.01, control_dt=0.01, warn=False)
+    reward = ReferenceTrackingReward(pos_keys=["q"], pos_idx=[0], vel_keys=["dq"], vel_idx=[1], trajectory=traj)
+
+    # states following the reference receive the maximum reward until the end of the trajectory
+    traj.reset_trajectory(substep_no=45, traj_no=1)
+    reward.reset_state()
+    next_states = np.stack([traj_files["q"][96:], traj_files["dq"][96:]], axis=1)
+    for next_state in next_states:
+        assert np.isclose(reward(None, None, next_state, False), 0.75)
+    assert np.isclose(reward(None, None, next_states[-1], False), 0.75)
+
+    # offline relabeling with explicit reference samples
+    reference_idx = rng.integers(0, 100, size=20)
+    next_states = rng.normal(size=(20, 2))
+    rewards = reward.call_batch(None, None, next_states, None, reference_idx=reference_idx)
+    expected = 0.65 * np.exp(-2.0 * np.square(next_states[:, 0] - traj_files["q"][reference_idx])) + \
+        0.1 * np.exp(-0.1 * np.square(next_states[:, 1] - traj_files["dq"][reference_idx]))
+    assert np.allclose(rewards, expected)
+
+
+def test_reference_tracking_reward_env():
+
+    for task_name in ["UnitreeH1.walk.real", "Atlas.carry.real", "HumanoidTorque.run.real"]:
+        env = LocoEnv.make(task_name, debug=True, reward_type="reference_tracking", init_step_no=0,
+                           random_start=False)
+        assert isinstance(env._reward_function, ReferenceTrackingReward)
+
+        env.reset()
+        action = np.zeros(env.info.action_space.shape[0])
+        for i in range(5):
+            reward = env.step(action)[1]
+            assert 0.0 < reward <= 0.75
+
+    # the default reward still receives its default target velocity
+    env = LocoEnv.make("UnitreeH1.walk.real", debug=True)
+    assert isinstance(env._reward_function, TargetVelocityReward)
@@ -0,0 +1,82 @@
+import numpy as np
+
+from loco_mujoco.utils import Trajectory, convert_npz_to_mmap, get_mmap_path, load_trajectory_files
+
+
+def _get_trajectory(packed, control_dt=0.01, cache_dir=None, interpolate_map=lambda traj: np.array(traj)):
+
+    rng = np.random.default_rng(0)
+    traj_files = dict(x=rng.normal(size=100), y=rng.normal(size=100), q=rng.normal(size=100),
+                      rot=rng.normal(size=(100, 9)), split_points=np.array([0, 50, 100]))
+    # multidimensional observations need an environment specific interpolation map
+    keys = ["x", "y", "q", "rot"] if control_dt == 0.002 else ["x", "y", "q"]
+
+    return Trajectory(keys, low=np.array([-np.inf]), high=np.array([np.inf]), joint_pos_idx=np.array([0, 1, 2]),
+                      interpolate_map=interpolate_map, interpolate_remap=lambda traj: list(traj), traj_files=traj_files,
+                      traj_dt=0.002, control_dt=control_dt, warn=False, packed=packed,
+                      use_cache=cache_dir is not None, cache_dir=cache_dir)
+
+
+def test_packed_trajectory():
+
+    for control_dt in [0.002, 0.004]:
+        traj = _get_trajectory(packed=False, control_dt=control_dt)
+        traj_packed = _get_trajectory(packed=True, control_dt=control_dt)
+
+        for obs, obs_packed in zip(traj.trajectories, traj_packed.trajectories):
+            assert np.array_equal(obs, obs_packed)
+
+        for substep_no, traj_no in [(0, 0), (10, 1), (3, 0)]:
+            sample = traj.reset_trajectory(substep_no, traj_no)
+            sample_packed = traj_packed.reset_trajectory(substep_no, traj_no)
+            while sample is not None:
+                assert all(np.array_equal(np.shape(s), np.shape(s_p)) and np.array_equal(s, s_p)
+                           for s, s_p in zip(sample, sample_packed))
+                sample = traj.get_next_sample()
+                sample_packed = traj_packed.get_next_sample()
+            assert sample_packed is None
+
+        assert all(np.array_equal(traj.create_dataset()[k], traj_packed.create_dataset()[k])
+                   for k in ["states", "next_states"])
+
+
+def test_mmap_trajectory(tmp_path):
+
+    rng = np.random.default_rng(0)
+    traj_path = tmp_path / "traj.npz"
+    np.savez(traj_path, x=rng.normal(size=100), y=rng.normal(size=100), q=rng.normal(size=100),
+             split_points=np.array([0, 50, 100]))
+    traj_files = load_trajectory_files(traj_path)
+
+    mmap_path = convert_npz_to_mmap(traj_path)
+    traj_files_mmap = load_trajectory_files(traj_path)
+
+    assert mmap_path == get_mmap_path(traj_path)
+    assert list(traj_files.keys()) == list(traj_files_mmap.keys())
+    for key in traj_files.keys():
+        assert isinstance(traj_files_mmap[key], np.memmap)
+        assert np.array_equal(traj_files[key], traj_files_mmap[key])
+
+
+def test_trajectory_cache(tmp_path):
+
+    traj = _get_trajectory(packed=True, control_dt=0.004)
+    traj_cached = [_get_trajectory(packed=p, control_dt=0.004, cache_dir=tmp_path) for p in [True, True, False]]
+
+    assert len(list(tmp_path.iterdir())) == 1
+    assert not isinstance(traj_cached[0].trajectories[0], np.memmap)
+    for t in traj_cached[1:]:
+        assert isinstance(t.trajectories[0], np.memmap)
+
+    for t in traj_cached:
+        assert np.array_equal(traj.split_points, t.split_points)
+        for obs, obs_cached in zip(traj.trajectories, t.trajectories):
+            assert np.array_equal(obs, obs_cached)
+        sample = traj.reset_trajectory(5, 1)
+        sample_cached = t.reset_trajectory(5, 1)
+        assert all(np.array_equal(s, s_c) for s, s_c in zip(sample, sample_cached))
+
+    # a different function with the same name gets its own entry
+    _get_trajectory(packed=True, control_dt=0.004, cache_dir=tmp_path,
+                    interpolate_map=lambda traj: np.array(traj) * 1.0)
+    assert len(list(tmp_path.iterdir())) == 2
@@ -0,0 +1,213 @@
+import numpy as np
+
+from loco_mujoco import LocoEnv, LocoVecEnv, LocoSubprocVecEnv, LocoThreadVecEnv
+
+
+N_STEPS = 200
+
+
+def test_vec_env_matches_single_env():
+
+    for task_name in ["UnitreeH1.walk.real", "HumanoidTorque4Ages.walk.all.real"]:
+
+        np.random.seed(0)
+        env = LocoEnv.make(task_name, debug=True)
+        action_dim = env.info.action_space.shape[0]
+
+        dataset = [env.reset()]
+        actions = []
+        for i in range(N_STEPS):
+            action = np.random.randn(action_dim) * 0.1
+            actions.append(action)
+            obs, _, absorbing, _ = env.step(action)
+            dataset.append(obs)
+            if absorbing:
+                break
+
+        np.random.seed(0)
+        vec_env = LocoVecEnv.make(task_name, 1, debug=True)
+
+        dataset_vec = [vec_env.reset()[0]]
+        for action in actions:
+            np.random.randn(action_dim)
+            _, _, _, info = vec_env.step(action[None])
+            dataset_vec.append(info["final_observation"][0])
+
+        assert np.allclose(np.array(dataset), np.array(dataset_vec))
+
+
+def test_vec_env_auto_reset():
+
+    np.random.seed(0)
+    n_envs = 4
+    vec_env = LocoVecEnv.make("UnitreeH1.walk.real", n_envs, debug=True)
+    action_dim = vec_env.info.action_space.shape[0]
+    obs_dim = vec_env.info.observation_space.shape[0]
+
+    obs = vec_env.reset()
+    assert obs.shape == (n_envs, obs_dim)
+
+    n_episodes = 0
+    for i in range(N_STEPS):
+        obs, reward, absorbing, info = vec_env.step(np.random.randn(n_envs, action_dim))
+        assert obs.shape == (n_envs, obs_dim)
+        assert reward.shape == (n_envs,)
+        assert np.all(info["last"][absorbing])
+        n_episodes += np.sum(info["last"])
+
+    assert n_episodes > 0
+
+
+def test_subproc_vec_env():
+
+    np.random.seed(0)
+    n_envs = 3
+    vec_env = LocoSubprocVecEnv("UnitreeH1.walk.real", n_envs, n_workers=2, seed=0, debug=True)
+    action_dim = vec_env.info.action_space.shape[0]
+    obs_dim = vec_env.info.observation_space.shape[0]
+
+    try:
+        obs = vec_env.reset()
+        assert obs.shape == (n_envs, obs_dim)
+
+        n_episodes = 0
+        for i in range(N_STEPS):
+            obs, reward, absorbing, info = vec_env.step(np.random.randn(n_envs, action_dim))
+            assert obs.shape == (n_envs, obs_dim)
+            assert reward.shape == (n_envs,)
+            assert np.all(info["last"][absorbing])
+            n_episodes += np.sum(info["last"])
+
+        assert n_episodes > 0
+    finally:
+        vec_env.close()
+
+
+def test_thread_vec_env_matches_vec_env():
+
+    n_envs = 5
+    np.random.seed(0)
+    vec_env = LocoVecEnv.make("UnitreeA1.simple.real", n_envs, debug=True, use_foot_forces=True)
+    np.random.seed(0)
+    thread_vec_env = LocoThreadVecEnv.make("UnitreeA1.simple.real", n_envs, n_threads=2, debug=True,
+                                           use_foot_forces=True)
+    action_dim = vec_env.info.action_space.shape[0]
+
+    try:
+        np.random.seed(1)
+        obs = vec_env.reset()
+        np.random.seed(1)
+        obs_thread = thread_vec_env.reset()
+        assert np.allclose(obs, obs_thread)
+
+        for i in range(N_STEPS):
+            actions = np.random.randn(n_envs, action_dim) * 0.1
+            state = np.random.get_state()
+            obs, reward, absorbing, info = vec_env.step(actions)
+            np.random.set_state(state)
+            obs_thread, reward_thread, absorbing_thread, info_thread = thread_vec_env.step(actions)
+
+            assert np.allclose(obs, obs_thread)
+            assert np.allclose(reward, reward_thread)
+            assert np.array_equal(absorbing, absorbing_thread)
+            assert np.allclose(info["final_observation"], info_thread["final_observation"])
+    finally:
+        thread_vec_env.close()
+
+
+def test_has_fallen_batch_matches_single_env():
+
+    for task_name in ["HumanoidTorque.walk.real", "Atlas.walk.real", "Talos.walk.real",
+                      "UnitreeH1.walk.real", "UnitreeG1.walk.real", "UnitreeA1.simple.real"]:
+
+        np.random.seed(0)
+        env = LocoEnv.make(task_name, debug=True)
+        states = env.create_dataset()["states"]
+        states = np.concatenate([states, states + np.random.randn(*states.shape) * 0.3])
+
+        has_fallen = np.array([env._has_fallen(state) for state in states])
+        has_fallen_batch, violations = env._has_fallen_batch(states, return_violations=True)
+
+        assert np.array_equal(has_fallen, has_fallen_batch)
+        assert np.sum(has_fallen) <= sum(violations.values())
+
+
+# conditions of the has-fallen checks as they were hard-coded in each environment, as (key, low, high)
+BASELINE_FALLEN_CONDITIONS = {
+    "HumanoidTorque": [(0, -0.46, 0.1), ("q_pelvis_tilt", -np.pi / 4.5, np.pi / 12),
+                       ("q_pelvis_list", -np.pi / 12, np.pi / 8), ("q_pelvis_rotation", -np.pi / 9, np.pi / 9),
+                       ("q_lumbar_extension", -np.pi / 4, np.pi / 10), ("q_lumbar_bending", -np.pi / 10, np.pi / 10),
+                       ("q_lumbar_rotation", -np.pi / 4.5, np.pi / 4.5)],
+    "Atlas": [(0, -0.3, 0.1), ("q_pelvis_tilt", -np.pi / 4.5, np.pi / 12), ("q_pelvis_list", -np.pi / 12, np.pi / 8),
+              ("q_pelvis_rotation", -np.pi / 10, np.pi / 10)],
+    "Atlas_back": [("q_back_bky", -np.pi / 4, np.pi / 10), ("q_back_bkx", -np.pi / 10, np.pi / 10),
+                   ("q_back_bkz", -np.pi / 4.5, np.pi / 4.5)],
+    "Talos": [(0, -0.3, 0.1), ("q_pelvis_tilt", -np.pi / 4.5, np.pi / 12), ("q_pelvis_list", -np.pi / 12, np.pi / 8),
+              ("q_pelvis_rotation", -np.pi / 10, np.pi / 10)],
+    "Talos_back": [("q_back_bky", -np.pi / 4, np.pi / 10), ("q_back_bkz", -np.pi / 10, np.pi / 10)],
+    "UnitreeH1": [(0, -0.3, 0.1), ("q_pelvis_tilt", -np.pi / 4.5, np.pi / 12),
+                  ("q_pelvis_list", -np.pi / 12, np.pi / 8), ("q_pelvis_rotation", -np.pi / 8, np.pi / 8)],
+    "UnitreeG1": [(0, -0.3, 0.1), ("q_pelvis_tilt", -np.pi / 4.5, np.pi / 12),
+                  ("q_pelvis_list", -np.pi / 12, np.pi / 8), ("q_pelvis_rotation", -np.pi / 8, np.pi / 8)],
+    "UnitreeA1": [("q_trunk_list", -0.2793, 0.2793), ("q_trunk_tilt", -0.192, 0.192), ("q_trunk_tz", -0.24, np.inf)]
+}
+
+
+def _get_baseline_conditions(env, robot):
+    conditions = list(BASELINE_FALLEN_CONDITIONS[robot])
+    if robot + "_back" in BASELINE_FALLEN_CONDITIONS and not env._disable_back_joint:
+        conditions += BASELINE_FALLEN_CONDITIONS[robot + "_back"]
+    return [(key if key == 0 else env._get_idx([key])[0], low, high) for key, low, high in conditions]
+
+
+def test_has_fallen_matches_baseline_conditions():
+
+    for robot, task_name in [("HumanoidTorque", "HumanoidTorque.walk.real"), ("Atlas", "Atlas.walk.real"),
+                             ("Talos", "Talos.walk.real"), ("UnitreeH1", "UnitreeH1.walk.real"),
+                             ("UnitreeG1", "UnitreeG1.walk.real"), ("UnitreeA1", "UnitreeA1.simple.real")]:
+
+        np.random.seed(0)
+        env = LocoEnv.make(task_name, debug=True)
+        conditions = _get_baseline_conditions(env, robot)
+        states = env.create_dataset()["states"]
+        states = np.concatenate([states, states + np.random.randn(*states.shape) * 0.3])
+
+        # random states are classified as by the hard-coded conditions
+        expected = np.zeros(len(states), dtype=bool)
+        for idx, low, high in conditions:
+            expected |= (states[:, idx] < low) | (states[:, idx] > high)
+        assert np.array_equal(np.array([env._has_fallen(state) for state in states]), expected)
+        assert np.array_equal(env._has_fallen_batch(states), expected)
+
+        # a valid state becomes a fallen one just beyond each bound, but not just inside of it
+        state = states[np.where(~expected)[0][0]]
+        for idx, low, high in conditions:
+            for bound, offset in [(low, -1e-3), (high, 1e-3)]:
+                if np.isinf(bound):
+                    continue
+                violating = state.copy()
+                violating[idx] = bound + offset
+                assert env._has_fallen(violating) and env._has_fallen_batch(violating[None])[0]
+                violating[idx] = bound - offset
+                assert not env._has_fallen(violating) and not env._has_fallen_batch(violating[None])[0]
+
+
+
+def test_vec_env_reference_tracking_reward():
+
+    n_envs = 4
+    kwargs = dict(debug=True, reward_type="reference_tracking", init_step_no=0, random_start=False)
+    env = LocoEnv.make("UnitreeH1.walk.real", **kwargs)
+    vec_env = LocoVecEnv.make("UnitreeH1.walk.real", n_envs, **kwargs)
+    action = np.zeros(env.info.action_space.shape[0])
+
+    env.reset()
+    vec_env.reset()
+    for i in range(10):
+        reward = env.step(action)[1]
+        rewards = vec_env.step(np.tile(action, (n_envs, 1)))[1]
+
+        # each environment follows its own reference sample
+        assert np.allclose(rewards, reward)
+        assert all(slot["episode_state"]["_reference_cursor"][0] == env._reference_cursor[0]
+                   for slot in vec_env._slots)